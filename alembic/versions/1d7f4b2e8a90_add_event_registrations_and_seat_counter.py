@@ -0,0 +1,41 @@
+"""Add event registrations and a seat counter on events
+
+Revision ID: 1d7f4b2e8a90
+Revises: 8b5e3a9c2d71
+Create Date: 2026-10-18 23:31:52.118406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1d7f4b2e8a90'
+down_revision: Union[str, None] = '8b5e3a9c2d71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('events', sa.Column('seats_taken', sa.Integer(), nullable=False, server_default='0'))
+    op.create_check_constraint('check_event_seats_within_capacity', 'events',
+                               'seats_taken >= 0 AND seats_taken <= capacity')
+    op.create_index('ix_events_start_date_id', 'events', ['start_date', 'id'])
+
+    op.create_table(
+        'event_registrations',
+        sa.Column('id', sa.UUID(as_uuid=True), primary_key=True),
+        sa.Column('event_id', sa.UUID(), sa.ForeignKey('events.id'), nullable=False),
+        sa.Column('student_id', sa.UUID(), sa.ForeignKey('students.id'), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.UniqueConstraint('event_id', 'student_id', name='uq_event_registrations_event_id_student_id'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('event_registrations')
+    op.drop_index('ix_events_start_date_id', table_name='events')
+    op.drop_constraint('check_event_seats_within_capacity', 'events', type_='check')
+    op.drop_column('events', 'seats_taken')
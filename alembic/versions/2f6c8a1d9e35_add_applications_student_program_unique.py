@@ -0,0 +1,36 @@
+"""Add unique (student_id, application_type_id) constraint on applications
+
+Revision ID: 2f6c8a1d9e35
+Revises: 5b1d9c7e2a64
+Create Date: 2026-10-18 17:40:03.918254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2f6c8a1d9e35'
+down_revision: Union[str, None] = '5b1d9c7e2a64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keep the earliest of any duplicate applications the old check-then-insert let through
+    op.execute(sa.text("""
+        DELETE FROM applications a
+        USING applications b
+        WHERE a.student_id = b.student_id
+          AND a.application_type_id = b.application_type_id
+          AND (a.application_date, a.id) > (b.application_date, b.id)
+    """))
+    op.create_unique_constraint(
+        'uq_applications_student_id_application_type_id', 'applications', ['student_id', 'application_type_id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_applications_student_id_application_type_id', 'applications', type_='unique')
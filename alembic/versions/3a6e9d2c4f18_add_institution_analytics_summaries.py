@@ -0,0 +1,61 @@
+"""Add summary tables for the institution analytics dashboard
+
+Revision ID: 3a6e9d2c4f18
+Revises: 1d7f4b2e8a90
+Create Date: 2026-10-19 01:12:40.530917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3a6e9d2c4f18'
+down_revision: Union[str, None] = '1d7f4b2e8a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'program_stats',
+        sa.Column('program_id', sa.UUID(as_uuid=True), sa.ForeignKey('programs.id', ondelete='CASCADE'),
+                  primary_key=True),
+        sa.Column('applications', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+    )
+    op.create_table(
+        'institution_payment_stats',
+        sa.Column('institution_id', sa.UUID(as_uuid=True), sa.ForeignKey('institutions.id', ondelete='CASCADE'),
+                  primary_key=True),
+        sa.Column('currency', sa.String(), primary_key=True),
+        sa.Column('pending_transactions', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('successful_transactions', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('revenue', sa.Numeric(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+    )
+
+    # Fill the counters from the rows already there; the app keeps them up to date from here on
+    op.execute(
+        "INSERT INTO program_stats (program_id, applications) "
+        "SELECT application_type_id, count(*) FROM applications "
+        "WHERE application_type = 'program' AND application_type_id IS NOT NULL "
+        "GROUP BY application_type_id"
+    )
+    op.execute(
+        "INSERT INTO institution_payment_stats "
+        "(institution_id, currency, pending_transactions, successful_transactions, revenue) "
+        "SELECT institution_id, currency, "
+        "count(*) FILTER (WHERE status = 'pending'), "
+        "count(*) FILTER (WHERE status = 'successful'), "
+        "coalesce(sum(amount) FILTER (WHERE status = 'successful'), 0) "
+        "FROM transactions WHERE institution_id IS NOT NULL "
+        "GROUP BY institution_id, currency"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('institution_payment_stats')
+    op.drop_table('program_stats')
@@ -0,0 +1,26 @@
+"""Add institutions (created_at, id) index for keyset pagination
+
+Revision ID: 3c9e1f4a7b20
+Revises: a8c3b669df7c
+Create Date: 2026-10-18 09:12:41.228310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9e1f4a7b20'
+down_revision: Union[str, None] = 'a8c3b669df7c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_institutions_created_at_id', 'institutions', ['created_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_institutions_created_at_id', table_name='institutions')
@@ -0,0 +1,29 @@
+"""Index program level listings by deadline
+
+Revision ID: 4e8a1c6f3b52
+Revises: 9c4e7a2b6d15
+Create Date: 2026-10-18 21:12:03.482915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e8a1c6f3b52'
+down_revision: Union[str, None] = '9c4e7a2b6d15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Level listings page through deadline then id, the old index only covered the level
+    op.drop_index('ix_programs_program_level', table_name='programs')
+    op.create_index('ix_programs_program_level_application_deadline_id', 'programs',
+                    ['program_level', 'application_deadline', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_programs_program_level_application_deadline_id', table_name='programs')
+    op.create_index('ix_programs_program_level', 'programs', ['program_level'])
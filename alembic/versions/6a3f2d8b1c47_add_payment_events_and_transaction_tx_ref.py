@@ -0,0 +1,45 @@
+"""Add payment_events and transactions.tx_ref for webhook reconciliation
+
+Revision ID: 6a3f2d8b1c47
+Revises: 4e8a1c6f3b52
+Create Date: 2026-10-18 22:03:41.270518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a3f2d8b1c47'
+down_revision: Union[str, None] = '4e8a1c6f3b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'payment_events',
+        sa.Column('id', sa.UUID(as_uuid=True), primary_key=True),
+        sa.Column('tx_ref', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('amount', sa.Numeric(), nullable=True),
+        sa.Column('currency', sa.String(), nullable=True),
+        sa.Column('flw_ref', sa.String(), nullable=True),
+        sa.Column('gateway_transaction_id', sa.String(), nullable=True),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('received_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+    )
+    op.create_index('ix_payment_events_tx_ref', 'payment_events', ['tx_ref'], unique=True)
+
+    # Older transactions were never given their reference and stay NULL
+    op.add_column('transactions', sa.Column('tx_ref', sa.String(), nullable=True))
+    op.create_index('ix_transactions_tx_ref', 'transactions', ['tx_ref'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_transactions_tx_ref', table_name='transactions')
+    op.drop_column('transactions', 'tx_ref')
+    op.drop_index('ix_payment_events_tx_ref', table_name='payment_events')
+    op.drop_table('payment_events')
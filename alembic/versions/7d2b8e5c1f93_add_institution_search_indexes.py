@@ -0,0 +1,56 @@
+"""Add full-text and trigram search indexes on institutions
+
+Revision ID: 7d2b8e5c1f93
+Revises: 3c9e1f4a7b20
+Create Date: 2026-10-18 11:40:03.518274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2b8e5c1f93'
+down_revision: Union[str, None] = '3c9e1f4a7b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    # Managed or limited-privilege databases may not allow creating pg_trgm.
+    # Search then falls back to the tsvector alone, so carry on without it.
+    try:
+        with bind.begin_nested():
+            bind.execute(sa.text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        has_trigram = True
+    except sa.exc.DBAPIError:
+        has_trigram = False
+
+    # Generated column, so Postgres keeps it in step with every insert and update
+    op.execute("""
+        ALTER TABLE institutions ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(name_of_institution, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(official_name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(country, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(brief_description, '')), 'C')
+        ) STORED
+    """)
+    op.create_index('ix_institutions_search_vector', 'institutions', ['search_vector'], postgresql_using='gin')
+    if has_trigram:
+        op.create_index(
+            'ix_institutions_name_trgm',
+            'institutions',
+            ['name_of_institution'],
+            postgresql_using='gin',
+            postgresql_ops={'name_of_institution': 'gin_trgm_ops'},
+        )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_institutions_name_trgm")
+    op.drop_index('ix_institutions_search_vector', table_name='institutions')
+    op.drop_column('institutions', 'search_vector')
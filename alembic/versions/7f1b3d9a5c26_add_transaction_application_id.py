@@ -0,0 +1,39 @@
+"""Record which application a transaction pays for
+
+Revision ID: 7f1b3d9a5c26
+Revises: 3a6e9d2c4f18
+Create Date: 2026-10-19 09:41:27.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7f1b3d9a5c26'
+down_revision: Union[str, None] = '3a6e9d2c4f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('transactions', sa.Column('application_id', sa.UUID(), nullable=True))
+    op.create_foreign_key('transactions_application_id_fkey', 'transactions', 'applications',
+                          ['application_id'], ['id'])
+
+    # Payments made with an Idempotency-Key so far were for the student's application to the program they're titled after
+    op.execute("""
+        UPDATE transactions SET application_id = applications.id
+        FROM applications JOIN programs ON programs.id = applications.application_type_id
+        WHERE transactions.idempotency_key IS NOT NULL
+          AND applications.student_id = transactions.student_id
+          AND programs.institution_id = transactions.institution_id
+          AND programs.name_of_program = transactions.title
+    """)
+
+
+def downgrade() -> None:
+    op.drop_constraint('transactions_application_id_fkey', 'transactions', type_='foreignkey')
+    op.drop_column('transactions', 'application_id')
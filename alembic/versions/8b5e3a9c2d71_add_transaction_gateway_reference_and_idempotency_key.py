@@ -0,0 +1,42 @@
+"""Add gateway reference, idempotency key and payment link to transactions
+
+Revision ID: 8b5e3a9c2d71
+Revises: 6a3f2d8b1c47
+Create Date: 2026-10-18 22:48:15.603927
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b5e3a9c2d71'
+down_revision: Union[str, None] = '6a3f2d8b1c47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('transactions', sa.Column('gateway_reference', sa.String(), nullable=True))
+    op.add_column('transactions', sa.Column('idempotency_key', sa.String(), nullable=True))
+    op.add_column('transactions', sa.Column('payment_link', sa.String(), nullable=True))
+    op.create_index('ix_transactions_gateway_reference', 'transactions', ['gateway_reference'], unique=True)
+    op.create_index('ix_transactions_student_id_idempotency_key', 'transactions', ['student_id', 'idempotency_key'],
+                    unique=True)
+
+    # Settle the references of payments the webhook reconciler already recorded
+    op.execute("""
+        UPDATE transactions SET gateway_reference = payment_events.flw_ref
+        FROM payment_events
+        WHERE payment_events.tx_ref = transactions.tx_ref AND transactions.status != 'pending'
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_transactions_student_id_idempotency_key', table_name='transactions')
+    op.drop_index('ix_transactions_gateway_reference', table_name='transactions')
+    op.drop_column('transactions', 'payment_link')
+    op.drop_column('transactions', 'idempotency_key')
+    op.drop_column('transactions', 'gateway_reference')
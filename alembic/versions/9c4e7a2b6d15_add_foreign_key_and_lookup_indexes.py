@@ -0,0 +1,69 @@
+"""Add indexes on hot foreign keys and lookup columns
+
+Revision ID: 9c4e7a2b6d15
+Revises: 2f6c8a1d9e35
+Create Date: 2026-10-18 19:05:46.117392
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4e7a2b6d15'
+down_revision: Union[str, None] = '2f6c8a1d9e35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Single-column indexes that duplicated the primary keys, declared with index=True
+# on every id column. Databases built with create_all have them, migrated ones don't.
+PRIMARY_KEY_DUPLICATES = [
+    ('ix_admins_id', 'admins'),
+    ('ix_institutions_id', 'institutions'),
+    ('ix_sub_accounts_id', 'sub_accounts'),
+    ('ix_categories_id', 'categories'),
+    ('ix_programs_id', 'programs'),
+    ('ix_events_id', 'events'),
+    ('ix_students_id', 'students'),
+    ('ix_transactions_id', 'transactions'),
+    ('ix_applications_id', 'applications'),
+]
+
+
+def upgrade() -> None:
+    for name, _ in PRIMARY_KEY_DUPLICATES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+
+    op.create_index('ix_transactions_student_id_transaction_date_id', 'transactions',
+                    ['student_id', 'transaction_date', 'id'])
+    op.create_index('ix_transactions_institution_id_transaction_date_id', 'transactions',
+                    ['institution_id', 'transaction_date', 'id'])
+    op.create_index('ix_applications_application_type_id', 'applications', ['application_type_id'])
+    op.create_index('ix_programs_institution_id', 'programs', ['institution_id'])
+    op.create_index('ix_programs_program_level', 'programs', ['program_level'])
+    op.create_index('ix_program_category_association_program_id_category_id', 'program_category_association',
+                    ['program_id', 'category_id'])
+    op.create_index('ix_sub_accounts_institution_id', 'sub_accounts', ['institution_id'])
+    op.create_index('ix_events_institution_id', 'events', ['institution_id'])
+
+    # The outbox worker only polls pending rows
+    op.drop_index('ix_email_outbox_status_next_attempt_at', table_name='email_outbox')
+    op.create_index('ix_email_outbox_pending_next_attempt_at', 'email_outbox', ['next_attempt_at'],
+                    postgresql_where=sa.text("status = 'pending'"))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_email_outbox_pending_next_attempt_at', table_name='email_outbox')
+    op.create_index('ix_email_outbox_status_next_attempt_at', 'email_outbox', ['status', 'next_attempt_at'])
+
+    op.drop_index('ix_events_institution_id', table_name='events')
+    op.drop_index('ix_sub_accounts_institution_id', table_name='sub_accounts')
+    op.drop_index('ix_program_category_association_program_id_category_id', table_name='program_category_association')
+    op.drop_index('ix_programs_program_level', table_name='programs')
+    op.drop_index('ix_programs_institution_id', table_name='programs')
+    op.drop_index('ix_applications_application_type_id', table_name='applications')
+    op.drop_index('ix_transactions_institution_id_transaction_date_id', table_name='transactions')
+    op.drop_index('ix_transactions_student_id_transaction_date_id', table_name='transactions')
+    # The primary key duplicates are not recreated, no migration ever created them
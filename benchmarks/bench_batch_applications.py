@@ -0,0 +1,71 @@
+"""A student applying to several programs: one apply_for_program request per
+program, as the frontend does today, against one apply_for_programs batch.
+Needs ``BENCH_DATABASE_URL`` pointing at Postgres: the programs deadline check
+calls ``now()``, which SQLite lacks.
+
+    python -m benchmarks.bench_batch_applications [students] [programs_per_student]
+"""
+import asyncio
+import sys
+
+from sqlalchemy import delete
+
+from benchmarks.common import make_engine, reset_tables, QueryCounter, timer
+from tuition.institution.models import Category, Institution, Program, SubAccount, program_category_association
+from tuition.institution.utils import ProgramCatalogue
+from tuition.security.oauth2 import Principal
+from tuition.services import services
+from tuition.student import crud
+from tuition.student.models import Application, Student
+from tuition.student.schemas import Application as ApplicationRequest, ApplicationBatch
+
+
+async def seed(session_factory, students, programs):
+    async with session_factory() as db:
+        student_rows = [Student(full_name=f"Student {i}", email=f"student{i}@bench.io", phone_number="08000000000",
+                                hashed_password="x", field_of_interest="Engineering", is_verified=True)
+                        for i in range(students)]
+        program_rows = [Program(name_of_program=f"Program {i}", program_level="Undergraduate", always_available=True,
+                                cost=1000, currency_code="NGN", image_url="https://example.com/p.png")
+                        for i in range(programs)]
+        db.add_all(student_rows + program_rows)
+        await db.commit()
+        return [Principal(role="student", user=s) for s in student_rows], [p.id for p in program_rows]
+
+
+async def one_request_per_program(session_factory, principal, program_ids):
+    for program_id in program_ids:
+        async with session_factory() as db:
+            await crud.apply_for_program(db, ApplicationRequest(program_id=program_id, custom_field={"note": "hi"}),
+                                         principal)
+
+
+async def one_batch(session_factory, principal, program_ids):
+    batch = ApplicationBatch(applications=[ApplicationRequest(program_id=program_id, custom_field={"note": "hi"})
+                                           for program_id in program_ids])
+    async with session_factory() as db:
+        await crud.apply_for_programs(db, batch, principal)
+
+
+async def main(students, programs):
+    engine, session_factory = make_engine()
+    await reset_tables(engine, Student.__table__, Institution.__table__, SubAccount.__table__, Program.__table__,
+                       Category.__table__, program_category_association, Application.__table__)
+    principals, program_ids = await seed(session_factory, students, programs)
+
+    print(f"{students} students applying to {programs} programs each")
+    for label, apply in (("request per program", one_request_per_program), ("batch", one_batch)):
+        async with session_factory() as db:
+            await db.execute(delete(Application))
+            await db.commit()
+        with services.overridden(program_catalogue=ProgramCatalogue(maxsize=1000, ttl=60)):
+            with QueryCounter(engine) as counter, timer(label, students):
+                for principal in principals:
+                    await apply(session_factory, principal, program_ids)
+        print(f"  {counter.count / students:.1f} statements per student")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200, int(sys.argv[2]) if len(sys.argv) > 2 else 8))
@@ -0,0 +1,130 @@
+"""Onboarding institutions and programs: one signup request per institution,
+with its bcrypt hash and commit, against the admin bulk import of an NDJSON
+file of institutions and a CSV file of their programs. The per-row path is
+timed over a small sample and extrapolated. Needs ``BENCH_DATABASE_URL``
+pointing at Postgres for realistic numbers.
+
+Target: each 100k row file imports at 2,500 rows/s or more, i.e. in under
+40 seconds. Institutions are bound by email address validation, about a
+third of the time per row, programs by the inserts themselves.
+
+    python -m benchmarks.bench_bulk_import [rows] [per-row sample]
+"""
+import asyncio
+import csv
+import io
+import json
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi import UploadFile
+from sqlalchemy import func, insert
+from sqlalchemy.future import select
+
+from benchmarks.common import make_engine, reset_tables
+from tuition.admin.models import Admin
+from tuition.email_outbox import EmailOutbox
+from tuition.imports import run_import
+from tuition.institution import crud as institution_crud
+from tuition.institution.models import Category, Institution, Program, SubAccount, program_category_association
+from tuition.institution.schemas import InstitutionSignup
+from tuition.student.models import Student
+
+TARGET_ROWS_PER_SECOND = 2500
+PROGRAMS_PER_INSTITUTION = 10
+CATEGORIES = ["Engineering", "Business", "Health", "Education"]
+
+
+def institution(i, prefix="import"):
+    return {"name_of_institution": f"University {i}", "type_of_institution": "University",
+            "website": f"https://university{i}.example.com", "address": f"{i} University Road",
+            "email": f"{prefix}{i}@example.com", "country": "Nigeria", "official_name": f"University {i}",
+            "brief_description": "A university taking part in the onboarding benchmark"}
+
+
+def write_institutions(n):
+    file = tempfile.TemporaryFile("w+b")
+    for i in range(n):
+        file.write((json.dumps(institution(i)) + "\n").encode())
+    file.seek(0)
+    return file
+
+
+def write_programs(n, institutions):
+    deadline = (datetime.now(timezone.utc) + timedelta(days=90)).isoformat()
+    file = tempfile.TemporaryFile("w+b")
+    text = io.TextIOWrapper(file, encoding="utf-8", newline="")
+    writer = csv.writer(text)
+    writer.writerow(["institution_email", "name_of_program", "program_level", "categories", "always_available",
+                     "is_free", "currency_code", "description", "image_url", "application_deadline", "cost"])
+    for i in range(n):
+        evergreen = i % 2 == 0
+        writer.writerow([f"import{i % institutions}@example.com", f"Program {i}", "Undergraduate",
+                         ",".join(CATEGORIES[i % 4:i % 4 + 2]), evergreen, False, "NGN", "A program",
+                         "https://example.com/p.png", "" if evergreen else deadline, 150000])
+    text.flush()
+    text.detach()
+    file.seek(0)
+    return file
+
+
+async def timed_import(session_factory, file, filename, kind, import_format, n):
+    async with session_factory() as db:
+        start = time.perf_counter()
+        report = await run_import(db, UploadFile(file=file, filename=filename), kind, import_format)
+        elapsed = time.perf_counter() - start
+    rate = n / elapsed
+    verdict = "meets" if rate >= TARGET_ROWS_PER_SECOND else "misses"
+    print(f"bulk import {kind}: {elapsed:.1f} s, {rate:,.0f} rows/s ({verdict} the {TARGET_ROWS_PER_SECOND:,} rows/s target), "
+          f"{report['imported']} imported, {report['rejected']} rejected")
+
+
+async def count(db, model):
+    return (await db.execute(select(func.count()).select_from(model))).scalar_one()
+
+
+async def main(n, sample):
+    engine, session_factory = make_engine()
+    await reset_tables(engine, Student.__table__, Institution.__table__, Admin.__table__, SubAccount.__table__,
+                       Program.__table__, Category.__table__, program_category_association, EmailOutbox.__table__)
+    async with engine.begin() as conn:
+        await conn.execute(insert(Category.__table__), [{"id": uuid.uuid4(), "name": name} for name in CATEGORIES])
+
+    start = time.perf_counter()
+    for i in range(sample):
+        payload = InstitutionSignup(**institution(i, prefix="signup"), password="Str0ng#Password",
+                                    confirm_password="Str0ng#Password")
+        async with session_factory() as db:
+            await institution_crud.sign_up_institution(db, payload, None)
+    per_row = (time.perf_counter() - start) / sample
+    print(f"per-row signup: {per_row * 1000:.1f} ms/row, {1 / per_row:,.0f} rows/s, "
+          f"{per_row * n / 60:.0f} min extrapolated to {n} rows")
+
+    await timed_import(session_factory, write_institutions(n), "institutions.ndjson", "institutions", "ndjson", n)
+
+    # Programs need the institutions' bank details, added here as the institutions would
+    async with session_factory() as db:
+        ids = (await db.execute(select(Institution.id).where(Institution.email.like("import%")))).scalars().all()
+    async with engine.begin() as conn:
+        await conn.execute(insert(SubAccount.__table__), [
+            {"id": uuid.uuid4(), "institution_id": institution_id, "subaccount_id": f"RS_{i}",
+             "account_name": "University", "account_number": "0123456789", "country": "NG", "currency": "NGN",
+             "bank_name": "Bank"}
+            for i, institution_id in enumerate(ids)
+        ])
+
+    programs = write_programs(n, max(1, n // PROGRAMS_PER_INSTITUTION))
+    await timed_import(session_factory, programs, "programs.csv", "programs", "csv", n)
+
+    async with session_factory() as db:
+        print(f"institutions {await count(db, Institution)}, programs {await count(db, Program)}, "
+              f"category links {await count(db, program_category_association)}, queued emails {await count(db, EmailOutbox)}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000, int(sys.argv[2]) if len(sys.argv) > 2 else 50))
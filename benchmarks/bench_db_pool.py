@@ -0,0 +1,63 @@
+"""First-request latency and pool saturation for the app's database engine.
+
+Compares a burst of requests against a freshly disposed pool (what every
+startup used to leave behind) with the same burst after ``warm_up_pool``, then
+pushes more concurrent sessions than the pool holds and prints ``pool_status``.
+Needs Postgres, SQLite doesn't use the queue pool:
+
+    BENCH_DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.bench_db_pool [burst]
+"""
+import asyncio
+import sys
+import time
+
+from sqlalchemy import text
+
+from benchmarks.common import BENCH_DATABASE_URL
+from tuition.database import SessionLocal, engine, pool_metrics, pool_status, warm_up_pool
+
+
+async def request(hold=0.0):
+    async with SessionLocal() as db:
+        await db.execute(text("SELECT pg_sleep(:hold)"), {"hold": hold})
+
+
+async def burst(n, hold=0.0):
+    async def timed():
+        start = time.perf_counter()
+        await request(hold)
+        return time.perf_counter() - start
+
+    latencies = sorted(await asyncio.gather(*(timed() for _ in range(n))))
+    return latencies[len(latencies) // 2] * 1000, latencies[-1] * 1000
+
+
+async def main(n):
+    if not BENCH_DATABASE_URL.startswith("postgresql"):
+        sys.exit("Set BENCH_DATABASE_URL to a postgresql+asyncpg URL")
+
+    await engine.dispose()
+    p50, worst = await burst(n)
+    print(f"cold pool, {n} requests: p50 {p50:.1f} ms, max {worst:.1f} ms")
+
+    await engine.dispose()
+    start = time.perf_counter()
+    await warm_up_pool()
+    print(f"warm_up_pool: {(time.perf_counter() - start) * 1000:.1f} ms")
+    p50, worst = await burst(n)
+    print(f"warm pool, {n} requests: p50 {p50:.1f} ms, max {worst:.1f} ms")
+
+    pool_metrics.reset()
+    size = pool_status()["size"]
+    sessions = size * 4
+    task = asyncio.gather(*(request(hold=0.05) for _ in range(sessions)))
+    await asyncio.sleep(0.02)
+    print(f"{sessions} sessions holding 50 ms each: {pool_status()}")
+    await task
+    print(f"after: {pool_status()}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5))
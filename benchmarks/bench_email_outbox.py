@@ -0,0 +1,122 @@
+"""Delivering a signup burst's verification emails: one SMTP session per message
+(the old BackgroundTasks path) against the outbox worker's batches.
+
+A local SMTP stub speaks implicit TLS like smtp.gmail.com:465 and waits
+``RTT`` before every reply to stand in for the network. It counts TLS
+sessions and delivered messages.
+
+    python -m benchmarks.bench_email_outbox [emails]
+"""
+import asyncio
+import datetime
+import ssl
+import sys
+import tempfile
+import time
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+from benchmarks.common import make_engine, reset_tables
+from tuition.email_outbox import EmailOutbox, EmailOutboxWorker, SmtpSink, enqueue_email
+
+RTT = 0.02
+BATCH_SIZE = 50
+CONNECTIONS = 4
+
+
+def tls_context():
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+        .serial_number(x509.random_serial_number()).not_valid_before(now)
+        .not_valid_after(now + datetime.timedelta(days=1)).sign(key, hashes.SHA256())
+    )
+    with tempfile.NamedTemporaryFile(suffix=".pem", delete=False) as handle:
+        handle.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                       serialization.NoEncryption()))
+        handle.write(cert.public_bytes(serialization.Encoding.PEM))
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(handle.name)
+    return context
+
+
+class SmtpStub:
+    def __init__(self):
+        self.sessions = 0
+        self.delivered = 0
+
+    async def reply(self, writer, line):
+        await asyncio.sleep(RTT)
+        writer.write(line.encode() + b"\r\n")
+        await writer.drain()
+
+    async def handle(self, reader, writer):
+        self.sessions += 1
+        await self.reply(writer, "220 stub ESMTP")
+        while line := await reader.readline():
+            command = line.decode().strip().upper()
+            if command.startswith("EHLO"):
+                await self.reply(writer, "250-stub\r\n250 AUTH PLAIN LOGIN")
+            elif command.startswith("AUTH"):
+                await self.reply(writer, "235 2.7.0 Accepted")
+            elif command.startswith("DATA"):
+                await self.reply(writer, "354 End data with <CR><LF>.<CR><LF>")
+                while await reader.readline() != b".\r\n":
+                    pass
+                self.delivered += 1
+                await self.reply(writer, "250 2.0.0 OK")
+            elif command.startswith("QUIT"):
+                await self.reply(writer, "221 Bye")
+                break
+            else:
+                await self.reply(writer, "250 OK")
+        writer.close()
+
+
+async def per_message(sink, n):
+    async def send(i):
+        async with sink.connect() as connection:
+            await connection.send(f"student{i}@example.com", "Email Account Verification", "<p>verify</p>")
+
+    await asyncio.gather(*(send(i) for i in range(n)))
+
+
+async def outbox(sink, n):
+    engine, session_factory = make_engine()
+    await reset_tables(engine, EmailOutbox.__table__)
+    async with session_factory() as db:
+        for i in range(n):
+            enqueue_email(db, f"student{i}@example.com", "Email Account Verification", "<p>verify</p>")
+        await db.commit()
+
+    worker = EmailOutboxWorker(session_factory, sink, batch_size=BATCH_SIZE, poll_interval=0.01,
+                               max_attempts=5, backoff=30, lease=300, connections=CONNECTIONS)
+    while await worker.process_batch():
+        pass
+    await engine.dispose()
+
+
+async def main(n):
+    stub = SmtpStub()
+    server = await asyncio.start_server(stub.handle, "127.0.0.1", 0, ssl=tls_context())
+    port = server.sockets[0].getsockname()[1]
+    sink = SmtpSink("127.0.0.1", port, "bench", "bench", "bench@example.com", timeout=30, validate_certs=False)
+
+    for label, deliver in (("session per message", per_message), ("outbox batches", outbox)):
+        stub.sessions = stub.delivered = 0
+        start = time.perf_counter()
+        await deliver(sink, n)
+        elapsed = time.perf_counter() - start
+        print(f"{label}: {n} emails in {elapsed:.2f} s, {stub.sessions} TLS sessions, {stub.delivered} delivered")
+
+    server.close()
+    await server.wait_closed()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
@@ -0,0 +1,67 @@
+"""Render cost per verification email: the old inline f-string, a Jinja template
+parsed on every send, the precompiled ``EmailTemplates`` and its batch
+``render_many``. Token signing is left out; it costs the same in every case.
+
+    python -m benchmarks.bench_email_templates [messages]
+"""
+import sys
+import time
+
+from tuition.email_templates import TEMPLATE_DIR, EmailTemplates, VerificationEmail
+
+
+def inline_fstring(link):
+    # The body SmtpMailService.send_verification_email built before templates
+    return f"""
+         <!DOCTYPE html>
+        <html lang="en">
+        <head>
+            <meta charset="UTF-8">
+            <meta name="viewport" content="width=device-width, initial-scale=1.0">
+            <title>Tuitiion Verification</title>
+        </head>
+        <body>
+            <div>
+                <h3>Account verification</h3><br>
+                <p>Welcome to Tuition, Click on the button below to verify your Account</p>
+                <a href="{link}", style="margin-top: 1rem; padding: 1rem; border-radius: 0.5rem; font-size: 1rem;text-decoration: none; background: #27B55B; color: white;">Verify your email</a>
+
+                <p>Kindly ignore the email if you did not sign up for Tuition. Thank you!</p>
+            </div>
+        </body>
+        </html>
+                """
+
+
+def main(n):
+    links = [f"https://tuition.example/student/verify/token{i}" for i in range(n)]
+    contexts = [VerificationEmail(link=link) for link in links]
+
+    def parsed_per_send():
+        # What rendering from the templates folder looks like without a cached environment
+        for context in contexts:
+            templates = EmailTemplates(TEMPLATE_DIR)
+            templates.render(context)
+
+    start = time.perf_counter()
+    templates = EmailTemplates()
+    templates.start()
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    cases = (
+        ("inline f-string", lambda: [inline_fstring(link) for link in links]),
+        ("template parsed per send", parsed_per_send),
+        ("precompiled render", lambda: [templates.render(context) for context in contexts]),
+        ("precompiled render_many", lambda: templates.render_many(contexts)),
+    )
+    print(f"compiling all templates at startup: {compile_ms:.1f} ms")
+    for label, run in cases:
+        run()
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print(f"{label:>26}: {elapsed / n * 1e6:8.1f} us/message")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
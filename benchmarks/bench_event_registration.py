@@ -0,0 +1,136 @@
+"""An open-day rush: students registering for several popular events at once.
+Seats are counted by locking the events table and counting registrations, the
+obvious way to avoid overselling, against the conditional seat update behind
+register_for_event, which only locks the one event's row. Needs
+``BENCH_DATABASE_URL`` pointing at Postgres.
+
+Connections go through a local proxy that holds every packet for ``RTT / 2``
+in each direction, standing in for the network between the app and the
+database; without it both approaches are bound by the client's CPU and a lock
+held for a few microseconds costs nothing.
+
+    python -m benchmarks.bench_event_registration [students] [events] [capacity] [connections]
+"""
+import asyncio
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+from sqlalchemy import func, insert, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.future import select
+
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import BENCH_DATABASE_URL, reset_tables, timer
+from tuition.institution.models import Event, EventRegistration, Institution
+from tuition.security.oauth2 import Principal
+from tuition.student import crud
+from tuition.student.models import Student
+
+RTT = 0.001
+
+
+async def pump(reader, writer):
+    try:
+        while data := await reader.read(65536):
+            await asyncio.sleep(RTT / 2)
+            writer.write(data)
+            await writer.drain()
+    finally:
+        writer.close()
+
+
+async def start_latency_proxy(url):
+    """Forward connections to the database behind ``url`` with added latency, returning the proxied URL."""
+    url = make_url(url)
+    socket_dir = url.query.get("host")
+    port = url.port or 5432
+
+    async def handle(client_reader, client_writer):
+        if socket_dir and socket_dir.startswith("/"):
+            server_reader, server_writer = await asyncio.open_unix_connection(f"{socket_dir}/.s.PGSQL.{port}")
+        else:
+            server_reader, server_writer = await asyncio.open_connection(url.host or "localhost", port)
+        await asyncio.gather(pump(client_reader, server_writer), pump(server_reader, client_writer))
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    proxied = url.difference_update_query(["host"]).set(host="127.0.0.1", port=server.sockets[0].getsockname()[1])
+    return server, proxied
+
+
+async def table_lock(session_factory, event_id, principal):
+    async with session_factory() as db:
+        await db.execute(text("LOCK TABLE events IN SHARE ROW EXCLUSIVE MODE"))
+        capacity = (await db.execute(select(Event.capacity).where(Event.id == event_id))).scalar_one()
+        taken = (await db.execute(
+            select(func.count()).select_from(EventRegistration).where(EventRegistration.event_id == event_id)
+        )).scalar_one()
+        if taken >= capacity:
+            return False
+        db.add(EventRegistration(event_id=event_id, student_id=principal.user.id))
+        await db.commit()
+        return True
+
+
+async def seat_counter(session_factory, event_id, principal):
+    async with session_factory() as db:
+        try:
+            await crud.register_for_event(db, event_id, principal)
+            return True
+        except HTTPException:
+            return False
+
+
+async def seed(engine, students, events, capacity):
+    await reset_tables(engine, Student.__table__, Institution.__table__, Event.__table__, EventRegistration.__table__)
+    now = datetime.now(timezone.utc)
+    event_rows = [
+        {"id": uuid.uuid4(), "name_of_event": f"Open day {i}", "description": "Open day", "location": "Lagos",
+         "start_date": now + timedelta(days=7), "end_date": now + timedelta(days=7, hours=6),
+         "image_url": "https://example.com/e.png", "currency_code": "NGN", "is_free": True, "capacity": capacity}
+        for i in range(events)
+    ]
+    student_rows = [
+        {"id": uuid.uuid4(), "full_name": f"Student {i}", "email": f"student{i}@example.com",
+         "phone_number": "08012345678", "hashed_password": "x", "field_of_interest": "Engineering", "is_verified": True}
+        for i in range(students)
+    ]
+    async with engine.begin() as conn:
+        await conn.execute(insert(Event.__table__), event_rows)
+        await conn.execute(insert(Student.__table__), student_rows)
+    return [row["id"] for row in event_rows], [Principal(role="student", user=Student(**row)) for row in student_rows]
+
+
+async def main(students, events, capacity, connections=50):
+    proxy, url = await start_latency_proxy(BENCH_DATABASE_URL)
+    engine = create_async_engine(url, pool_size=connections, max_overflow=0, pool_timeout=300)
+    session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    print(f"{students} students registering for {events} events of {capacity} seats, "
+          f"{connections} connections, {RTT * 1000:.0f} ms RTT")
+
+    for label, register in (("table lock", table_lock), ("seat counter", seat_counter)):
+        event_ids, principals = await seed(engine, students, events, capacity)
+        rng = random.Random(1)
+        with timer(label, students):
+            results = await asyncio.gather(*(register(session_factory, rng.choice(event_ids), principal)
+                                             for principal in principals))
+        async with session_factory() as db:
+            oversold = (await db.execute(
+                select(func.count()).select_from(
+                    select(EventRegistration.event_id).group_by(EventRegistration.event_id)
+                    .having(func.count() > capacity).subquery()
+                )
+            )).scalar_one()
+        print(f"  {sum(results)} registered, {oversold} events oversold")
+
+    await engine.dispose()
+    proxy.close()
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    asyncio.run(main(*(args + [2000, 20, 50, 50][len(args):])))
@@ -0,0 +1,62 @@
+"""Import cost of ``tuition.main`` measured with ``python -X importtime``.
+
+Each run is a fresh interpreter. Prints the median cumulative import time of
+``tuition.main`` and the heaviest packages it pulled in on the last run. Pass
+``--no-env`` to import without any settings in the environment, which only
+works while nothing reads them at import time.
+
+    python -m benchmarks.bench_import [runs] [--no-env]
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.common import _DEFAULT_SETTINGS
+
+TOP = 10
+
+
+def parse(stderr):
+    """Return {module: (self_us, cumulative_us)} from -X importtime output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if self_us.isdigit():
+            modules[name] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def run_once(with_env):
+    env = {"PATH": os.environ.get("PATH", ""), "PYTHONPATH": os.getcwd()}
+    if with_env:
+        env.update(_DEFAULT_SETTINGS)
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import tuition.main"],
+        env=env, capture_output=True, text=True,
+    )
+    if out.returncode != 0:
+        sys.exit(out.stderr.strip().splitlines()[-1])
+    return parse(out.stderr)
+
+
+def main(runs, with_env):
+    samples = [run_once(with_env) for _ in range(runs)]
+    total = statistics.median(s["tuition.main"][1] for s in samples)
+    print(f"tuition.main: {total / 1000:.1f} ms cumulative (median of {runs})")
+
+    last = samples[-1]
+    top_level = {}
+    for name, (self_us, _) in last.items():
+        package = name.split(".")[0]
+        top_level[package] = top_level.get(package, 0) + self_us
+    print(f"heaviest packages by self time, last run:")
+    for package, self_us in sorted(top_level.items(), key=lambda item: -item[1])[:TOP]:
+        print(f"  {package:<24} {self_us / 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    main(int(args[0]) if args else 5, "--no-env" not in sys.argv)
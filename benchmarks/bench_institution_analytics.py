@@ -0,0 +1,189 @@
+"""An institution's dashboard figures: aggregated from ``applications`` and
+``transactions`` on every load, against reading the summary tables that
+``record_*`` keeps up to date. Also times the cost the counters add to each
+write, the periodic rebuild, and checks that counters written while a rebuild
+runs still match a fresh aggregate. Needs ``BENCH_DATABASE_URL`` pointing at
+Postgres for realistic plans and locking.
+
+    python -m benchmarks.bench_institution_analytics [transactions] [dashboard loads]
+"""
+import asyncio
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert
+from sqlalchemy.future import select
+
+from benchmarks.common import make_engine, reset_tables, timer
+from tuition.analytics import (InstitutionPaymentStats, ProgramStats, get_institution_analytics,
+                               record_payment_created, rebuild_summaries)
+from tuition.institution.models import Institution, Program
+from tuition.student.models import Application, Student, Transaction
+
+START = datetime(2024, 1, 1)
+INSTITUTIONS = 500
+PROGRAMS_PER_INSTITUTION = 10
+STUDENTS = 100000
+APPLICATIONS_PER_STUDENT = 10
+BATCH = 10000
+
+
+async def insert_batches(conn, table, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH:
+            await conn.execute(insert(table), batch)
+            batch = []
+    if batch:
+        await conn.execute(insert(table), batch)
+
+
+async def seed(engine, n):
+    await reset_tables(engine, Student.__table__, Institution.__table__, Program.__table__, Application.__table__,
+                       Transaction.__table__, ProgramStats.__table__, InstitutionPaymentStats.__table__)
+    rng = random.Random(1)
+    institution_ids = [uuid.uuid4() for _ in range(INSTITUTIONS)]
+    programs = [(uuid.uuid4(), institution_id) for institution_id in institution_ids
+                for _ in range(PROGRAMS_PER_INSTITUTION)]
+    # A few large institutions take most of the payments, as on the platform
+    weights = [1 / (rank + 1) for rank in range(INSTITUTIONS)]
+    async with engine.begin() as conn:
+        await conn.execute(insert(Institution.__table__), [
+            {"id": institution_id, "name_of_institution": f"Institution {i}", "type_of_institution": "University",
+             "email": f"institution{i}@example.com", "country": "Nigeria", "official_name": f"Institution {i}",
+             "brief_description": "An institution", "hashed_password": "x", "is_verified": True}
+            for i, institution_id in enumerate(institution_ids)
+        ])
+        await conn.execute(insert(Program.__table__), [
+            {"id": program_id, "name_of_program": f"Program {i}", "program_level": "Undergraduate",
+             "always_available": True, "cost": 50000, "currency_code": "NGN", "image_url": "https://example.com/p.png",
+             "institution_id": institution_id}
+            for i, (program_id, institution_id) in enumerate(programs)
+        ])
+        student_ids = [uuid.uuid4() for _ in range(STUDENTS)]
+        await insert_batches(conn, Student.__table__, (
+            {"id": student_id, "full_name": "Student", "email": f"student{i}@example.com",
+             "phone_number": "08012345678", "hashed_password": "x", "field_of_interest": "Engineering"}
+            for i, student_id in enumerate(student_ids)
+        ))
+        await insert_batches(conn, Application.__table__, (
+            {"id": uuid.uuid4(), "student_id": student_id, "application_type_id": program_id,
+             "application_type": "program", "status": "Pending", "application_date": START, "updated_date": START}
+            for student_id in student_ids
+            for program_id, _ in rng.sample(programs, APPLICATIONS_PER_STUDENT)
+        ))
+        payers = rng.choices(institution_ids, weights, k=n)
+        await insert_batches(conn, Transaction.__table__, (
+            {"id": uuid.uuid4(), "title": "Tuition", "description": "Tuition", "transaction_type": "program_payment",
+             "amount": rng.choice([25000, 50000, 75000, 100000]), "currency": rng.choice(["NGN", "NGN", "NGN", "USD"]),
+             "payment_method": "flutterwave", "student_name": "Student", "institution_id": institution_id,
+             "status": rng.choice(["pending", "successful", "successful", "failed"]),
+             "transaction_date": START + timedelta(seconds=rng.randint(0, 180 * 86400))}
+            for institution_id in payers
+        ))
+        if engine.dialect.name == "postgresql":
+            await conn.exec_driver_sql("ANALYZE")
+    return institution_ids
+
+
+async def aggregate_on_the_fly(db, institution_id):
+    programs = (await db.execute(
+        select(Program.id, Program.name_of_program, func.count(Application.id))
+        .outerjoin(Application, Application.application_type_id == Program.id)
+        .where(Program.institution_id == institution_id)
+        .group_by(Program.id, Program.name_of_program)
+    )).all()
+    payments = (await db.execute(
+        select(Transaction.currency,
+               func.count().filter(Transaction.status == "pending"),
+               func.count().filter(Transaction.status == "successful"),
+               func.coalesce(func.sum(Transaction.amount).filter(Transaction.status == "successful"), 0))
+        .where(Transaction.institution_id == institution_id)
+        .group_by(Transaction.currency)
+    )).all()
+    return programs, payments
+
+
+async def new_payment(session_factory, institution_id, counted):
+    async with session_factory() as db:
+        db.add(Transaction(title="Tuition", description="Tuition", transaction_type="program_payment", amount=50000,
+                           currency="NGN", institution_id=institution_id, status="pending"))
+        await db.flush()
+        if counted:
+            await record_payment_created(db, institution_id, "NGN")
+        await db.commit()
+
+
+async def payment_totals(db):
+    return sorted((await db.execute(
+        select(Transaction.institution_id, Transaction.currency, func.count().filter(Transaction.status == "pending"))
+        .where(Transaction.institution_id.isnot(None))
+        .group_by(Transaction.institution_id, Transaction.currency)
+    )).all())
+
+
+async def main(n, loads):
+    engine, session_factory = make_engine()
+    with timer("seed"):
+        institution_ids = await seed(engine, n)
+    print(f"{n} transactions, {STUDENTS * APPLICATIONS_PER_STUDENT} applications, {INSTITUTIONS} institutions")
+
+    async with session_factory() as db:
+        with timer("initial rebuild"):
+            await rebuild_summaries(db)
+
+    rng = random.Random(2)
+    # Dashboards are opened roughly in proportion to an institution's activity
+    sample = rng.choices(institution_ids, [1 / (rank + 1) for rank in range(INSTITUTIONS)], k=loads)
+    largest = institution_ids[0]
+    async with session_factory() as db:
+        with timer("aggregate on the fly", len(sample)):
+            for institution_id in sample:
+                await aggregate_on_the_fly(db, institution_id)
+        with timer("read summary tables", len(sample)):
+            for institution_id in sample:
+                await get_institution_analytics(db, institution_id)
+        with timer("largest institution, aggregate on the fly", 20):
+            for _ in range(20):
+                await aggregate_on_the_fly(db, largest)
+        with timer("largest institution, read summary tables", 20):
+            for _ in range(20):
+                await get_institution_analytics(db, largest)
+
+    writes = 2000
+    with timer("payment insert without counter", writes):
+        for i in range(writes):
+            await new_payment(session_factory, institution_ids[i % INSTITUTIONS], counted=False)
+    async with session_factory() as db:
+        await rebuild_summaries(db)
+    with timer("payment insert with counter", writes):
+        for i in range(writes):
+            await new_payment(session_factory, institution_ids[i % INSTITUTIONS], counted=True)
+
+    # Writers keep counting while a full rebuild runs; nothing may be lost or counted twice
+    async def writer(worker):
+        for i in range(200):
+            await new_payment(session_factory, institution_ids[(worker + i) % 50], counted=True)
+
+    async def rebuild():
+        async with session_factory() as db:
+            await rebuild_summaries(db)
+
+    with timer("rebuild under 20 concurrent writers"):
+        await asyncio.gather(*(writer(worker) for worker in range(20)), rebuild())
+    async with session_factory() as db:
+        counters = sorted((await db.execute(
+            select(InstitutionPaymentStats.institution_id, InstitutionPaymentStats.currency,
+                   InstitutionPaymentStats.pending_transactions)
+        )).all())
+        expected = await payment_totals(db)
+    print(f"counters match a fresh aggregate: {[tuple(row) for row in counters] == [tuple(row) for row in expected]}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000000, int(sys.argv[2]) if len(sys.argv) > 2 else 200))
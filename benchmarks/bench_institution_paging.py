@@ -0,0 +1,76 @@
+"""Latency of fetching page 1000 of the institution listing, offset vs keyset.
+
+    python -m benchmarks.bench_institution_paging [rows]
+"""
+import asyncio
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert
+from sqlalchemy.future import select
+
+from benchmarks.common import make_engine, reset_tables, timer
+from tuition.institution.models import Institution
+from tuition.src_utils import paginate_by_cursor, encode_cursor
+
+LIMIT = 10
+PAGE = 1000
+REPEAT = 20
+
+
+async def seed(session_factory, rows):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    batch = []
+    async with session_factory() as db:
+        for i in range(rows):
+            batch.append({
+                "id": uuid.uuid4(), "role": "user", "name_of_institution": f"Institution {i}",
+                "type_of_institution": "University", "website": "https://example.com", "address": "1 Road",
+                "email": f"inst{i}@bench.io", "country": "Nigeria", "official_name": f"Institution {i}",
+                "brief_description": "Benchmark institution", "is_verified": True, "hashed_password": "x",
+                "created_at": start + timedelta(seconds=i), "updated_at": start,
+            })
+            if len(batch) == 5000:
+                await db.execute(insert(Institution), batch)
+                batch = []
+        if batch:
+            await db.execute(insert(Institution), batch)
+        await db.commit()
+
+
+async def main(rows):
+    engine, session_factory = make_engine()
+    await reset_tables(engine, Institution.__table__)
+    await seed(session_factory, rows)
+
+    async with session_factory() as db:
+        offset = (PAGE - 1) * LIMIT
+        offset_stmt = (select(Institution)
+                       .order_by(Institution.created_at.desc(), Institution.id.desc())
+                       .offset(offset).limit(LIMIT))
+
+        # Cursor a client would hold after reading page 999
+        previous = (await db.execute(
+            select(Institution).order_by(Institution.created_at.desc(), Institution.id.desc()).offset(offset - 1).limit(1)
+        )).scalar_one()
+        cursor = encode_cursor(previous.created_at, previous.id)
+        keyset_stmt = paginate_by_cursor(select(Institution), Institution.created_at, Institution.id, cursor, LIMIT)
+
+        offset_rows = (await db.execute(offset_stmt)).scalars().all()
+        keyset_rows = (await db.execute(keyset_stmt)).scalars().all()[:LIMIT]
+        assert [r.id for r in offset_rows] == [r.id for r in keyset_rows]
+
+        print(f"{rows} institutions, page {PAGE}, limit {LIMIT}")
+        with timer("offset", REPEAT):
+            for _ in range(REPEAT):
+                (await db.execute(offset_stmt)).scalars().all()
+        with timer("keyset", REPEAT):
+            for _ in range(REPEAT):
+                (await db.execute(keyset_stmt)).scalars().all()
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000))
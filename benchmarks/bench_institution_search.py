@@ -0,0 +1,119 @@
+"""Institution search over a seeded table: legacy name ILIKE vs indexed search.
+
+Run against Postgres to exercise the tsvector/trigram indexes; on SQLite the
+search falls back to ILIKE and both timings are sequential scans.
+
+    BENCH_DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.bench_institution_search [rows]
+"""
+import asyncio
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.future import select
+
+from benchmarks.common import make_engine, reset_tables, timer
+from tuition.institution.models import Institution
+from tuition.institution.utils import TrigramSupport, ranked_institution_search
+
+REPEAT = 20
+KINDS = ["University", "Polytechnic", "College of Education", "Institute of Technology", "Medical School"]
+FOCUS = ["Science", "Arts", "Medicine", "Business", "Engineering", "Law", "Agriculture"]
+COUNTRIES = ["Nigeria", "Ghana", "Kenya", "South Africa", "Egypt"]
+SYLLABLES = ["ba", "ko", "la", "gos", "nu", "di", "ke", "ma", "ri", "so", "tu", "wa", "ye", "zo", "fe", "ga"]
+
+
+def make_vocabulary(rng, size=3000):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize())
+    return sorted(words)
+
+# Mirrors alembic revision 7d2b8e5c1f93; the trigram index is only created when pg_trgm is available
+PG_TRIGRAM_DDL = "CREATE INDEX ix_institutions_name_trgm ON institutions USING gin (name_of_institution gin_trgm_ops)"
+PG_SEARCH_DDL = [
+    """ALTER TABLE institutions ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name_of_institution, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(official_name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(country, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(brief_description, '')), 'C')) STORED""",
+    "CREATE INDEX ix_institutions_search_vector ON institutions USING gin (search_vector)",
+]
+
+
+async def seed(engine, session_factory, rows):
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(rng)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    async with session_factory() as db:
+        batch = []
+        for i in range(rows):
+            name = f"{rng.choice(vocabulary)} {rng.choice(vocabulary)} {rng.choice(KINDS)}"
+            batch.append({
+                "id": uuid.uuid4(), "role": "user", "name_of_institution": name,
+                "type_of_institution": "University", "website": "https://example.com", "address": "1 Road",
+                "email": f"inst{i}@bench.io", "country": rng.choice(COUNTRIES), "official_name": f"The {name}",
+                "brief_description": f"{rng.choice(FOCUS)} focused institution", "is_verified": True,
+                "hashed_password": "x", "created_at": start + timedelta(seconds=i), "updated_at": start,
+            })
+            if len(batch) == 5000:
+                await db.execute(insert(Institution), batch)
+                batch = []
+        if batch:
+            await db.execute(insert(Institution), batch)
+        await db.commit()
+
+    if engine.dialect.name == "postgresql":
+        async with engine.begin() as conn:
+            try:
+                async with conn.begin_nested():
+                    await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                statements = PG_SEARCH_DDL + [PG_TRIGRAM_DDL]
+            except DBAPIError:
+                statements = PG_SEARCH_DDL
+            for statement in statements:
+                await conn.execute(text(statement))
+            await conn.execute(text("ANALYZE institutions"))
+    return vocabulary
+
+
+async def main(rows):
+    engine, session_factory = make_engine()
+    await reset_tables(engine, Institution.__table__)
+    vocabulary = await seed(engine, session_factory, rows)
+    print(f"{rows} institutions on {engine.dialect.name}")
+
+    rng = random.Random(7)
+    # A half-typed name, a full two-word name, a country and a broad term
+    queries = [
+        rng.choice(vocabulary)[:4],
+        f"{rng.choice(vocabulary)} {rng.choice(vocabulary)}",
+        "Kenya",
+        "University",
+    ]
+
+    async with session_factory() as db:
+        trigram = await TrigramSupport().check(db)
+        print(f"pg_trgm {'available' if trigram else 'not available'}")
+        for query in queries:
+            legacy = (select(Institution)
+                      .filter(Institution.name_of_institution.ilike(f"%{query}%"))
+                      .order_by(Institution.id.desc()).limit(10))
+            ranked = ranked_institution_search(engine.dialect.name, query, 0, 10, trigram)
+
+            print(f"query {query!r}")
+            with timer("  legacy ilike", REPEAT):
+                for _ in range(REPEAT):
+                    (await db.execute(legacy)).scalars().all()
+            with timer("  search     ", REPEAT):
+                for _ in range(REPEAT):
+                    (await db.execute(ranked)).scalars().all()
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000))
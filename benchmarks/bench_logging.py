@@ -0,0 +1,103 @@
+"""Request-path cost of logging: off, direct syslog, queued, and queued with sampling.
+
+Each simulated request makes the same info calls as an institution listing
+(two from ``fetch_institutions`` plus the lookup in ``get_institution_by_email``),
+all shipping to a ``UDPSink`` in a separate process so its receive loop
+doesn't compete with the callers for the GIL. The sink is addressed by host
+name, as Papertrail is. Requests arrive in bursts on one thread, as they would
+on a worker's event loop, with a short idle gap between bursts. Only time
+spent inside requests is counted.
+
+    python -m benchmarks.bench_logging [bursts] [burst_size]
+"""
+import logging
+import multiprocessing
+import sys
+import time
+from logging.handlers import SysLogHandler
+
+from benchmarks.common import _DEFAULT_SETTINGS  # noqa: F401  (settings defaults)
+from tuition.logger import HOT_LOGGER_NAME, LogPipeline, UDPSink, formatter
+
+IDLE_GAP = 0.02
+
+app_log = logging.getLogger("bench.app")
+hot_log = logging.getLogger(f"{HOT_LOGGER_NAME}.bench")
+
+
+def request(i):
+    hot_log.info(f"Fetching institutions with page {i} and limit 10")
+    hot_log.info("get_institution_by_email: %s", "found")
+    hot_log.info(f"Fetched 10 institutions")
+    if i % 100 == 0:
+        app_log.warning("Student not verified")
+
+
+def serve_sink(address_out, count_out, stop):
+    sink = UDPSink().start()
+    address_out.put(sink.address[1])
+    while True:
+        stop.get()
+        count_out.put(len(sink.messages))
+
+
+class RemoteSink:
+    def __init__(self):
+        ctx = multiprocessing.get_context("spawn")
+        self._address, self._counts, self._stop = ctx.Queue(), ctx.Queue(), ctx.Queue()
+        self.process = ctx.Process(target=serve_sink, args=(self._address, self._counts, self._stop), daemon=True)
+        self.process.start()
+        self.address = ("localhost", self._address.get())
+
+    def received(self):
+        self._stop.put(None)
+        return self._counts.get()
+
+    def close(self):
+        self.process.terminate()
+
+
+def run(label, bursts, burst_size, sink, pipeline=None):
+    before = sink.received()
+    busy = 0.0
+    for b in range(bursts):
+        start = time.perf_counter()
+        for i in range(b * burst_size, (b + 1) * burst_size):
+            request(i)
+        busy += time.perf_counter() - start
+        time.sleep(IDLE_GAP)
+    if pipeline:
+        pipeline.close()
+    time.sleep(0.2)
+    n = bursts * burst_size
+    delivered = sink.received() - before
+    extra = f", {pipeline.stats()}" if pipeline else ""
+    print(f"{label}: {n / busy:,.0f} req/s ({busy / n * 1e6:.1f} us/request), {delivered} datagrams{extra}")
+
+
+def main(bursts, burst_size):
+    root = logging.getLogger()
+    sink = RemoteSink()
+
+    root.setLevel(logging.CRITICAL)
+    run("logging off", bursts, burst_size, sink)
+    root.setLevel(logging.INFO)
+
+    direct = SysLogHandler(address=sink.address)
+    direct.setFormatter(formatter)
+    root.addHandler(direct)
+    run("direct SysLogHandler", bursts, burst_size, sink)
+    root.removeHandler(direct)
+    direct.close()
+
+    for label, rate in (("queued", 1.0), ("queued, hot INFO sampled at 10%", 0.1)):
+        pipeline = LogPipeline(sink.address, queue_size=10000, info_sample_rate=rate)
+        pipeline.start()
+        run(label, bursts, burst_size, sink, pipeline)
+
+    sink.close()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*(args + [50, 500][len(args):]))
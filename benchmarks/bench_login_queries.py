@@ -0,0 +1,73 @@
+"""Queries issued per /auth/login, before and after the unified account lookup.
+
+    python -m benchmarks.bench_login_queries
+"""
+import asyncio
+from types import SimpleNamespace
+
+from benchmarks.common import make_engine, reset_tables, QueryCounter
+
+from tuition.security.hash import Hash
+from tuition.student.models import Student
+from tuition.institution.models import Institution
+from tuition.admin.models import Admin
+from tuition.student import crud as crud_student
+from tuition.institution import crud as crud_institution
+from tuition.admin import crud as admin_crud
+import tuition.student.utils as student_utils
+import tuition.institution.utils as institution_utils
+import tuition.admin.utils as admin_utils
+from tuition.main import login
+
+PASSWORD = "Bench#Pass123"
+ROUNDS = 5
+
+
+async def legacy_login(db, payload):
+    """The /auth/login flow as it was before get_account_by_email."""
+    if await student_utils.get_student_by_email(db, payload.username):
+        return await crud_student.login_student(db, payload)
+    if await institution_utils.get_institution_by_email(db, payload.username):
+        return await crud_institution.login_institution(db, payload)
+    if await admin_utils.get_admin_by_email(db, payload.username):
+        return await admin_crud.login_admin(db, payload)
+
+
+async def seed(session_factory):
+    hashed = Hash.bcrypt(PASSWORD)
+    async with session_factory() as db:
+        db.add_all([
+            Student(full_name="Bench Student", email="student@bench.io", phone_number="08000000000",
+                    hashed_password=hashed, field_of_interest="Engineering", is_verified=True),
+            Institution(name_of_institution="Bench University", type_of_institution="University",
+                        website="https://bench.io", address="1 Bench Road", email="institution@bench.io",
+                        country="Nigeria", official_name="Bench University", brief_description="A benchmark school",
+                        hashed_password=hashed, is_verified=True),
+            Admin(full_name="Bench Admin", email="admin@bench.io", hashed_password=hashed),
+        ])
+        await db.commit()
+
+
+async def main():
+    engine, session_factory = make_engine()
+    await reset_tables(engine, Student.__table__, Institution.__table__, Admin.__table__)
+    await seed(session_factory)
+
+    print(f"{'role':<12}{'before':>8}{'after':>8}  (queries per login)")
+    for role in ("student", "institution", "admin"):
+        payload = SimpleNamespace(username=f"{role}@bench.io", password=PASSWORD)
+        counts = []
+        for handler in (legacy_login, login):
+            async with session_factory() as db:
+                with QueryCounter(engine) as counter:
+                    for _ in range(ROUNDS):
+                        await handler(db, payload)
+                        db.expunge_all()
+            counts.append(counter.count / ROUNDS)
+        print(f"{role:<12}{counts[0]:>8.1f}{counts[1]:>8.1f}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
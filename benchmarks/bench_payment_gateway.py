@@ -0,0 +1,93 @@
+"""Concurrent payment initiations against a local Flutterwave stub.
+
+Compares the old blocking ``httpx.post`` per request with the pooled
+``PaymentGateway``. The stub adds a fixed delay to stand in for the real
+gateway's round trip and counts the TCP connections it accepts.
+
+Initiations are fired in rounds of ``concurrency`` requests at once.
+
+    python -m benchmarks.bench_payment_gateway [concurrency]
+"""
+import asyncio
+import sys
+import threading
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+
+from benchmarks.common import _DEFAULT_SETTINGS  # noqa: F401  (settings defaults)
+from tuition.src_utils import PaymentGateway
+
+PORT = 8765
+GATEWAY_DELAY = 0.05
+BASE_URL = f"http://127.0.0.1:{PORT}/v3"
+
+stub = FastAPI()
+connections = set()
+
+
+@stub.post("/v3/payments")
+async def payments(request: Request):
+    connections.add(request.scope["client"])
+    await asyncio.sleep(GATEWAY_DELAY)
+    payload = await request.json()
+    return {"status": "success", "data": {"link": f"https://checkout.local/{payload['tx_ref']}"}}
+
+
+def start_stub():
+    server = uvicorn.Server(uvicorn.Config(stub, host="127.0.0.1", port=PORT, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def payload(i):
+    return {"tx_ref": f"FLW_bench_{i}", "amount": 1000.0, "currency": "NGN"}
+
+
+async def blocking_initiations(n, rounds):
+    async def initiate(i):
+        response = httpx.post(f"{BASE_URL}/payments", json=payload(i), headers={})
+        response.raise_for_status()
+        return response.json()
+
+    results = []
+    for _ in range(rounds):
+        results += await asyncio.gather(*(initiate(i) for i in range(n)))
+    return results
+
+
+async def pooled_initiations(n, rounds):
+    gateway = PaymentGateway(BASE_URL, timeout=30, connect_timeout=5, max_connections=100,
+                             max_keepalive=20, max_retries=2, backoff=0.5)
+    results = []
+    try:
+        for _ in range(rounds):
+            results += await asyncio.gather(*(gateway.post("/payments", payload(i), {}) for i in range(n)))
+    finally:
+        await gateway.close()
+    return results
+
+
+ROUNDS = 5
+
+
+async def main(n):
+    server = start_stub()
+    for label, run in (("blocking httpx.post", blocking_initiations), ("pooled AsyncClient", pooled_initiations)):
+        connections.clear()
+        start = time.perf_counter()
+        results = await run(n, ROUNDS)
+        elapsed = time.perf_counter() - start
+        n_total = n * ROUNDS
+        assert len(results) == n_total
+        print(f"{label:<20} {ROUNDS}x{n} initiations in {elapsed:6.2f} s  ({n_total / elapsed:7.1f}/s, {len(connections)} connections)")
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 50))
@@ -0,0 +1,103 @@
+"""A peak-season burst of Flutterwave webhooks: handling each event in its own
+transaction against the batched PaymentReconciler. Events arrive concurrently,
+a tenth of them redeliveries, and every handler waits for its event to be
+committed before it would answer the gateway.
+
+    python -m benchmarks.bench_payment_webhooks [events] [concurrency]
+"""
+import asyncio
+import json
+import random
+import sys
+
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.future import select
+
+from benchmarks.common import make_engine, reset_tables, QueryCounter, timer
+from tuition.payments import PaymentEvent, PaymentReconciler, parse_charge_event
+from tuition.institution.models import Institution
+from tuition.student.models import Student, Transaction
+
+
+async def per_event(session_factory, event):
+    """One transaction per webhook: look the event up, store it, settle its payment."""
+    async with session_factory() as db:
+        existing = (await db.execute(select(PaymentEvent).where(PaymentEvent.tx_ref == event["tx_ref"]))).scalar_one_or_none()
+        if existing is not None and existing.status == event["status"]:
+            return False
+        if existing is None:
+            db.add(PaymentEvent(**event))
+        else:
+            existing.status = event["status"]
+        try:
+            await db.execute(
+                update(Transaction)
+                .where(Transaction.tx_ref == event["tx_ref"], Transaction.status == "pending",
+                       Transaction.amount <= event["amount"], Transaction.currency == event["currency"])
+                .values(status=event["status"])
+            )
+            await db.commit()
+        except IntegrityError:
+            # A concurrent redelivery stored the event first
+            await db.rollback()
+            return False
+        return True
+
+
+async def seed(engine, session_factory, n):
+    await reset_tables(engine, Student.__table__, Institution.__table__, Transaction.__table__, PaymentEvent.__table__)
+    async with session_factory() as db:
+        db.add_all([Transaction(title="Tuition", description="Tuition", transaction_type="program_payment",
+                                amount=1000, currency="NGN", tx_ref=f"FLW_{i}") for i in range(n)])
+        await db.commit()
+
+
+def webhook_events(n):
+    rng = random.Random(1)
+    refs = list(range(n)) + rng.sample(range(n), n // 10)
+    rng.shuffle(refs)
+    return [
+        parse_charge_event(json.dumps({"event": "charge.completed", "data": {
+            "id": i, "tx_ref": f"FLW_{ref}", "flw_ref": f"FLW-MOCK-{ref}", "amount": 1000, "currency": "NGN",
+            "status": "successful"}}))
+        for i, ref in enumerate(refs)
+    ]
+
+
+async def burst(handle, events, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def deliver(event):
+        async with semaphore:
+            return await handle(event)
+
+    return await asyncio.gather(*(deliver(event) for event in events))
+
+
+async def main(n, concurrency):
+    engine, session_factory = make_engine()
+    events = webhook_events(n)
+    print(f"{len(events)} webhooks for {n} payments, {concurrency} in flight")
+
+    reconciler = PaymentReconciler(session_factory, batch_size=200, max_delay=0.02, queue_size=len(events))
+    cases = (
+        ("transaction per event", lambda event: per_event(session_factory, event)),
+        ("batched reconciler", reconciler.submit),
+    )
+    for label, handle in cases:
+        await seed(engine, session_factory, n)
+        with QueryCounter(engine) as counter, timer(label, len(events)):
+            await burst(handle, events, concurrency)
+        async with session_factory() as db:
+            settled = (await db.execute(
+                select(func.count()).select_from(Transaction).where(Transaction.status == "successful")
+            )).scalar_one()
+        print(f"  {len(events) / (counter.count or 1):.1f} events per statement, {settled} settled")
+    await reconciler.close()
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000, int(sys.argv[2]) if len(sys.argv) > 2 else 50))
@@ -0,0 +1,79 @@
+"""Program lookups behind apply_for_program and create_payment, straight from
+the database against the program catalogue cache. Requests pick programs from a
+small hot set, as students applying to popular programs would. Needs
+``BENCH_DATABASE_URL`` pointing at Postgres: the programs deadline check calls
+``now()``, which SQLite lacks.
+
+    python -m benchmarks.bench_program_catalogue [requests] [programs]
+"""
+import asyncio
+import random
+import sys
+
+from sqlalchemy.future import select
+
+from benchmarks.common import make_engine, reset_tables, QueryCounter, timer
+from tuition.institution.models import Category, Institution, Program, SubAccount, program_category_association
+from tuition.institution.utils import ProgramCatalogue
+from tuition.services import services
+import tuition.institution.utils as institution_utils
+import tuition.src_utils as src_utils
+
+
+async def legacy_lookups(db, program_id):
+    """What apply_for_program and create_payment queried before the catalogue."""
+    program = (await db.execute(select(Program).filter(Program.id == program_id))).scalar_one_or_none()
+    program = (await db.execute(select(Program).filter(Program.id == program_id))).scalar_one_or_none()
+    subaccount = (await db.execute(
+        select(SubAccount).filter(SubAccount.institution_id == program.institution_id)
+    )).scalar_one_or_none()
+    return program.cost, subaccount.subaccount_id
+
+
+async def catalogue_lookups(db, program_id):
+    program_json = await src_utils.get_program_by_id(db, program_id)
+    program = await institution_utils.get_program_by_id(db, program_id)
+    return program_json["cost"], program.subaccount.subaccount_id
+
+
+async def seed(session_factory, programs):
+    async with session_factory() as db:
+        institution = Institution(name_of_institution="Bench University", type_of_institution="University",
+                                  email="institution@bench.io", country="Nigeria", official_name="Bench University",
+                                  brief_description="A benchmark school", hashed_password="x", is_verified=True)
+        db.add(institution)
+        await db.flush()
+        db.add(SubAccount(institution_id=institution.id, subaccount_id="RS_bench", account_name="Bench",
+                          account_number="0123456789", country="NG", currency="NGN", bank_name="Bench Bank"))
+        categories = [Category(name=f"Category {i}") for i in range(5)]
+        rows = [Program(name_of_program=f"Program {i}", program_level="Undergraduate", always_available=True,
+                        cost=1000, currency_code="NGN", image_url="https://example.com/p.png",
+                        institution_id=institution.id, subaccount_id="RS_bench", categories=categories[:3])
+                for i in range(programs)]
+        db.add_all(rows)
+        await db.commit()
+        return [row.id for row in rows]
+
+
+async def main(requests, programs):
+    engine, session_factory = make_engine()
+    await reset_tables(engine, Institution.__table__, SubAccount.__table__, Program.__table__,
+                       Category.__table__, program_category_association)
+    program_ids = await seed(session_factory, programs)
+    hot = random.Random(1).choices(program_ids, k=requests)
+
+    print(f"{requests} requests over {programs} programs")
+    with services.overridden(program_catalogue=ProgramCatalogue(maxsize=1000, ttl=60)):
+        for label, lookups in (("database", legacy_lookups), ("catalogue", catalogue_lookups)):
+            with QueryCounter(engine) as counter, timer(label, requests):
+                for program_id in hot:
+                    async with session_factory() as db:
+                        await lookups(db, program_id)
+            print(f"  {counter.count / requests:.2f} statements per request")
+        print(f"  catalogue: {services.get('program_catalogue').stats()}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000, int(sys.argv[2]) if len(sys.argv) > 2 else 50))
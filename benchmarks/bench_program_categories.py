@@ -0,0 +1,91 @@
+"""Statements, transactions and latency of creating a program with categories,
+the old per-name lookups and two commits against one IN lookup (cached after
+the first program) and a single commit. Needs ``BENCH_DATABASE_URL`` pointing
+at Postgres: the programs deadline check calls ``now()``, which SQLite lacks.
+
+    python -m benchmarks.bench_program_categories [programs] [categories]
+"""
+import asyncio
+import sys
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event
+from sqlalchemy.future import select
+
+from benchmarks.common import make_engine, reset_tables, QueryCounter
+from tuition.institution.models import Category, Institution, Program, SubAccount, program_category_association
+import tuition.institution.utils as institution_utils
+from tuition.institution.utils import CategoryCache
+from tuition.services import services
+
+
+def program_payload(i):
+    return {
+        "name_of_program": f"Program {i}", "program_level": "Undergraduate", "always_available": False,
+        "application_deadline": datetime.now(timezone.utc) + timedelta(days=30), "cost": 1000, "is_free": False,
+        "currency_code": "NGN", "description": "Benchmark program", "image_url": "https://example.com/p.png",
+    }
+
+
+async def legacy_create(db, payload, institution_id, categories):
+    """create_new_program followed by update_category_program_relation as they were."""
+    program = Program(**payload, institution_id=institution_id, subaccount_id="RS_bench")
+    db.add(program)
+    await db.commit()
+    await db.refresh(program)
+
+    rows = []
+    for name in categories:
+        category = (await db.execute(select(Category).filter_by(name=name))).scalar_one_or_none()
+        if category:
+            rows.append({"program_id": program.id, "category_id": category.id})
+    if rows:
+        await db.execute(program_category_association.insert().values(rows))
+    await db.commit()
+
+
+async def current_create(db, payload, institution_id, categories):
+    program = await institution_utils.create_new_program(db, payload, institution_id, "RS_bench")
+    await institution_utils.update_category_program_relation(db, categories, program["id"])
+    await db.commit()
+
+
+async def main(programs, category_count):
+    engine, session_factory = make_engine()
+    await reset_tables(engine, Institution.__table__, SubAccount.__table__, Program.__table__,
+                       Category.__table__, program_category_association)
+    names = [f"Category {i}" for i in range(category_count)]
+    async with session_factory() as db:
+        institution = Institution(name_of_institution="Bench University", type_of_institution="University",
+                                  email="institution@bench.io", country="Nigeria", official_name="Bench University",
+                                  brief_description="A benchmark school", hashed_password="x", is_verified=True)
+        db.add(institution)
+        db.add_all([Category(name=name) for name in names])
+        await db.commit()
+        institution_id = institution.id
+
+    commits = 0
+
+    def on_commit(conn):
+        nonlocal commits
+        commits += 1
+
+    event.listen(engine.sync_engine, "commit", on_commit)
+    print(f"{programs} programs with {category_count} categories each")
+    with services.overridden(category_cache=CategoryCache()):
+        for label, create in (("before", legacy_create), ("after", current_create)):
+            commits = 0
+            start = asyncio.get_running_loop().time()
+            with QueryCounter(engine) as counter:
+                for i in range(programs):
+                    async with session_factory() as db:
+                        await create(db, program_payload(i), institution_id, names)
+            elapsed = asyncio.get_running_loop().time() - start
+            print(f"{label:>6}: {counter.count / programs:.1f} statements, {commits / programs:.1f} commits, "
+                  f"{elapsed * 1000 / programs:.2f} ms per program")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200, int(sys.argv[2]) if len(sys.argv) > 2 else 5))
@@ -0,0 +1,98 @@
+"""Listing the programs at one level: everything at once, as the fetch_program
+SQL function returned them, against pages from fetch_programs_page. Also times
+a page deep into the listing, reached by OFFSET and by cursor. Needs
+``BENCH_DATABASE_URL`` pointing at Postgres: the programs deadline check calls
+``now()``, which SQLite lacks.
+
+    python -m benchmarks.bench_program_listing [programs] [page size]
+"""
+import asyncio
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import or_
+from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload
+
+from benchmarks.common import make_engine, reset_tables, QueryCounter, timer
+from tuition.institution.models import Category, Institution, Program, program_category_association
+from tuition.institution.schemas import ProgramLevel
+from tuition.security.oauth2 import Principal
+from tuition.student.models import Student
+import tuition.src_utils as src_utils
+
+ROUNDS = 20
+
+
+def open_programs(level):
+    return (
+        select(Program)
+        .where(Program.program_level == level,
+               or_(Program.always_available.is_(True), Program.application_deadline > datetime.now(timezone.utc)))
+        .options(selectinload(Program.categories))
+    )
+
+
+async def whole_level(db, level, limit):
+    return (await db.execute(open_programs(level))).scalars().all()
+
+
+async def offset_page(db, level, limit, offset):
+    stmt = open_programs(level).order_by(Program.application_deadline.asc().nulls_last(), Program.id)
+    return (await db.execute(stmt.offset(offset).limit(limit))).scalars().all()
+
+
+async def seed(session_factory, programs):
+    levels = [level.value for level in ProgramLevel]
+    rng = random.Random(1)
+    now = datetime.now(timezone.utc)
+    async with session_factory() as db:
+        categories = [Category(name=f"Category {i}") for i in range(10)]
+        db.add_all(categories)
+        for start in range(0, programs, 5000):
+            db.add_all([
+                Program(name_of_program=f"Program {i}", program_level=levels[i % len(levels)],
+                        application_deadline=None if i % 5 == 0 else now + timedelta(days=rng.randint(1, 365)),
+                        always_available=i % 5 == 0, is_free=i % 7 == 0, cost=None if i % 7 == 0 else 1000,
+                        currency_code="NGN", image_url="https://example.com/p.png",
+                        categories=rng.sample(categories, 2))
+                for i in range(start, min(start + 5000, programs))
+            ])
+            await db.flush()
+        await db.commit()
+
+
+async def main(programs, limit):
+    engine, session_factory = make_engine()
+    await reset_tables(engine, Institution.__table__, Program.__table__, Category.__table__,
+                       program_category_association)
+    await seed(session_factory, programs)
+    level = ProgramLevel.undergraduate.value
+    principal = Principal(role="student", user=Student(email="bench@example.com", is_verified=True))
+
+    async with session_factory() as db:
+        cursor, depth = None, 0
+        for _ in range(50):
+            page = await src_utils.fetch_programs_page(db, level, cursor, limit, principal)
+            cursor, depth = page["next_cursor"], depth + len(page["programs"])
+    print(f"{programs} programs, {limit} per page, deep page after {depth} rows")
+
+    cases = (
+        ("whole level", lambda db: whole_level(db, level, limit)),
+        ("first page", lambda db: src_utils.fetch_programs_page(db, level, None, limit, principal)),
+        ("deep page, offset", lambda db: offset_page(db, level, limit, depth)),
+        ("deep page, cursor", lambda db: src_utils.fetch_programs_page(db, level, cursor, limit, principal)),
+    )
+    for label, fetch in cases:
+        with QueryCounter(engine) as counter, timer(label, ROUNDS):
+            for _ in range(ROUNDS):
+                async with session_factory() as db:
+                    await fetch(db)
+        print(f"  {counter.count / ROUNDS:.1f} statements per request")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000, int(sys.argv[2]) if len(sys.argv) > 2 else 20))
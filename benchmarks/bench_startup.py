@@ -0,0 +1,69 @@
+"""Worker cold start with create_all against the Alembic revision check.
+
+Each run is a fresh interpreter that imports ``tuition.main`` and runs the
+startup handlers, the same work a new worker does before serving. The schema
+is created up front and stamped with the head revision, so both modes see an
+up to date database as they would during a rolling restart.
+
+    BENCH_DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.bench_startup [runs]
+"""
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+
+from sqlalchemy import text
+
+from benchmarks.common import BENCH_DATABASE_URL, make_engine
+from tuition.database import Base, migration_heads
+
+WORKER = """
+import asyncio, time
+start = time.perf_counter()
+from tuition.main import app
+from tuition.database import engine
+from sqlalchemy import event
+imported = time.perf_counter()
+statements = []
+event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(1))
+async def boot():
+    await app.router.startup()
+    booted = time.perf_counter()
+    await app.router.shutdown()
+    return booted
+booted = asyncio.run(boot())
+print(f"{(imported - start) * 1000:.1f} {(booted - imported) * 1000:.1f} {len(statements)}")
+"""
+
+
+async def prepare():
+    engine, _ = make_engine()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+        await conn.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) PRIMARY KEY)"))
+        for head in migration_heads():
+            await conn.execute(text("INSERT INTO alembic_version VALUES (:head)"), {"head": head})
+    await engine.dispose()
+
+
+def boot(create_all):
+    env = {**os.environ, "DATABASE_URL": BENCH_DATABASE_URL, "DB_CREATE_ALL": str(create_all)}
+    out = subprocess.run([sys.executable, "-c", WORKER], env=env, capture_output=True, text=True, check=True)
+    return tuple(map(float, out.stdout.split()))
+
+
+def main(runs):
+    asyncio.run(prepare())
+    for label, create_all in (("create_all", True), ("revision check", False)):
+        samples = [boot(create_all) for _ in range(runs)]
+        imported = statistics.median(s[0] for s in samples)
+        started = statistics.median(s[1] for s in samples)
+        statements = int(samples[0][2])
+        print(f"{label}: import {imported:.1f} ms, startup {started:.1f} ms ({statements} statements), "
+              f"total {imported + started:.1f} ms (median of {runs})")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
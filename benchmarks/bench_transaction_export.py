@@ -0,0 +1,107 @@
+"""Peak memory and time of exporting every transaction: the old list endpoint
+(``scalars().all()`` then one JSON payload) against the streaming NDJSON and
+CSV exports. Each mode runs in a fresh process so its peak RSS is its own.
+
+    python -m benchmarks.bench_transaction_export [rows]
+
+Point ``BENCH_DATABASE_URL`` at Postgres for the server-side cursor; SQLite
+also streams, but seeding a million rows takes a while.
+"""
+import asyncio
+import json
+import resource
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+from sqlalchemy.future import select
+
+from benchmarks.common import make_engine, reset_tables
+from tuition.exports import TRANSACTION_EXPORT_COLUMNS, stream_export
+from tuition.institution.models import Institution
+from tuition.services import services
+from tuition.student.models import Student, Transaction
+
+MODES = ("list", "ndjson", "csv")
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def seed(engine, session_factory, rows):
+    await reset_tables(engine, Student.__table__, Institution.__table__, Transaction.__table__)
+    student_id = uuid.uuid4()
+    async with session_factory() as db:
+        db.add(Student(id=student_id, full_name="Bench Student", email="student@bench.io", phone_number="08000000000",
+                       hashed_password="x", field_of_interest="Engineering", is_verified=True))
+        await db.commit()
+
+        if engine.dialect.name == "postgresql":
+            await db.execute(text("""
+                INSERT INTO transactions (id, title, description, payment_method, currency, student_name, student_id,
+                                          transaction_date, transaction_type, amount, status)
+                SELECT gen_random_uuid(), 'Payment ' || i, 'Tuition for Program ' || (i % 50), 'flutterwave', 'NGN',
+                       'Bench Student', :student_id, timestamp '2024-01-01' + i * interval '1 minute',
+                       'program_payment', 1000 + (i % 500), CASE WHEN i % 10 = 0 THEN 'pending' ELSE 'successful' END
+                FROM generate_series(1, :rows) AS i
+            """), {"student_id": student_id, "rows": rows})
+        else:
+            start = datetime(2024, 1, 1)
+            for offset in range(0, rows, 10_000):
+                await db.execute(insert(Transaction), [{
+                    "id": uuid.uuid4(), "title": f"Payment {i}", "description": f"Tuition for Program {i % 50}",
+                    "payment_method": "flutterwave", "currency": "NGN", "student_name": "Bench Student",
+                    "student_id": student_id, "transaction_date": start + timedelta(minutes=i),
+                    "transaction_type": "program_payment", "amount": 1000 + i % 500,
+                    "status": "pending" if i % 10 == 0 else "successful",
+                } for i in range(offset, min(offset + 10_000, rows))])
+        await db.commit()
+
+
+async def run(mode):
+    from fastapi.encoders import jsonable_encoder
+
+    engine, session_factory = make_engine()
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    size = 0
+    if mode == "list":
+        # What POST /student/transactions/ does for a student with this history
+        async with session_factory() as db:
+            transactions = (await db.execute(select(Transaction))).scalars().all()
+            size = len(json.dumps(jsonable_encoder(transactions)))
+    else:
+        stmt = select(*TRANSACTION_EXPORT_COLUMNS).order_by(Transaction.transaction_date, Transaction.id)
+        with services.overridden(session_factory=session_factory):
+            async for chunk in stream_export(stmt, mode):
+                size += len(chunk)
+    elapsed = time.perf_counter() - start
+    await engine.dispose()
+    print(json.dumps({"mode": mode, "seconds": elapsed, "mb": size / 1e6,
+                      "baseline_rss_mb": baseline, "peak_rss_mb": peak_rss_mb()}))
+
+
+def main(rows):
+    engine, session_factory = make_engine()
+    asyncio.run(seed(engine, session_factory, rows))
+    print(f"{rows} transactions on {engine.dialect.name}")
+    for mode in MODES:
+        child = subprocess.run([sys.executable, "-m", "benchmarks.bench_transaction_export", "--run", mode],
+                               capture_output=True, text=True)
+        if child.returncode != 0:
+            print(f"{mode:>7}: failed with exit code {child.returncode} {child.stderr.strip()[-200:]}")
+            continue
+        result = json.loads(child.stdout.strip().splitlines()[-1])
+        print(f"{mode:>7}: {result['seconds']:6.1f} s, {result['mb']:6.0f} MB written, "
+              f"peak RSS {result['peak_rss_mb']:6.0f} MB ({result['baseline_rss_mb']:.0f} MB before the export)")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--run"]:
+        asyncio.run(run(sys.argv[2]))
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
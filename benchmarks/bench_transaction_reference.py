@@ -0,0 +1,79 @@
+"""Matching a gateway callback or statement line to its transaction: by amount
+and a time window, the only option before tx_ref was stored, against the
+uniquely indexed tx_ref and flw_ref. Needs ``BENCH_DATABASE_URL`` pointing at
+Postgres for realistic plans.
+
+    python -m benchmarks.bench_transaction_reference [transactions] [lookups]
+"""
+import asyncio
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, or_
+from sqlalchemy.future import select
+
+from benchmarks.common import make_engine, reset_tables, timer
+from tuition.institution.models import Institution
+from tuition.student.models import Student, Transaction
+
+START = datetime(2024, 1, 1)
+
+
+async def seed(engine, n):
+    await reset_tables(engine, Student.__table__, Institution.__table__, Transaction.__table__)
+    rng = random.Random(1)
+    rows = []
+    async with engine.begin() as conn:
+        for i in range(n):
+            rows.append({
+                "id": uuid.uuid4(), "title": "Tuition", "description": "Tuition", "transaction_type": "program_payment",
+                "amount": rng.choice([25000, 50000, 75000, 100000]), "currency": "NGN", "payment_method": "flutterwave",
+                "student_name": "Student", "status": "pending",
+                "transaction_date": START + timedelta(seconds=rng.randint(0, 180 * 86400)),
+                "tx_ref": f"FLW_{i}", "gateway_reference": f"FLW-MOCK-{i}",
+            })
+            if len(rows) == 10000:
+                await conn.execute(insert(Transaction.__table__), rows)
+                rows = []
+        if rows:
+            await conn.execute(insert(Transaction.__table__), rows)
+        if engine.dialect.name == "postgresql":
+            await conn.exec_driver_sql("ANALYZE transactions")
+
+
+async def main(n, lookups):
+    engine, session_factory = make_engine()
+    await seed(engine, n)
+    rng = random.Random(2)
+    async with session_factory() as db:
+        sample = (await db.execute(
+            select(Transaction.tx_ref, Transaction.gateway_reference, Transaction.amount, Transaction.transaction_date)
+            .limit(lookups)
+        )).all()
+    rng.shuffle(sample)
+    print(f"{n} transactions, {len(sample)} lookups")
+
+    async with session_factory() as db:
+        with timer("amount and time window", len(sample)):
+            candidates = 0
+            for _, _, amount, transaction_date in sample:
+                candidates += len((await db.execute(select(Transaction).where(
+                    Transaction.amount == amount,
+                    Transaction.transaction_date.between(transaction_date - timedelta(minutes=30),
+                                                         transaction_date + timedelta(minutes=30)),
+                ))).scalars().all())
+        print(f"  {candidates / len(sample):.1f} candidate rows per lookup")
+        with timer("tx_ref or flw_ref", len(sample)):
+            for i, (tx_ref, gateway_reference, _, _) in enumerate(sample):
+                reference = tx_ref if i % 2 else gateway_reference
+                (await db.execute(select(Transaction).where(
+                    or_(Transaction.tx_ref == reference, Transaction.gateway_reference == reference)
+                ))).scalar_one()
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 500000, int(sys.argv[2]) if len(sys.argv) > 2 else 500))
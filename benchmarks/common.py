@@ -0,0 +1,80 @@
+"""Shared setup for the benchmark scripts.
+
+The app settings are required at import time, so throwaway defaults are set
+here before anything from ``tuition`` is imported. Point ``BENCH_DATABASE_URL``
+at a Postgres instance to benchmark against the production dialect; the
+default is a local SQLite file.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL", "sqlite+aiosqlite:///./bench.db")
+
+_DEFAULT_SETTINGS = {
+    "DATABASE_URL": BENCH_DATABASE_URL,
+    "SECRET_KEY": "bench-secret",
+    "ALGORITHM": "HS256",
+    "MAIL_USERNAME": "bench@example.com",
+    "MAIL_PASSWORD": "bench",
+    "MAIL_FROM": "bench@example.com",
+    "DOMAIN": "localhost",
+    "FRONTEND_URL": "localhost:3000",
+    "SSL_PREFIX": "http",
+    "SUPABASE_URL": "http://localhost:54321",
+    "SUPABASE_KEY": "bench",
+    "PAPERTRAIL_HOST": "localhost",
+    "PAPERTRAIL_PORT": "514",
+}
+for key, value in _DEFAULT_SETTINGS.items():
+    os.environ.setdefault(key, value)
+
+from sqlalchemy import event
+# Import every model module so relationships between them can be configured
+import tuition.student.models  # noqa: F401
+import tuition.institution.models  # noqa: F401
+import tuition.admin.models  # noqa: F401
+import tuition.email_outbox  # noqa: F401
+import tuition.payments  # noqa: F401
+import tuition.analytics  # noqa: F401
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+
+def make_engine(url=BENCH_DATABASE_URL):
+    engine = create_async_engine(url, echo=False)
+    session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    return engine, session_factory
+
+
+async def reset_tables(engine, *tables):
+    """Drop and recreate only the given tables so SQLite can skip Postgres-only DDL."""
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: [t.drop(sync_conn, checkfirst=True) for t in reversed(tables)])
+        await conn.run_sync(lambda sync_conn: [t.create(sync_conn) for t in tables])
+
+
+class QueryCounter:
+    """Counts statements sent to the database while active."""
+
+    def __init__(self, engine):
+        self.engine = engine.sync_engine
+        self.count = 0
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+@contextmanager
+def timer(label, n=1):
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+    print(f"{label}: {elapsed * 1000:.1f} ms total, {elapsed * 1000 / n:.3f} ms/op over {n} ops")
@@ -1,13 +1,17 @@
 from fastapi import HTTPException
 
 from tuition.logger import logger
-from tuition.security.hash import Hash
+import tuition.security.hash as hashing
 import tuition.institution.utils as institution_utils
 import tuition.student.utils as student_utils
 import tuition.admin.utils as admin_utils
 from tuition.admin.schemas import AdminResponse
 from tuition.src_utils import verify_password
 from tuition.security.jwt import create_access_token
+from tuition.services import services
+from tuition.exports import transaction_export_response
+from tuition.imports import run_import
+from tuition.student.models import Transaction
 
 async def sign_up_admin_superUser(db, payload):
     logger.info("Creating a new admin: %s", payload.email)
@@ -17,7 +21,7 @@ async def sign_up_admin_superUser(db, payload):
     await admin_utils.check_existing_email(db, payload.email)
     logger.info("Email checks completed")
 
-    hashed_password = Hash.bcrypt(payload.password)
+    hashed_password = await hashing.hash_password(payload.password)
 
     logger.info("Creating Super User!!!!!!!!")
     new_admin = admin_utils.create_admin_super_user(payload, hashed_password)
@@ -29,15 +33,16 @@ async def sign_up_admin_superUser(db, payload):
 
     return admin_object
 
-async def login_admin(db, payload):
+async def login_admin(db, payload, admin=None):
     logger.info(f"Login attempt for Admin: {payload.username}")
 
     email = payload.username
-    admin = await admin_utils.get_admin_by_email(db, email)
+    if admin is None:
+        admin = await admin_utils.get_admin_by_email(db, email)
 
     logger.info(f"Admin found: {email}")
     admin_object = AdminResponse.model_validate(admin)
-    verify_password(payload.password, admin.hashed_password)
+    await verify_password(payload.password, admin.hashed_password)
     
     access_token =  create_access_token(data = {
         "sub" : email
@@ -55,7 +60,12 @@ async def login_admin(db, payload):
 async def sign_up_admin(db, payload, background_task, current_user):
     logger.info("Creating a new admin: %s", payload.email)
 
-    user = await admin_utils.get_admin_by_email(db, current_user.email)
+    user = current_user.get("admin")
+    if not user:
+        raise HTTPException(
+            status_code=403,
+            detail="You are not authorized to access this endpoint."
+        )
     await admin_utils.check_access_control(user)
 
     await student_utils.check_existing_email(db, payload.email)
@@ -63,7 +73,7 @@ async def sign_up_admin(db, payload, background_task, current_user):
     await admin_utils.check_existing_email(db, payload.email)
     logger.info("Email checks completed")
 
-    hashed_password = Hash.bcrypt(payload.password)
+    hashed_password = await hashing.hash_password(payload.password)
 
     logger.info("Creating Admin!!!!!!!!")
     new_admin = admin_utils.create_admin(payload, hashed_password)
@@ -82,7 +92,7 @@ import tuition.institution.utils as institution_utils
 async def add_subaccount_id(db, current_user, subaccount_id, email):
     logger.info("Updating subaccount_id by: %s", current_user.email)
 
-    admin_user = await admin_utils.get_admin_by_email(db, current_user.email)
+    admin_user = current_user.get("admin")
     if not admin_user:
         raise Exception("You are not allowed to access this endpoint.")
     await admin_utils.check_role(admin_user)
@@ -97,6 +107,8 @@ async def add_subaccount_id(db, current_user, subaccount_id, email):
     subaccount.subaccount_id = subaccount_id
     await db.commit()
     await db.refresh(subaccount)
+    # Cached programs carry their institution's subaccount
+    services.get("program_catalogue").clear()
     logger.info(f"Subaccount_id updated for {email}")
     return {
         "subaccount": subaccount,
@@ -107,7 +119,7 @@ async def add_subaccount_id(db, current_user, subaccount_id, email):
 async def add_program_category(db, category, current_user):
     logger.info("Updating program_category by: %s", current_user.email)
     
-    admin_user = await admin_utils.get_admin_by_email(db, current_user.email)
+    admin_user = current_user.get("admin")
     if not admin_user:
         raise HTTPException(
             status_code=403,
@@ -128,11 +140,49 @@ async def add_program_category(db, category, current_user):
     
 
 
+async def export_transactions(current_user, export_format, start=None, end=None, transaction_status=None,
+                              student_id=None, institution_id=None):
+    logger.info("Exporting transactions as %s by: %s", export_format, current_user.email)
 
+    admin_user = current_user.get("admin")
+    if not admin_user:
+        raise HTTPException(
+            status_code=403,
+            detail="You are not authorized to access this endpoint."
+        )
 
+    scope = []
+    if student_id is not None:
+        scope.append(Transaction.student_id == student_id)
+    if institution_id is not None:
+        scope.append(Transaction.institution_id == institution_id)
+    return transaction_export_response(scope, export_format, start, end, transaction_status)
 
 
+async def rebuild_analytics(current_user):
+    logger.info("Rebuilding analytics summaries by: %s", current_user.email)
+
+    admin_user = current_user.get("admin")
+    if not admin_user:
+        raise HTTPException(
+            status_code=403,
+            detail="You are not authorized to access this endpoint."
+        )
+
+    await services.get("analytics_rebuilder").rebuild()
+    return {
+        "message": "Analytics summaries rebuilt"
+    }
 
 
+async def bulk_import(db, kind, upload, import_format, current_user):
+    logger.info("Importing %s from %s by: %s", kind, upload.filename, current_user.email)
 
+    admin_user = current_user.get("admin")
+    if not admin_user:
+        raise HTTPException(
+            status_code=403,
+            detail="You are not authorized to access this endpoint."
+        )
 
+    return await run_import(db, upload, kind, import_format)
@@ -7,7 +7,7 @@ import uuid
 class Admin(Base):
     __tablename__ = 'admins'
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
 
     full_name = Column(String(255), nullable=False)
     email = Column(String, unique=True, nullable=False)
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, status, BackgroundTasks, Depends
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, status, BackgroundTasks, Depends, Query, UploadFile
 from tuition.admin import crud
 from tuition.database import db_dependency
 from pydantic import UUID4
-from tuition.admin.schemas import AdminSignUp
-from tuition.security.oauth2 import get_current_user
-from tuition.src_utils import Login
+from tuition.admin.schemas import AdminSignUp, ImportReport
+from tuition.security.oauth2 import get_current_principal, Principal
 from tuition.institution.schemas import Category
 
 
@@ -29,7 +31,7 @@ admin_router = APIRouter(
 
 
 @admin_router.post("/admin/create_admin", status_code= status.HTTP_201_CREATED)
-async def create_admin(db : db_dependency, payload : AdminSignUp, background_task : BackgroundTasks, current_user : Login = Depends(get_current_user)):
+async def create_admin(db : db_dependency, payload : AdminSignUp, background_task : BackgroundTasks, current_user: Principal = Depends(get_current_principal)):
     """
     ## Creates a new admin user
 
@@ -44,7 +46,7 @@ async def create_admin(db : db_dependency, payload : AdminSignUp, background_tas
         - `password` (str): A password that must be at least 12 characters long.
 
     - `background_task` (BackgroundTasks): Allows for background task processing (e.g., sending a confirmation email).
-    - `current_user` (Login): The currently authenticated superuser 
+    - `current_user` (Principal): The currently authenticated superuser 
       (automatically retrieved from the authentication dependency).
 
     **Returns:**
@@ -60,7 +62,7 @@ async def create_admin(db : db_dependency, payload : AdminSignUp, background_tas
 
 
 @admin_router.post("/admin/subaccount_id", status_code=status.HTTP_200_OK)
-async def add_subaccount_id(db : db_dependency , subaccount_id : str, email : str, current_user : Login = Depends(get_current_user)):
+async def add_subaccount_id(db : db_dependency , subaccount_id : str, email : str, current_user: Principal = Depends(get_current_principal)):
     """
     ## Adds a subaccount ID for the admin
 
@@ -71,7 +73,7 @@ async def add_subaccount_id(db : db_dependency , subaccount_id : str, email : st
     - `db` (db_dependency): The database session dependency.
     - `subaccount_id` (str): The ID of the subaccount to be added.
     - `email` (str): The email address associated with the admin.
-    - `current_user` (Login): The currently authenticated admin user 
+    - `current_user` (Principal): The currently authenticated admin user 
       (automatically retrieved from the authentication dependency).
 
     **Returns:**
@@ -87,7 +89,7 @@ async def add_subaccount_id(db : db_dependency , subaccount_id : str, email : st
 
 
 @admin_router.post("/admin/program_category", status_code=status.HTTP_201_CREATED)
-async def add_program_category(db : db_dependency, category : Category, current_user : Login = Depends(get_current_user)):
+async def add_program_category(db : db_dependency, category : Category, current_user: Principal = Depends(get_current_principal)):
     """
     ## Adds a program category
 
@@ -100,7 +102,7 @@ async def add_program_category(db : db_dependency, category : Category, current_
         - `name` (str): The name of the category.
         - `description` (str): A brief description of the category.
 
-    - `current_user` (Login): The currently authenticated admin user 
+    - `current_user` (Principal): The currently authenticated admin user 
       (automatically retrieved from the authentication dependency).
 
     **Returns:**
@@ -114,3 +116,87 @@ async def add_program_category(db : db_dependency, category : Category, current_
     """
     return await crud.add_program_category(db, category, current_user) 
 
+
+@admin_router.get("/admin/transactions/export", status_code=status.HTTP_200_OK)
+async def export_transactions(
+                            export_format : Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+                            start : Optional[datetime] = None,
+                            end : Optional[datetime] = None,
+                            status_filter : Optional[str] = Query(None, alias="status"),
+                            student_id : Optional[UUID4] = None,
+                            institution_id : Optional[UUID4] = None,
+                            current_user: Principal = Depends(get_current_principal)
+                            ):
+    """
+    ## Exports transactions across the platform
+
+    Streams every matching transaction, oldest first, as a file download. Only admin users can access this endpoint.
+
+    **Parameters:**
+    - `format`: `ndjson` (one JSON object per line) or `csv`.
+    - `start`, `end`: Optional ISO 8601 bounds on `transaction_date`, start inclusive and end exclusive.
+    - `status`: Optional transaction status to filter on, e.g. `pending`.
+    - `student_id`, `institution_id`: Optional filters to one student's or one institution's transactions.
+
+    **Returns:**
+    - A streamed `transactions.ndjson` or `transactions.csv` attachment.
+
+    **Responses:**
+    - **200 OK**: The export is streamed.
+    - **403 Forbidden**: If the current user is not an admin.
+    """
+    return await crud.export_transactions(current_user, export_format, start, end, status_filter,
+                                          student_id, institution_id)
+
+
+@admin_router.post("/admin/analytics/rebuild", status_code=status.HTTP_200_OK)
+async def rebuild_analytics(current_user: Principal = Depends(get_current_principal)):
+    """
+    ## Rebuilds the institution dashboard summaries
+
+    Recomputes every institution's application counts and payment totals from the applications and transactions
+    tables, the same as the periodic rebuild. Only admin users can access this endpoint.
+
+    **Returns:**
+    - (str): A success message once the summaries are rebuilt.
+
+    **Responses:**
+    - **200 OK**: The summaries were rebuilt.
+    - **403 Forbidden**: If the current user is not an admin.
+    """
+    return await crud.rebuild_analytics(current_user)
+
+
+@admin_router.post("/admin/import/{kind}", response_model=ImportReport, status_code=status.HTTP_200_OK)
+async def bulk_import(
+                    db : db_dependency,
+                    kind : Literal["institutions", "programs"],
+                    file : UploadFile,
+                    import_format : Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+                    current_user: Principal = Depends(get_current_principal)
+                    ):
+    """
+    ## Bulk imports institutions or programs
+
+    Reads an uploaded file a chunk of rows at a time, validates every row and inserts the valid ones. Each chunk is
+    committed on its own, so rows imported before a failure stay imported. Only admin users can access this endpoint.
+
+    **Parameters:**
+    - `kind`: `institutions` or `programs`.
+    - `file`: The file to import, one row per institution or program.
+        - Institutions have the signup fields without a password: `name_of_institution`, `type_of_institution`,
+          `website`, `address`, `email`, `country`, `official_name` and `brief_description`. Each new institution
+          is emailed a link to set its password.
+        - Programs have the create program fields, with `image_url` instead of an image and `institution_email` for
+          an institution that has added its bank details. In a CSV file `categories` is one comma separated cell.
+    - `format`: `ndjson` (one JSON object per line) or `csv` (with a header row).
+
+    **Returns:**
+    - A report with the number of rows read and imported, and the errors for each rejected row by row number.
+
+    **Responses:**
+    - **200 OK**: The file was processed; rejected rows are listed in the report.
+    - **400 Bad Request**: If the format is unsupported or the file is not UTF-8.
+    - **403 Forbidden**: If the current user is not an admin.
+    """
+    return await crud.bulk_import(db, kind, file, import_format, current_user)
@@ -1,5 +1,5 @@
 import re
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, EmailStr
 
 from pydantic import BaseModel, field_validator, ValidationInfo, ConfigDict, Field
@@ -53,3 +53,16 @@ class AdminResponse(BaseModel):
 class TokenData(BaseModel):
     email: Optional[str] = None
     
+
+
+class ImportRowError(BaseModel):
+    row : int
+    errors : List[str]
+
+
+class ImportReport(BaseModel):
+    kind : str
+    rows : int
+    imported : int
+    rejected : int
+    errors : List[ImportRowError]
@@ -2,6 +2,8 @@ from fastapi import HTTPException, status
 from sqlalchemy.future import select
 from tuition.admin.models import Admin
 from tuition.institution.models import Category
+import tuition.institution.utils  # noqa: F401  (registers category_cache)
+from tuition.services import services
 
 
 async def check_existing_email(db, email: str):
@@ -121,6 +123,7 @@ async def add_program_category(db, category):
      db.add(new_category)
      await db.commit()
      await db.refresh(new_category)
+     services.get("category_cache").clear()
      logger.info(f"New category {new_category.name} added successfully")
      
      return new_category.id
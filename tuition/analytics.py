@@ -0,0 +1,205 @@
+import asyncio
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, Numeric, String, delete, func, insert, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.future import select
+
+from tuition.config import Config
+from tuition.database import Base
+from tuition.logger import logger
+from tuition.services import services
+from tuition.institution.models import Program
+from tuition.student.models import Application, Transaction
+
+
+class ProgramStats(Base):
+    """Running count of applications per program, kept in step with ``applications``."""
+    __tablename__ = 'program_stats'
+
+    program_id = Column(UUID(as_uuid=True), ForeignKey('programs.id', ondelete='CASCADE'), primary_key=True)
+    applications = Column(Integer, nullable=False, default=0, server_default='0')
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())  # timezone-aware
+
+
+class InstitutionPaymentStats(Base):
+    """Running payment totals per institution and currency, kept in step with ``transactions``."""
+    __tablename__ = 'institution_payment_stats'
+
+    institution_id = Column(UUID(as_uuid=True), ForeignKey('institutions.id', ondelete='CASCADE'), primary_key=True)
+    currency = Column(String, primary_key=True)
+    pending_transactions = Column(Integer, nullable=False, default=0, server_default='0')
+    successful_transactions = Column(Integer, nullable=False, default=0, server_default='0')
+    revenue = Column(Numeric, nullable=False, default=0, server_default='0')
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())  # timezone-aware
+
+
+async def _add_to_counters(db, model, key_columns, rows):
+    """Upsert rows of deltas, adding them to the counters already stored."""
+    if not rows:
+        return
+    # Same key order in every transaction, so two writers can't deadlock on each other's rows
+    rows = sorted(rows, key=lambda row: tuple(str(row[column]) for column in key_columns))
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(model).values(rows)
+    counters = [column for column in rows[0] if column not in key_columns]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=key_columns,
+        set_={**{column: getattr(model, column) + stmt.excluded[column] for column in counters},
+              "updated_at": func.now()},
+    )
+    await db.execute(stmt)
+
+
+async def record_applications(db, program_ids):
+    """Count new applications, in the transaction that inserts them."""
+    counts = Counter(program_ids)
+    await _add_to_counters(db, ProgramStats, ["program_id"],
+                           [{"program_id": program_id, "applications": count} for program_id, count in counts.items()])
+
+
+async def record_payment_created(db, institution_id, currency):
+    """Count a new pending transaction, in the transaction that inserts it."""
+    if institution_id is None:
+        return
+    await _add_to_counters(db, InstitutionPaymentStats, ["institution_id", "currency"], [
+        {"institution_id": institution_id, "currency": currency, "pending_transactions": 1,
+         "successful_transactions": 0, "revenue": Decimal(0)}
+    ])
+
+
+async def record_payments_settled(db, settled):
+    """Move settled transactions from the count of their old status to their new one.
+
+    ``settled`` holds (institution_id, currency, amount, old status, new
+    status) for transactions as they were until this database transaction.
+    Failed and cancelled payments aren't counted, so a late success only adds.
+    """
+    totals = defaultdict(lambda: {"pending_transactions": 0, "successful_transactions": 0, "revenue": Decimal(0)})
+    for institution_id, currency, amount, old_status, new_status in settled:
+        if institution_id is None:
+            continue
+        row = totals[(institution_id, currency)]
+        if old_status == "pending":
+            row["pending_transactions"] -= 1
+        if new_status == "successful":
+            row["successful_transactions"] += 1
+            row["revenue"] += Decimal(amount)
+    await _add_to_counters(db, InstitutionPaymentStats, ["institution_id", "currency"], [
+        {"institution_id": institution_id, "currency": currency, **row}
+        for (institution_id, currency), row in totals.items()
+    ])
+
+
+async def rebuild_summaries(db):
+    """Recompute both summary tables from ``applications`` and ``transactions``.
+
+    On Postgres the summary tables are locked against writes first. Anyone
+    counting a row committed before the rebuild reads, and anyone still to
+    count one waits and adds it on top of the rebuilt totals, so the result is
+    exact without stopping reads of the dashboard.
+    """
+    if db.bind.dialect.name == "postgresql":
+        await db.execute(text("LOCK TABLE program_stats, institution_payment_stats IN EXCLUSIVE MODE"))
+
+    await db.execute(delete(ProgramStats))
+    await db.execute(insert(ProgramStats).from_select(
+        ["program_id", "applications"],
+        select(Application.application_type_id, func.count())
+        .where(Application.application_type == "program", Application.application_type_id.isnot(None))
+        .group_by(Application.application_type_id)
+    ))
+
+    await db.execute(delete(InstitutionPaymentStats))
+    await db.execute(insert(InstitutionPaymentStats).from_select(
+        ["institution_id", "currency", "pending_transactions", "successful_transactions", "revenue"],
+        select(
+            Transaction.institution_id,
+            Transaction.currency,
+            func.count().filter(Transaction.status == "pending"),
+            func.count().filter(Transaction.status == "successful"),
+            func.coalesce(func.sum(Transaction.amount).filter(Transaction.status == "successful"), 0),
+        )
+        .where(Transaction.institution_id.isnot(None))
+        .group_by(Transaction.institution_id, Transaction.currency)
+    ))
+    await db.commit()
+
+
+async def get_institution_analytics(db, institution_id):
+    """Read an institution's dashboard from the summary tables."""
+    programs = (await db.execute(
+        select(Program.id, Program.name_of_program, func.coalesce(ProgramStats.applications, 0))
+        .outerjoin(ProgramStats, ProgramStats.program_id == Program.id)
+        .where(Program.institution_id == institution_id)
+        .order_by(Program.name_of_program, Program.id)
+    )).all()
+    payments = (await db.execute(
+        select(InstitutionPaymentStats)
+        .where(InstitutionPaymentStats.institution_id == institution_id)
+        .order_by(InstitutionPaymentStats.currency)
+    )).scalars().all()
+    return {
+        "programs": [
+            {"program_id": program_id, "name_of_program": name, "applications": applications}
+            for program_id, name, applications in programs
+        ],
+        "payments": payments,
+    }
+
+
+class AnalyticsRebuilder:
+    """Rebuilds the summary tables every ``interval`` seconds.
+
+    The counters are updated in the same transaction as the rows they count,
+    so they only drift when something writes ``applications`` or
+    ``transactions`` without going through the app, e.g. a manual fix in SQL;
+    the rebuild puts them right.
+    """
+
+    def __init__(self, session_factory, interval):
+        self.session_factory = session_factory
+        self.interval = interval
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.rebuild()
+            except Exception:
+                logger.exception("Analytics rebuild failed")
+
+    async def rebuild(self):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        async with self.session_factory() as db:
+            await rebuild_summaries(db)
+        logger.info(f"Analytics summaries rebuilt in {loop.time() - started:.1f}s")
+
+
+def create_analytics_rebuilder():
+    return AnalyticsRebuilder(
+        session_factory=services.get("session_factory"),
+        interval=Config.ANALYTICS_REBUILD_INTERVAL,
+    )
+
+
+services.register("analytics_rebuilder", create_analytics_rebuilder, close=lambda rebuilder: rebuilder.close())
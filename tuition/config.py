@@ -1,5 +1,7 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from tuition.services import services
+
 
 class Settings(BaseSettings):
     SECRET_KEY : str
@@ -16,8 +18,100 @@ class Settings(BaseSettings):
     PAPERTRAIL_PORT : int
     DATABASE_URL : str
 
+    # bcrypt worker pool, "thread" or "process"
+    HASH_POOL_KIND : str = "thread"
+    HASH_POOL_WORKERS : int = 4
+
+    # In-process cache of verified bearer tokens
+    TOKEN_CACHE_ENABLED : bool = True
+    TOKEN_CACHE_SIZE : int = 10000
+    TOKEN_CACHE_TTL : int = 300
+
+    # Rows fetched per round trip when streaming exports
+    EXPORT_BATCH_SIZE : int = 1000
+
+    # In-process cache of programs with their subaccount and categories
+    PROGRAM_CACHE_SIZE : int = 1000
+    PROGRAM_CACHE_TTL : int = 60
+
+    # Institution search ranks at most this many of the newest matches
+    SEARCH_RANK_CANDIDATES : int = 500
+
+    # Flutterwave HTTP client
+    FLW_SECRET_KEY : str = ""
+    FLW_BASE_URL : str = "https://api.flutterwave.com/v3"
+    FLW_TIMEOUT : float = 30.0
+    FLW_CONNECT_TIMEOUT : float = 5.0
+    FLW_MAX_CONNECTIONS : int = 100
+    FLW_MAX_KEEPALIVE : int = 20
+    FLW_MAX_RETRIES : int = 2
+    FLW_RETRY_BACKOFF : float = 0.5
+    # Must match the secret hash set on the Flutterwave dashboard, webhooks are rejected while it is empty
+    FLW_SECRET_HASH : str = ""
+
+    # Payment webhooks, recorded and reconciled in batches of up to PAYMENT_BATCH_SIZE
+    PAYMENT_BATCH_SIZE : int = 200
+    PAYMENT_BATCH_DELAY : float = 0.02
+    PAYMENT_QUEUE_SIZE : int = 10000
+
+    # Institution dashboard counters are kept up to date as rows are written and rebuilt this often to correct drift
+    ANALYTICS_REBUILD_WORKER : bool = True
+    ANALYTICS_REBUILD_INTERVAL : float = 21600.0
+
+    # Admin bulk imports are validated and inserted IMPORT_CHUNK_SIZE rows at a time, one commit per chunk
+    IMPORT_CHUNK_SIZE : int = 2000
+    PASSWORD_SETUP_TOKEN_MAX_AGE : int = 604800
+
+    # Image storage, "supabase" or "local"
+    STORAGE_BACKEND : str = "supabase"
+    STORAGE_BUCKET : str = "alt_bucket"
+    STORAGE_TIMEOUT : float = 60.0
+    STORAGE_LOCAL_DIR : str = "media"
+    STORAGE_LOCAL_URL : str = "/media"
+    MAX_UPLOAD_BYTES : int = 5 * 1024 * 1024
+    UPLOAD_CHUNK_SIZE : int = 64 * 1024
+
+    # Database connection pool
+    DB_POOL_SIZE : int = 10
+    DB_MAX_OVERFLOW : int = 10
+    DB_POOL_TIMEOUT : float = 30.0
+    DB_POOL_RECYCLE : int = 1800
+    DB_POOL_PRE_PING : bool = True
+    DB_POOL_WARMUP : int = 5
+    DB_STATEMENT_TIMEOUT_MS : int = 30000
+    DB_STATEMENT_CACHE_SIZE : int = 100
+    # Development only: build tables from the models instead of checking the Alembic revision
+    DB_CREATE_ALL : bool = False
+
+    # Log shipping, records past LOG_QUEUE_SIZE are dropped rather than block a request
+    LOG_QUEUE_SIZE : int = 10000
+    LOG_INFO_SAMPLE_RATE : float = 1.0
+
+    # Outbound email, queued in email_outbox and sent in batches. EMAIL_SINK is "smtp" or "dry_run"
+    MAIL_SERVER : str = "smtp.gmail.com"
+    MAIL_PORT : int = 465
+    EMAIL_SINK : str = "smtp"
+    EMAIL_OUTBOX_WORKER : bool = True
+    EMAIL_BATCH_SIZE : int = 50
+    EMAIL_SMTP_CONNECTIONS : int = 4
+    EMAIL_POLL_INTERVAL : float = 2.0
+    EMAIL_MAX_ATTEMPTS : int = 5
+    EMAIL_RETRY_BACKOFF : float = 30.0
+    EMAIL_CLAIM_LEASE : int = 300
+    EMAIL_TIMEOUT : float = 30.0
 
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
-Config = Settings()
\ No newline at end of file
+
+services.register("settings", Settings)
+
+
+class LazySettings:
+    """Reads Settings from the environment and .env on first attribute access."""
+
+    def __getattr__(self, name):
+        return getattr(services.get("settings"), name)
+
+
+Config = LazySettings()
\ No newline at end of file
@@ -1,31 +1,260 @@
-import os
+import asyncio
+import re
+import threading
+import time
+from pathlib import Path
 from typing import Annotated
 from fastapi import Depends
-from dotenv import load_dotenv
+from sqlalchemy import exc, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-load_dotenv()
+from tuition.config import Config
+from tuition.services import services
 
-DATABASE_URL = os.getenv("DATABASE_URL")
 
-if not DATABASE_URL:
-    raise ValueError("No DATABASE_URL set for SQLAlchemy engine")
+class PoolMetrics:
+    """Counters for how long requests wait to check a connection out of the pool."""
 
-engine = create_async_engine(DATABASE_URL, echo=False)
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+
+    def record(self, wait, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self):
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait / attempts * 1000, 3) if attempts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class MonitoredQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that times every checkout, including the wait for a free slot."""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            pool_metrics.record(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_metrics.record(time.perf_counter() - start)
+        return connection
+
+
+def engine_options(url):
+    """Build create_async_engine keyword arguments for the configured backend.
+
+    SQLite keeps SQLAlchemy's own pool choice since it has no server to hold
+    connections open and doesn't accept the queue pool arguments.
+    """
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        return {}
+
+    options = {
+        "poolclass": MonitoredQueuePool,
+        "pool_size": Config.DB_POOL_SIZE,
+        "max_overflow": Config.DB_MAX_OVERFLOW,
+        "pool_timeout": Config.DB_POOL_TIMEOUT,
+        "pool_recycle": Config.DB_POOL_RECYCLE,
+        "pool_pre_ping": Config.DB_POOL_PRE_PING,
+    }
+    if url.get_driver_name() == "asyncpg":
+        options["connect_args"] = {
+            "prepared_statement_cache_size": Config.DB_STATEMENT_CACHE_SIZE,
+            "server_settings": {"statement_timeout": str(Config.DB_STATEMENT_TIMEOUT_MS)},
+        }
+    return options
+
+
+def create_engine():
+    if not Config.DATABASE_URL:
+        raise ValueError("No DATABASE_URL set for SQLAlchemy engine")
+    return create_async_engine(Config.DATABASE_URL, echo=False, **engine_options(Config.DATABASE_URL))
+
+
+def create_session_factory():
+    return sessionmaker(
+        bind=services.get("engine"),
+        class_=AsyncSession,  # Use AsyncSession
+        autocommit=False,
+        autoflush=False,
+    )
+
+
+services.register("engine", create_engine, close=lambda engine: engine.dispose())
+services.register("session_factory", create_session_factory)
+
+
+def __getattr__(name):
+    # engine and SessionLocal are only built when first used
+    if name == "engine":
+        return services.get("engine")
+    if name == "SessionLocal":
+        return services.get("session_factory")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-SessionLocal = sessionmaker(
-    bind=engine,
-    class_=AsyncSession,  # Use AsyncSession
-    autocommit=False,
-    autoflush=False,
-)
 
 Base = declarative_base()
 
+
+def violates_unique(error, table, name):
+    """Whether an IntegrityError comes from the unique constraint or index ``name`` on ``table``.
+
+    Postgres reports the constraint by name. SQLite only lists its columns,
+    so those are compared with the constraint's instead.
+    """
+    constraint_name = getattr(error.orig.__cause__, "constraint_name", None)
+    if constraint_name is not None:
+        return constraint_name == name
+    constraint = next(c for c in [*table.constraints, *table.indexes] if c.name == name)
+    columns = ", ".join(f"{table.name}.{column.name}" for column in constraint.columns)
+    return str(error.orig) == f"UNIQUE constraint failed: {columns}"
+
+
+class sortable_timestamp(FunctionElement):
+    """A timestamp column or bound value, in a form that compares the same way for every row.
+
+    Postgres stores timestamps natively, so this is the bare expression there.
+    SQLite keeps them as text: CURRENT_TIMESTAMP defaults have no fractional
+    seconds while values written by SQLAlchemy always have six digits, so equal
+    instants don't compare equal. There both sides go through ``strftime`` to
+    one format.
+    """
+    inherit_cache = True
+
+
+@compiles(sortable_timestamp)
+def _compile_sortable_timestamp(element, compiler, **kw):
+    return compiler.process(element.clauses, **kw)
+
+
+@compiles(sortable_timestamp, "sqlite")
+def _compile_sortable_timestamp_sqlite(element, compiler, **kw):
+    return f"strftime('%Y-%m-%d %H:%M:%f', {compiler.process(element.clauses, **kw)})"
+
+
+async def warm_up_pool(count=None):
+    """Open connections concurrently at startup so the first requests don't pay for them."""
+    count = Config.DB_POOL_WARMUP if count is None else count
+    engine = services.get("engine")
+    if not isinstance(engine.pool, AsyncAdaptedQueuePool):
+        count = min(count, 1)
+
+    async def ping():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(ping() for _ in range(count)))
+
+
+def pool_status():
+    """Report pool occupancy alongside checkout wait times.
+
+    Saturation is the share of the pool plus overflow currently checked out;
+    anything near 1.0 means new requests are queueing for a connection.
+    """
+    pool = services.get("engine").pool
+    status = {"pool": type(pool).__name__, **pool_metrics.snapshot()}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        capacity = pool.size() + Config.DB_MAX_OVERFLOW
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "saturation": round(pool.checkedout() / capacity, 3) if capacity else 0.0,
+        })
+    return status
+
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "alembic" / "versions"
+
+_REVISION_LINE = re.compile(r"^(down_revision|revision)\b.*?=(.*)$", re.MULTILINE)
+_REVISION_ID = re.compile(r"['\"](\w+)['\"]")
+
+
+def migration_heads(directory=MIGRATIONS_DIR):
+    """Return the head revisions of the Alembic scripts shipped with the app.
+
+    Reads the ``revision``/``down_revision`` assignments straight from the
+    version files; importing alembic to walk the script directory would add
+    more to every worker's boot than the check itself.
+    """
+    revisions, parents = set(), set()
+    for path in directory.glob("*.py"):
+        for name, value in _REVISION_LINE.findall(path.read_text(encoding="utf-8")):
+            ids = _REVISION_ID.findall(value)
+            (revisions if name == "revision" else parents).update(ids)
+    return revisions - parents
+
+
+async def check_schema_revision():
+    """Make sure the database has been migrated to the head revision.
+
+    Reads alembic_version in a single query instead of reflecting every table,
+    and refuses to start against a database that is behind or ahead of the code.
+    """
+    expected = migration_heads()
+    try:
+        async with services.get("engine").connect() as conn:
+            result = await conn.execute(text("SELECT version_num FROM alembic_version"))
+            current = set(result.scalars().all())
+    except exc.DBAPIError as e:
+        raise RuntimeError("Could not read alembic_version, run `alembic upgrade head` first") from e
+
+    if current != expected:
+        raise RuntimeError(
+            f"Database is at revision {', '.join(sorted(current)) or 'none'} but the code expects "
+            f"{', '.join(sorted(expected))}, run `alembic upgrade head` first"
+        )
+    return current
+
+
+async def create_tables():
+    """Create any missing tables straight from the models, for local development only."""
+    # Import every model module so their tables are registered on Base.metadata
+    from tuition.student import models as student_models  # noqa: F401
+    from tuition.institution import models as institution_models  # noqa: F401
+    from tuition.admin import models as admin_models  # noqa: F401
+    from tuition import email_outbox  # noqa: F401
+    from tuition import payments  # noqa: F401
+    from tuition import analytics  # noqa: F401
+
+    async with services.get("engine").begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
 # Dependency to provide the async session
 async def get_db():
-    async with SessionLocal() as db:
+    async with services.get("session_factory")() as db:
         try:
             yield db
         finally:
@@ -33,4 +262,3 @@ async def get_db():
 
 # Annotated to declare dependency for FastAPI routes
 db_dependency = Annotated[AsyncSession, Depends(get_db)]
-
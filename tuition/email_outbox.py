@@ -0,0 +1,277 @@
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text, func, insert, literal_column, text, update
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.future import select
+
+from tuition.config import Config
+from tuition.database import Base
+from tuition.logger import logger
+from tuition.services import services
+
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
+class EmailOutbox(Base):
+    __tablename__ = 'email_outbox'
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+
+    status = Column(String, nullable=False, default='pending')  # pending, sent or failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, default=utcnow, server_default=func.now())
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())  # timezone-aware
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Only pending rows are ever polled; sent ones pile up and stay out of the index
+        Index('ix_email_outbox_pending_next_attempt_at', 'next_attempt_at', postgresql_where=text("status = 'pending'"),
+              sqlite_where=text("status = 'pending'")),
+    )
+
+
+def enqueue_email(db, recipients, subject, body):
+    """Add a message per recipient to the outbox; it is sent once the caller commits."""
+    if isinstance(recipients, str):
+        recipients = [recipients]
+    for recipient in recipients:
+        db.add(EmailOutbox(recipient=recipient, subject=subject, body=body))
+
+
+async def enqueue_emails(db, messages):
+    """Add many (recipient, subject, body) messages to the outbox with one executemany."""
+    if messages:
+        await db.execute(insert(EmailOutbox.__table__), [
+            {"recipient": recipient, "subject": subject, "body": body} for recipient, subject, body in messages
+        ])
+
+
+class SmtpSink:
+    """Delivers over SMTP, one authenticated connection per ``connect()``."""
+
+    def __init__(self, hostname, port, username, password, sender, timeout, validate_certs=True):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender
+        self.timeout = timeout
+        self.validate_certs = validate_certs
+
+    @asynccontextmanager
+    async def connect(self):
+        import aiosmtplib
+
+        smtp = aiosmtplib.SMTP(hostname=self.hostname, port=self.port, use_tls=True, timeout=self.timeout,
+                               validate_certs=self.validate_certs)
+        await smtp.connect()
+        try:
+            await smtp.login(self.username, self.password)
+            yield SmtpConnection(smtp, self.sender)
+        finally:
+            try:
+                await smtp.quit()
+            except aiosmtplib.SMTPException:
+                smtp.close()
+
+
+class SmtpConnection:
+
+    def __init__(self, smtp, sender):
+        self.smtp = smtp
+        self.sender = sender
+
+    async def send(self, recipient, subject, body):
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = recipient
+        message["Subject"] = subject
+        message.set_content(body, subtype="html")
+        await self.smtp.send_message(message)
+
+
+class DryRunSink:
+    """Keeps messages in memory instead of sending them, for tests and local development.
+
+    Recipients listed in ``failing`` are rejected, to exercise retries.
+    """
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.sent = []
+        self.connections = 0
+
+    @asynccontextmanager
+    async def connect(self):
+        self.connections += 1
+        yield self
+
+    async def send(self, recipient, subject, body):
+        if recipient in self.failing:
+            raise ConnectionError(f"Recipient {recipient} rejected by dry run sink")
+        logger.info("Dry run email to %s: %s", recipient, subject)
+        self.sent.append((recipient, subject, body))
+
+
+class EmailOutboxWorker:
+    """Sends due outbox messages in batches, each over one sink connection.
+
+    Up to ``connections`` batches are claimed at once and sent in parallel.
+    Rows are claimed with ``FOR UPDATE SKIP LOCKED`` and leased by pushing
+    ``next_attempt_at`` forward, so several workers can poll the same table and
+    a message whose worker died is picked up again once the lease runs out.
+    A failed message is retried with exponential backoff until ``max_attempts``,
+    then marked failed; the rest of its batch is unaffected.
+    """
+
+    def __init__(self, session_factory, sink, batch_size, poll_interval, max_attempts, backoff, lease, connections=1):
+        self.session_factory = session_factory
+        self.sink = sink
+        self.batch_size = batch_size
+        self.connections = connections
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.lease = lease
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                handled = await self.process_batch()
+            except Exception:
+                logger.exception("Email outbox batch failed")
+                handled = 0
+            # Keep draining while there is a backlog, otherwise wait for new mail
+            if handled < self.batch_size * self.connections:
+                await asyncio.sleep(self.poll_interval)
+
+    async def process_batch(self):
+        messages = await self._claim()
+        if not messages:
+            return 0
+
+        batches = [messages[i:i + self.batch_size] for i in range(0, len(messages), self.batch_size)]
+        errors = {}
+        for batch_errors in await asyncio.gather(*(self._deliver(batch) for batch in batches)):
+            errors.update(batch_errors)
+
+        await self._record(messages, errors)
+        logger.info(f"Email outbox batch: {len(messages) - len(errors)} sent, {len(errors)} failed")
+        return len(messages)
+
+    async def _deliver(self, batch):
+        """Send a batch over one connection, returning {message id: error} for failures."""
+        errors = {}
+        try:
+            async with self.sink.connect() as connection:
+                for message in batch:
+                    try:
+                        await connection.send(message["recipient"], message["subject"], message["body"])
+                    except Exception as e:
+                        errors[message["id"]] = str(e) or type(e).__name__
+        except Exception as e:
+            logger.warning(f"Email sink connection failed: {e}")
+            for message in batch:
+                errors.setdefault(message["id"], str(e) or type(e).__name__)
+        return errors
+
+    async def _claim(self):
+        now = utcnow()
+        async with self.session_factory() as db:
+            stmt = (
+                select(EmailOutbox)
+                # Inlined rather than bound so a generic prepared plan still matches the partial index
+                .where(EmailOutbox.status == literal_column("'pending'"), EmailOutbox.next_attempt_at <= now)
+                .order_by(EmailOutbox.next_attempt_at)
+                .limit(self.batch_size * self.connections)
+                .with_for_update(skip_locked=True)
+            )
+            rows = (await db.execute(stmt)).scalars().all()
+            messages = [
+                {"id": row.id, "recipient": row.recipient, "subject": row.subject, "body": row.body, "attempts": row.attempts}
+                for row in rows
+            ]
+            for row in rows:
+                row.next_attempt_at = now + timedelta(seconds=self.lease)
+            await db.commit()
+        return messages
+
+    async def _record(self, messages, errors):
+        now = utcnow()
+        sent = [message["id"] for message in messages if message["id"] not in errors]
+        async with self.session_factory() as db:
+            if sent:
+                await db.execute(
+                    update(EmailOutbox)
+                    .where(EmailOutbox.id.in_(sent))
+                    .values(status='sent', sent_at=now, attempts=EmailOutbox.attempts + 1, last_error=None)
+                )
+            for message in messages:
+                error = errors.get(message["id"])
+                if error is None:
+                    continue
+                attempts = message["attempts"] + 1
+                values = {"attempts": attempts, "last_error": error}
+                if attempts >= self.max_attempts:
+                    values["status"] = 'failed'
+                    logger.warning(f"Giving up on email to {message['recipient']} after {attempts} attempts")
+                else:
+                    values["next_attempt_at"] = now + timedelta(seconds=self.backoff * 2 ** (attempts - 1))
+                await db.execute(update(EmailOutbox).where(EmailOutbox.id == message["id"]).values(**values))
+            await db.commit()
+
+
+def create_email_sink():
+    if Config.EMAIL_SINK == "dry_run":
+        return DryRunSink()
+    return SmtpSink(
+        hostname=Config.MAIL_SERVER,
+        port=Config.MAIL_PORT,
+        username=Config.MAIL_USERNAME,
+        password=Config.MAIL_PASSWORD,
+        sender=Config.MAIL_FROM,
+        timeout=Config.EMAIL_TIMEOUT,
+    )
+
+
+def create_email_outbox_worker():
+    return EmailOutboxWorker(
+        session_factory=services.get("session_factory"),
+        sink=services.get("email_sink"),
+        batch_size=Config.EMAIL_BATCH_SIZE,
+        poll_interval=Config.EMAIL_POLL_INTERVAL,
+        max_attempts=Config.EMAIL_MAX_ATTEMPTS,
+        backoff=Config.EMAIL_RETRY_BACKOFF,
+        lease=Config.EMAIL_CLAIM_LEASE,
+        connections=Config.EMAIL_SMTP_CONNECTIONS,
+    )
+
+
+services.register("email_sink", create_email_sink)
+services.register("email_outbox_worker", create_email_outbox_worker, close=lambda worker: worker.close())
@@ -0,0 +1,87 @@
+from dataclasses import dataclass
+from pathlib import Path
+
+from tuition.services import services
+
+TEMPLATE_DIR = Path(__file__).resolve().parent / 'templates'
+
+
+@dataclass
+class VerificationEmail:
+    link: str
+
+    template = "verification.html"
+    subject = "Email Account Verification"
+
+
+@dataclass
+class PasswordResetEmail:
+    link: str
+
+    template = "password_reset.html"
+    subject = "Password Reset Request"
+
+
+@dataclass
+class PasswordSetupEmail:
+    link: str
+    name_of_institution: str
+    expires_in_days: int
+
+    template = "password_setup.html"
+    subject = "Set Up Your Tuition Account"
+
+
+class EmailTemplates:
+    """Renders email bodies from the Jinja templates in ``tuition/templates``.
+
+    Every template is compiled once, by ``start()`` at app startup or on first
+    use, and kept for the life of the process; files are not re-read when they
+    change. A context is any object with ``template`` and ``subject``
+    attributes whose fields are the template's variables, like
+    ``VerificationEmail``. New notification emails need a template extending
+    ``base.html`` and a context class.
+    """
+
+    def __init__(self, directory=TEMPLATE_DIR):
+        from jinja2 import Environment, FileSystemLoader, StrictUndefined, select_autoescape
+
+        self.env = Environment(
+            loader=FileSystemLoader(directory),
+            autoescape=select_autoescape(["html"]),
+            undefined=StrictUndefined,
+            trim_blocks=True,
+            lstrip_blocks=True,
+            auto_reload=False,
+            cache_size=-1,
+        )
+        self._templates = {}
+
+    def start(self):
+        for name in self.env.list_templates(extensions=["html"]):
+            self.get(name)
+
+    def get(self, name):
+        try:
+            return self._templates[name]
+        except KeyError:
+            template = self._templates[name] = self.env.get_template(name)
+            return template
+
+    def render(self, context):
+        """Return ``(subject, body)`` for one context."""
+        return context.subject, self.get(context.template).render(vars(context))
+
+    def render_many(self, contexts):
+        """Return ``(subject, body)`` for each context, in order, looking each template up once."""
+        rendered = []
+        template_name = template = None
+        for context in contexts:
+            if context.template != template_name:
+                template_name = context.template
+                template = self.get(template_name)
+            rendered.append((context.subject, template.render(vars(context))))
+        return rendered
+
+
+services.register("email_templates", EmailTemplates)
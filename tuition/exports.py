@@ -0,0 +1,119 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.future import select
+
+from tuition.config import Config
+from tuition.logger import logger
+from tuition.services import services
+from tuition.student.models import Transaction
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+TRANSACTION_EXPORT_COLUMNS = (
+    Transaction.id,
+    Transaction.transaction_date,
+    Transaction.title,
+    Transaction.description,
+    Transaction.transaction_type,
+    Transaction.amount,
+    Transaction.currency,
+    Transaction.status,
+    Transaction.payment_method,
+    Transaction.student_id,
+    Transaction.student_name,
+    Transaction.institution_id,
+)
+
+
+def _naive_utc(value):
+    # transaction_date is stored without a time zone, in UTC
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def filter_transactions(stmt, start=None, end=None, transaction_status=None):
+    """Restrict a transactions query to ``start <= transaction_date < end`` and a status."""
+    start, end = _naive_utc(start), _naive_utc(end)
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The start date must be earlier than the end date."
+        )
+    if start is not None:
+        stmt = stmt.where(Transaction.transaction_date >= start)
+    if end is not None:
+        stmt = stmt.where(Transaction.transaction_date < end)
+    if transaction_status is not None:
+        stmt = stmt.where(Transaction.status == transaction_status)
+    return stmt
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)  # UUID and Decimal, kept exact
+
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def ndjson_chunk(keys, rows):
+    return "".join(json.dumps(dict(zip(keys, row)), default=_json_default) + "\n" for row in rows)
+
+
+def csv_chunk(rows, header=None):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header is not None:
+        writer.writerow(header)
+    writer.writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+async def stream_export(stmt, export_format, batch_size=None):
+    """Yield the rows of ``stmt`` encoded as NDJSON or CSV, one chunk per batch.
+
+    Runs in its own session, since the request's session is closed before a
+    streaming response is sent. Rows come from a server-side cursor
+    ``batch_size`` at a time, so memory use doesn't grow with the export.
+    """
+    batch_size = batch_size or Config.EXPORT_BATCH_SIZE
+    keys = [column.key for column in stmt.selected_columns]
+    exported = 0
+    async with services.get("session_factory")() as db:
+        result = await db.stream(stmt.execution_options(yield_per=batch_size))
+        if export_format == "csv":
+            yield csv_chunk([], header=keys)
+        async for rows in result.partitions():
+            exported += len(rows)
+            yield ndjson_chunk(keys, rows) if export_format == "ndjson" else csv_chunk(rows)
+    logger.info(f"Exported {exported} rows as {export_format}")
+
+
+def transaction_export_response(scope, export_format, start=None, end=None, transaction_status=None):
+    """Stream the transactions matching ``scope`` (a list of where clauses), oldest first."""
+    if export_format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported export format, use one of: {', '.join(EXPORT_MEDIA_TYPES)}"
+        )
+    stmt = select(*TRANSACTION_EXPORT_COLUMNS).where(*scope)
+    stmt = filter_transactions(stmt, start, end, transaction_status)
+    stmt = stmt.order_by(Transaction.transaction_date, Transaction.id)
+    return StreamingResponse(
+        stream_export(stmt, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="transactions.{export_format}"'},
+    )
@@ -0,0 +1,261 @@
+import csv
+import hashlib
+import io
+import json
+import secrets
+import uuid
+from itertools import islice
+
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.future import select
+from starlette.concurrency import run_in_threadpool
+
+import tuition.security.hash as hashing
+from tuition.admin.models import Admin
+from tuition.config import Config
+from tuition.email_outbox import enqueue_emails
+from tuition.email_templates import PasswordSetupEmail
+from tuition.institution.models import Institution, Program, SubAccount, program_category_association
+from tuition.institution.schemas import InstitutionDetails, ProgramImport
+from tuition.logger import logger
+from tuition.security.jwt import create_url_safe_token
+from tuition.services import services
+from tuition.student.models import Student
+
+IMPORT_FORMATS = ("ndjson", "csv")
+
+
+def _ndjson_records(text):
+    for line in text:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield None, "Each line must be a JSON object"
+            continue
+        yield record, None
+
+
+def _csv_records(text):
+    for record in csv.DictReader(text):
+        if None in record:
+            yield None, "Row has more cells than the header"
+            continue
+        # An empty cell means the field was left out, so optional fields fall back to their default
+        yield {key: value for key, value in record.items() if value not in ("", None)}, None
+
+
+def _error_messages(error):
+    return [
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" if detail['loc'] else detail['msg']
+        for detail in error.errors()
+    ]
+
+
+def _read_chunk(records, schema, first_row, size):
+    """Parse and validate up to ``size`` records, returning (valid, errors) keyed by row number."""
+    valid, errors = [], []
+    for row, (record, problem) in enumerate(islice(records, size), start=first_row):
+        if problem is not None:
+            errors.append({"row": row, "errors": [problem]})
+            continue
+        try:
+            valid.append((row, schema.model_validate(record)))
+        except ValidationError as e:
+            errors.append({"row": row, "errors": _error_messages(e)})
+    return valid, errors
+
+
+async def read_chunks(upload, import_format, schema, chunk_size):
+    """Yield (valid, errors) for each chunk of an uploaded NDJSON or CSV file.
+
+    The file is read, parsed and validated a chunk at a time on a worker
+    thread, so neither a large upload nor pydantic holds up the event loop
+    and memory use doesn't grow with the file. Rows are numbered from 1,
+    not counting the CSV header or blank lines.
+    """
+    text = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+    records = _ndjson_records(text) if import_format == "ndjson" else _csv_records(text)
+    row = 1
+    try:
+        while True:
+            valid, errors = await run_in_threadpool(_read_chunk, records, schema, row, chunk_size)
+            if not valid and not errors:
+                return
+            row += len(valid) + len(errors)
+            yield valid, errors
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"The file must be UTF-8 encoded, row {row} onwards could not be read"
+        )
+    finally:
+        text.detach()
+
+
+async def _registered_emails(db, emails):
+    """Emails out of ``emails`` already used by a student, institution or admin."""
+    taken = set()
+    for model in (Student, Institution, Admin):
+        taken.update((await db.execute(select(model.email).where(model.email.in_(emails)))).scalars().all())
+    return taken
+
+
+def password_fingerprint(hashed_password):
+    """Ties a password setup link to the hash it replaces, so the link stops working once it is used."""
+    return hashlib.sha256(hashed_password.encode()).hexdigest()[:16]
+
+
+def password_setup_link(email, fingerprint):
+    token = create_url_safe_token({"email": email, "purpose": "password_setup", "fingerprint": fingerprint})
+    return f"{Config.SSL_PREFIX}://{Config.FRONTEND_URL}/institution/password-setup/{token}"
+
+
+async def import_institutions(db, rows, errors, unusable_hash):
+    """Insert a chunk of validated institutions and queue their password setup emails.
+
+    Nobody knows the password behind ``unusable_hash``, so an imported
+    institution can't sign in until it follows the link in its email.
+    """
+    taken = await _registered_emails(db, [details.email for _, details in rows])
+    new = {}
+    for row, details in rows:
+        if details.email in taken or details.email in new:
+            errors.append({"row": row, "errors": ["Email already exists"]})
+        else:
+            new[details.email] = (row, details)
+    if not new:
+        return 0
+
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    # An executemany, batched into multi-row INSERTs by the driver; a signup racing the import keeps its email
+    stmt = (
+        dialect.insert(Institution.__table__)
+        .on_conflict_do_nothing(index_elements=["email"])
+        .returning(Institution.email)
+    )
+    inserted = (await db.execute(stmt, [
+        {**details.model_dump(), "id": uuid.uuid4(), "role": "user", "is_verified": False,
+         "hashed_password": unusable_hash}
+        for _, details in new.values()
+    ])).scalars().all()
+    for email in new.keys() - set(inserted):
+        row, _ = new[email]
+        errors.append({"row": row, "errors": ["Email already exists"]})
+
+    expires_in_days = Config.PASSWORD_SETUP_TOKEN_MAX_AGE // 86400
+    fingerprint = password_fingerprint(unusable_hash)
+    contexts = [
+        PasswordSetupEmail(link=password_setup_link(email, fingerprint),
+                           name_of_institution=new[email][1].name_of_institution, expires_in_days=expires_in_days)
+        for email in inserted
+    ]
+    rendered = services.get("email_templates").render_many(contexts)
+    await enqueue_emails(db, [(email, subject, body) for email, (subject, body) in zip(inserted, rendered)])
+    await db.commit()
+    return len(inserted)
+
+
+async def import_programs(db, rows, errors):
+    """Insert a chunk of validated programs for institutions already on the platform.
+
+    A program whose institution has no bank details is rejected, as in the
+    create program form, since it couldn't be paid for. So is one matching an
+    existing program's institution, name and level, which makes re-running a
+    partly failed import safe.
+    """
+    emails = list({program.institution_email for _, program in rows})
+    institutions = {
+        email: (institution_id, subaccount_id) for email, institution_id, subaccount_id in (await db.execute(
+            select(Institution.email, Institution.id, SubAccount.subaccount_id)
+            .outerjoin(SubAccount, SubAccount.institution_id == Institution.id)
+            .where(Institution.email.in_(emails))
+        )).all()
+    }
+
+    candidates = []
+    for row, program in rows:
+        institution_id, subaccount_id = institutions.get(program.institution_email, (None, None))
+        if institution_id is None:
+            errors.append({"row": row, "errors": ["Institution not found"]})
+        elif subaccount_id is None:
+            errors.append({"row": row, "errors": ["Subaccount not found, Add Instition account details before creating a Program"]})
+        else:
+            candidates.append((row, program, institution_id, subaccount_id))
+    if not candidates:
+        return 0
+
+    # Keyed by institution only, a chunk touches far fewer institutions than programs and each bound value costs
+    existing = set((await db.execute(
+        select(Program.institution_id, Program.name_of_program, Program.program_level)
+        .where(Program.institution_id.in_({institution_id for _, _, institution_id, _ in candidates}))
+    )).all())
+
+    programs, links, categories = [], [], set()
+    for row, program, institution_id, subaccount_id in candidates:
+        key = (institution_id, program.name_of_program, program.program_level.value)
+        if key in existing:
+            errors.append({"row": row, "errors": ["Program already exists"]})
+            continue
+        existing.add(key)
+        program_id = uuid.uuid4()
+        programs.append({
+            "id": program_id, "institution_id": institution_id, "subaccount_id": subaccount_id,
+            **program.model_dump(exclude={"institution_email", "categories"}),
+            "program_level": program.program_level.value,
+        })
+        names = [category.value for category in program.categories]
+        links.append((program_id, names))
+        categories.update(names)
+    if not programs:
+        return 0
+
+    category_ids = await services.get("category_cache").resolve(db, categories)
+    await db.execute(insert(Program.__table__), programs)
+    associations = [{"program_id": program_id, "category_id": category_ids[name]}
+                    for program_id, names in links for name in names if name in category_ids]
+    if associations:
+        await db.execute(insert(program_category_association), associations)
+    await db.commit()
+    return len(programs)
+
+
+async def run_import(db, upload, kind, import_format, chunk_size=None):
+    """Import institutions or programs from an uploaded file, returning the per-row report."""
+    if import_format not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported import format, use one of: {', '.join(IMPORT_FORMATS)}"
+        )
+    chunk_size = chunk_size or Config.IMPORT_CHUNK_SIZE
+    schema = InstitutionDetails if kind == "institutions" else ProgramImport
+    # One bcrypt hash shared by every institution in the import, instead of one per row
+    unusable_hash = await hashing.hash_password(secrets.token_urlsafe(32)) if kind == "institutions" else None
+
+    rows = imported = 0
+    errors = []
+    async for valid, chunk_errors in read_chunks(upload, import_format, schema, chunk_size):
+        rows += len(valid) + len(chunk_errors)
+        errors.extend(chunk_errors)
+        if valid:
+            if kind == "institutions":
+                imported += await import_institutions(db, valid, errors, unusable_hash)
+            else:
+                imported += await import_programs(db, valid, errors)
+
+    errors.sort(key=lambda error: error["row"])
+    logger.info(f"Imported {imported} of {rows} {kind} from {import_format}, {len(errors)} rows rejected")
+    return {
+        "kind": kind,
+        "rows": rows,
+        "imported": imported,
+        "rejected": len(errors),
+        "errors": errors,
+    }
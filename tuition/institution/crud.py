@@ -1,11 +1,16 @@
 from fastapi import HTTPException, status, UploadFile, File
 from fastapi.responses import JSONResponse
-from tuition.security.hash import Hash
+import tuition.security.hash as hashing
 from sqlalchemy.future import select
 from tuition.security.jwt import create_access_token, decode_url_safe_token, create_access_token_institution
 from tuition.emails_utils import SmtpMailService
 from tuition.institution.schemas import InstitutionResponse
-from tuition.src_utils import upload_image_to_supabase
+from tuition.storage import delete_image, upload_image
+from tuition.exports import transaction_export_response
+from tuition.student.models import Transaction
+from tuition.analytics import get_institution_analytics
+from tuition.config import Config
+from tuition.imports import password_fingerprint
 
 
 from tuition.institution.models import Institution, Event
@@ -16,22 +21,22 @@ from tuition.logger import logger
 from concurrent.futures import ThreadPoolExecutor
 executor = ThreadPoolExecutor()
 
-async def sign_up_institution(db, payload, background_task):
+async def sign_up_institution(db, payload):
     logger.info("Creating a new Institution: %s", payload.email)
 
     await admin_utils.check_existing_email(db, payload.email)
     await student_utils.check_existing_email(db, payload.email)
     await institution_utils.check_existing_email(db, payload.email)
 
-    hashed_password = Hash.bcrypt(payload.password)
+    hashed_password = await hashing.hash_password(payload.password)
     new_institution = institution_utils.create_institution(payload, hashed_password)
 
     db.add(new_institution)
+    # Queue the verification email in the same transaction as the new institution
+    smtp_service = SmtpMailService(new_institution.email)
+    smtp_service.queue_verification_email(db, user = "institution")
     await db.commit()
     await db.refresh(new_institution)
-    # Send verification email to the new student's email address
-    smtp_service = SmtpMailService(new_institution.email)     
-    background_task.add_task(smtp_service.send_verification_email, user = "institution")
     
     logger.info(f"Institution {new_institution.email} has been created")
     return new_institution
@@ -159,11 +164,12 @@ Code base to be edited later for refresh inclussion and avoid hitting db server
 End
 """
 
-async def login_institution(db, payload):
+async def login_institution(db, payload, institution=None):
     logger.info(f"Login attempt for Institution: {payload.username}")
 
     email = payload.username
-    institution = await institution_utils.get_institution_by_email(db, email)
+    if institution is None:
+        institution = await institution_utils.get_institution_by_email(db, email)
     if not institution:
         logger.warning(f"Institution with email {email} not found")
         raise HTTPException(
@@ -174,7 +180,7 @@ async def login_institution(db, payload):
     logger.info(f"Institution found***********: {email}")
     institution_utils.check_if_verified(institution)
     institution_object = InstitutionResponse.model_validate(institution)
-    institution_utils.verify_password(payload.password, institution.hashed_password)
+    await institution_utils.verify_password(payload.password, institution.hashed_password)
     
     access_token =  create_access_token_institution(data = {
         "sub" : email
@@ -190,7 +196,7 @@ async def login_institution(db, payload):
 
 async def add_bank_details(db, payload, current_institution):
     logger.info(f"Bank details upload attempt for Institution: {current_institution.email}")
-    institution = await institution_utils.get_institution_by_email(db, current_institution.email)
+    institution = current_institution.get("institution")
     if institution is None:
         logger.warning(f"Institution not found: {current_institution.email}")
         raise HTTPException(status_code=404, detail="Institution not found and You do not have access to this endpoint")
@@ -216,25 +222,31 @@ async def create_program(db, payload, Image: UploadFile, current_institution):
         #Write a function to validate if program already exists
         logger.info("Validations done!!!")
 
-        institution = await institution_utils.get_institution_by_email(db, current_institution.email)
+        institution = current_institution.get("institution")
         if institution is None:
             logger.warning(f"Institution not found: {current_institution.email}")
             raise HTTPException(status_code=404, detail="Institution not found and You do not have access to this endpoint")
 
+        # Checked before uploading, so a rejected request never stores an image
         subaccount = await institution_utils.get_subaccount_id_by_institution(db, institution.id)
         if not subaccount:
             logger.warning(f"Subaccount not found for Institution: {current_institution.email}")
             raise HTTPException(status_code=404, detail="Subaccount not found, Add Instition account details before creating a Program")
-        #  upload image
-        image_url = await upload_image_to_supabase(Image)
+
+        image_url = await upload_image(Image)
         if not image_url:
             raise HTTPException(status_code=500, detail="Image upload failed")
         
-        # Now create the program with the image URL
+        # Now create the program with the image URL, removing the image again if that fails
         payload['image_url'] = image_url
-        new_program = await institution_utils.create_new_program(db, payload, institution.id, subaccount.subaccount_id)
+        try:
+            new_program = await institution_utils.create_new_program(db, payload, institution.id, subaccount.subaccount_id)
 
-        await institution_utils.update_category_program_relation(db, payload["categories"], new_program["id"])
+            await institution_utils.update_category_program_relation(db, payload["categories"], new_program["id"])
+            await db.commit()
+        except BaseException:
+            await delete_image(image_url)
+            raise
 
         return new_program
 
@@ -245,16 +257,18 @@ async def create_event(db, payload, image, current_institution):
     await institution_utils.validate_cost(payload['cost'], payload['is_free'])
     await institution_utils.validate_end_date_deadline(payload['application_deadline'], payload['end_date'])
 
-    institution = await institution_utils.get_institution_by_email(db, current_institution.email)
+    institution = current_institution.get("institution")
     if institution is None:
         logger.warning(f"Institution not found: {current_institution.email}")
         raise HTTPException(status_code=404, detail="Institution not found and You do not have access to this endpoint")
     
+    # Checked before uploading, so a rejected request never stores an image
     subaccount = await institution_utils.get_subaccount_id_by_institution(db, institution.id)
     if not subaccount:
             logger.warning(f"Subaccount not found for Institution: {current_institution.email}")
             raise HTTPException(status_code=404, detail="Subaccount not found, Add Instition account details before creating a Program")
-    image_url = await upload_image_to_supabase(image)
+
+    image_url = await upload_image(image)
     if not image_url:
             raise HTTPException(status_code=500, detail="Image upload failed")
     new_event = Event(
@@ -289,8 +303,63 @@ async def create_event(db, payload, image, current_institution):
     }
 
     db.add(new_event)
-    await db.commit()
+    try:
+        await db.commit()
+    except BaseException:
+        await delete_image(image_url)
+        raise
     return event_json
 
 
+async def export_transactions(current_institution, export_format, start=None, end=None, transaction_status=None):
+    logger.info(f"Exporting transactions as {export_format} for Institution: {current_institution.email}")
 
+    institution = current_institution.get("institution")
+    if institution is None:
+        raise HTTPException(status_code=404, detail="Institution not found and You do not have access to this endpoint")
+    institution_utils.check_if_verified(institution)
+
+    scope = [Transaction.institution_id == institution.id]
+    return transaction_export_response(scope, export_format, start, end, transaction_status)
+
+
+async def get_analytics(db, current_institution):
+    logger.info(f"Loading analytics for Institution: {current_institution.email}")
+
+    institution = current_institution.get("institution")
+    if institution is None:
+        raise HTTPException(status_code=404, detail="Institution not found and You do not have access to this endpoint")
+    institution_utils.check_if_verified(institution)
+
+    return await get_institution_analytics(db, institution.id)
+
+
+async def set_up_password(db, token, new_password):
+    logger.info("Setting up the password of an imported Institution")
+
+    token_data = decode_url_safe_token(token, max_age=Config.PASSWORD_SETUP_TOKEN_MAX_AGE)
+    if not token_data or token_data.get("purpose") != "password_setup":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid or expired password setup link"
+        )
+
+    email = token_data.get("email")
+    institution = await institution_utils.get_institution_by_email(db, email)
+    if not institution:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Institution not found")
+    # The link only works until a password is set
+    if token_data.get("fingerprint") != password_fingerprint(institution.hashed_password):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="This account has already been set up"
+        )
+
+    institution.hashed_password = await hashing.hash_password(new_password)
+    institution.is_verified = True
+    await db.commit()
+
+    logger.info(f"Institution {email} set up its password")
+    return {
+        "message": "Password set up successfully"
+    }
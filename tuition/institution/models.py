@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, String, Text, ForeignKey, Numeric, DateTime, func, CHAR, CheckConstraint, Table, Integer
+from sqlalchemy import Column, DateTime, String, Text, ForeignKey, Numeric, DateTime, func, CHAR, CheckConstraint, Table, Integer, Index, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from sqlalchemy.orm import relationship
@@ -9,7 +9,7 @@ from tuition.database import Base
 class Institution(Base):
     __tablename__ = 'institutions'
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
 
     role = Column(String, nullable=False, default='user')
     name_of_institution = Column(String(255), nullable=False)
@@ -31,11 +31,16 @@ class Institution(Base):
     transactions = relationship('Transaction', back_populates='institution')
     events = relationship('Event', back_populates='institution')
 
+    __table_args__ = (
+        # Keyset pagination walks institutions newest first on (created_at, id)
+        Index('ix_institutions_created_at_id', 'created_at', 'id'),
+    )
+
 
 class SubAccount(Base):
     __tablename__ = 'sub_accounts'
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     institution_id = Column(UUID, ForeignKey('institutions.id'))
     subaccount_id = Column(String, unique=True, default= None)
     account_name = Column(String(255), nullable=False)
@@ -53,16 +58,21 @@ class SubAccount(Base):
 
     institution = relationship('Institution', back_populates='sub_accounts')
 
+    __table_args__ = (
+        Index('ix_sub_accounts_institution_id', 'institution_id'),
+    )
+
 program_category_association = Table(
     'program_category_association',
     Base.metadata,
     Column('program_id', UUID(as_uuid=True), ForeignKey('programs.id')),
-    Column('category_id', UUID(as_uuid=True), ForeignKey('categories.id'))
+    Column('category_id', UUID(as_uuid=True), ForeignKey('categories.id')),
+    Index('ix_program_category_association_program_id_category_id', 'program_id', 'category_id'),
 )
 
 class Category(Base):
     __tablename__ = 'categories'
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String(255), nullable=False, unique=True)
 
     programs = relationship(
@@ -73,7 +83,7 @@ class Category(Base):
 
 class Program(Base):
     __tablename__ = 'programs'
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     program_level = Column(String(255), nullable=False)
     name_of_program = Column(String(255), nullable=False)
     institution_id = Column(UUID, ForeignKey('institutions.id'))
@@ -103,6 +113,9 @@ class Program(Base):
             "(application_deadline > now()) OR (application_deadline IS NULL)", 
             name="check_application_deadline_future"
         ),
+        Index('ix_programs_institution_id', 'institution_id'),
+        # Level listings filter on the level and page through deadline then id
+        Index('ix_programs_program_level_application_deadline_id', 'program_level', 'application_deadline', 'id'),
     )
 
 
@@ -110,7 +123,7 @@ class Event(Base):
 
     __tablename__ = 'events'
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name_of_event = Column(String, nullable=False)
     institution_id = Column(UUID, ForeignKey('institutions.id'))
     description = Column(Text, nullable=False)
@@ -128,8 +141,39 @@ class Event(Base):
     currency_code = Column(CHAR(3), nullable=False)
     image_url = Column(String, nullable=False)
     capacity = Column(Integer, nullable=False)
+    # Only ever changed by a conditional UPDATE, see institution.utils.claim_event_seat
+    seats_taken = Column(Integer, nullable=False, default=0, server_default='0')
 
 
 
     institution = relationship("Institution", back_populates='events')
+    registrations = relationship('EventRegistration', back_populates='event')
+
+    __table_args__ = (
+        CheckConstraint("seats_taken >= 0 AND seats_taken <= capacity", name="check_event_seats_within_capacity"),
+        Index('ix_events_institution_id', 'institution_id'),
+        # Upcoming events are listed and paged by (start_date, id)
+        Index('ix_events_start_date_id', 'start_date', 'id'),
+    )
+
+    @property
+    def seats_remaining(self):
+        return self.capacity - self.seats_taken
+
+
+class EventRegistration(Base):
+
+    __tablename__ = 'event_registrations'
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    event_id = Column(UUID, ForeignKey('events.id'), nullable=False)
+    student_id = Column(UUID, ForeignKey('students.id'), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())  # timezone-aware
+
+    event = relationship("Event", back_populates='registrations')
+
+    __table_args__ = (
+        # A student holds one seat per event
+        UniqueConstraint('event_id', 'student_id', name='uq_event_registrations_event_id_student_id'),
+    )
 
@@ -2,12 +2,13 @@ from decimal import Decimal
 from typing import List
 from datetime import datetime
 from typing import Annotated,Optional, Literal
-from fastapi import APIRouter, status, BackgroundTasks, Depends, UploadFile, Form, HTTPException
+from fastapi import APIRouter, status, Depends, UploadFile, Form, HTTPException, Query
 
-from tuition.institution.schemas import Login, InstitutionSignup, InstitutionResponse, InstitutionBank, ProgramLevel, Category
+from tuition.institution.schemas import InstitutionSignup, InstitutionResponse, InstitutionBank, ProgramLevel, Category, InstitutionAnalytics
 from tuition.database import db_dependency
 from tuition.institution import crud
-from tuition.security.oauth2 import get_current_user
+from tuition.security.oauth2 import get_current_principal, Principal
+from tuition.student.schemas import PasswordResetConfirm
 
 institution_router = APIRouter(
     prefix="/institution",
@@ -15,11 +16,11 @@ institution_router = APIRouter(
 )
 
 @institution_router.post("/signup", response_model= InstitutionResponse, status_code=status.HTTP_201_CREATED)
-async def sign_up_institution(db: db_dependency, payload: InstitutionSignup, background_tasks: BackgroundTasks):
+async def sign_up_institution(db: db_dependency, payload: InstitutionSignup):
     """
     ## Creates a new institution account
 
-    This endpoint registers a new institution in the system by storing its details in the database. It may also trigger background tasks, such as sending a welcome email.
+    This endpoint registers a new institution in the system by storing its details in the database. It also queues a verification email.
 
     ### Parameters:
     - **db**: Database session dependency used to interact with the database.
@@ -33,8 +34,6 @@ async def sign_up_institution(db: db_dependency, payload: InstitutionSignup, bac
         - **official_name**: The official name of the institution (str) with a minimum length of 3 and a maximum length of 255 characters.
         - **brief_description**: A brief description of the institution (str) with a minimum length of 10 and a maximum length of 500 characters.
 
-    - **background_tasks**: A FastAPI BackgroundTasks object used to execute background processes, such as sending a confirmation or welcome email.
-
     ### Returns:
     - An `InstitutionResponse` object with the details of the newly created institution.
 
@@ -42,7 +41,7 @@ async def sign_up_institution(db: db_dependency, payload: InstitutionSignup, bac
     - **201 Created**: Indicates that the institution account was successfully created.
     """
 
-    return await crud.sign_up_institution(db, payload, background_tasks)
+    return await crud.sign_up_institution(db, payload)
 
 
 @institution_router.get('/verify/{token}', status_code= status.HTTP_200_OK)
@@ -70,8 +69,26 @@ async def verify_account(token : str, db :db_dependency) -> str:
     return await crud.verify_user_account(token, db)
 
 
+@institution_router.post('/password-setup/{token}', status_code=status.HTTP_200_OK)
+async def set_up_password(token: str, payload: PasswordResetConfirm, db: db_dependency):
+    """
+    ## Sets the password of an institution added by an admin import
+
+    Institutions imported by an admin are emailed a link to this endpoint instead of choosing a password at signup.
+    Setting the password also verifies the account, and the link can only be used once.
+
+    ### Parameters:
+    - **token**: The token from the password setup link.
+    - **payload**: The new password (`new_password`) and its confirmation (`confirm_password`).
+
+    ### Returns:
+    - A 200 OK response once the password is set; the institution can then log in.
+    """
+    return await crud.set_up_password(db, token, payload.new_password)
+
+
 @institution_router.post("/add_bank_details", status_code= status.HTTP_201_CREATED)
-async def add_bank_details(db: db_dependency, payload : InstitutionBank, current_institution : Login = Depends(get_current_user)):
+async def add_bank_details(db: db_dependency, payload : InstitutionBank, current_institution: Principal = Depends(get_current_principal)):
     """
     ## Adds bank details for the institution
 
@@ -88,7 +105,7 @@ async def add_bank_details(db: db_dependency, payload : InstitutionBank, current
         - `country` (str): The country where the bank is located.
         - `currency` (str): The currency associated with the account.
 
-    - `current_institution` (Login): The currently authenticated institution 
+    - `current_institution` (Principal): The currently authenticated institution 
       (automatically retrieved from the authentication dependency).
 
     **Returns:**
@@ -116,7 +133,7 @@ async def create_program(
     image: UploadFile,
     application_deadline: Optional[datetime] = Form(None),
     cost: Optional[Decimal] = Form(None),
-    current_institution: Login = Depends(get_current_user)
+    current_institution: Principal = Depends(get_current_principal)
 ):
     
     """
@@ -140,7 +157,7 @@ async def create_program(
     - `application_deadline` (Optional[datetime]): The deadline for program applications.
     - `cost` (Optional[Decimal]): The cost of the program.
 
-    - `current_institution` (Login): The currently authenticated institution 
+    - `current_institution` (Principal): The currently authenticated institution 
       (automatically retrieved from the authentication dependency).
 
     **Returns:**
@@ -198,7 +215,7 @@ async def create_event(
         image: UploadFile,
         capacity: Annotated[int, Form()],
         cost : Optional[Decimal] = Form(None),
-        current_institution: Login = Depends(get_current_user)
+        current_institution: Principal = Depends(get_current_principal)
 ):
     
     """
@@ -220,7 +237,7 @@ async def create_event(
     - `image` (UploadFile): An image file representing the event.
     - `capacity` (str): The capacity of the event.
     
-    - `current_institution` (Login): The currently authenticated institution
+    - `current_institution` (Principal): The currently authenticated institution
     **Returns:**
     - (str): A success message indicating that the event has been created.
     
@@ -249,6 +266,36 @@ async def create_event(
     
 
 
+@institution_router.get('/transactions/export', status_code=status.HTTP_200_OK)
+async def export_transactions(
+                            export_format : Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+                            start : Optional[datetime] = None,
+                            end : Optional[datetime] = None,
+                            status_filter : Optional[str] = Query(None, alias="status"),
+                            current_institution: Principal = Depends(get_current_principal)
+                            ):
+    """
+    ## Export the institution's transactions
 
+    Streams every payment made to the institution that matches the filters, oldest first, as a file download.
+    ### Parameters:
+    - **format**: `ndjson` (one JSON object per line) or `csv`.
+    - **start**, **end**: Optional ISO 8601 bounds on `transaction_date`, start inclusive and end exclusive.
+    - **status**: Optional transaction status to filter on, e.g. `pending`.
+    ### Returns:
+    - A streamed `transactions.ndjson` or `transactions.csv` attachment.
+    """
+    return await crud.export_transactions(current_institution, export_format, start, end, status_filter)
 
 
+@institution_router.get('/analytics', response_model=InstitutionAnalytics, status_code=status.HTTP_200_OK)
+async def get_analytics(db: db_dependency, current_institution: Principal = Depends(get_current_principal)):
+    """
+    ## Institution dashboard figures
+
+    Reads the institution's running totals instead of counting its applications and transactions on every load.
+    ### Returns:
+    - **programs**: Each of the institution's programs with its number of applications.
+    - **payments**: Per currency, the number of pending and successful transactions and the revenue from successful ones.
+    """
+    return await crud.get_analytics(db, current_institution)
@@ -1,13 +1,15 @@
 import re
 
-from typing import Optional, Literal, Annotated
-from pydantic import BaseModel, field_validator, ValidationInfo, ConfigDict, Field, EmailStr
-from datetime import date
+from decimal import Decimal
+from typing import Optional, Literal, Annotated, List, Dict
+from pydantic import BaseModel, field_validator, model_validator, ValidationInfo, ConfigDict, Field, EmailStr, UUID4
+from datetime import date, datetime, timezone
 
 from fastapi import UploadFile
 
 
-class InstitutionSignup(BaseModel):
+class InstitutionDetails(BaseModel):
+    """An institution's profile, as given at signup or in an admin bulk import."""
 
     name_of_institution: str = Field(..., min_length=3, max_length=255)
     type_of_institution: str = Field(..., min_length=3, max_length=100)
@@ -17,6 +19,16 @@ class InstitutionSignup(BaseModel):
     country: str = Field(..., min_length=2, max_length=100)
     official_name: str = Field(..., min_length=3, max_length=255)
     brief_description: str = Field(..., min_length=10, max_length=500)
+
+    @field_validator('name_of_institution', 'email', 'country')
+    def non_empty_strings(cls, value):
+        if not value or value.strip() == "":
+            raise ValueError('This field cannot be empty')
+        return value
+
+
+class InstitutionSignup(InstitutionDetails):
+
     password: str = Field(..., min_length=8, max_length=100)
     confirm_password: str = Field(..., min_length=8, max_length=100)
 
@@ -40,13 +52,6 @@ class InstitutionSignup(BaseModel):
         if password and value != password:
             raise ValueError('Passwords do not match')
         return value
-    
-    
-    @field_validator('name_of_institution', 'email', 'country')
-    def non_empty_strings(cls, value):
-        if not value or value.strip() == "":
-            raise ValueError('This field cannot be empty')
-        return value
 
     
 
@@ -66,6 +71,81 @@ class InstitutionResponse(BaseModel):
         from_attributes=True
         )
     
+class ProgramResponse(BaseModel):
+    id : UUID4
+    name_of_program : str
+    program_level : str
+    institution_id : Optional[UUID4] = None
+    application_deadline : Optional[datetime] = None
+    always_available : bool = False
+    description : Optional[str] = None
+    cost : Optional[Decimal] = None
+    is_free : bool = False
+    currency_code : str
+    image_url : str
+    categories : List[str] = []
+
+    model_config = ConfigDict(
+        from_attributes=True
+        )
+
+    @field_validator("categories", mode="before")
+    @classmethod
+    def category_names(cls, categories):
+        return [category if isinstance(category, str) else category.name for category in categories]
+
+
+class ProgramPage(BaseModel):
+    programs : List[ProgramResponse]
+    next_cursor : Optional[str] = None
+    links : Dict[str, Dict[str, str]] = Field(default_factory=dict, serialization_alias="_links")
+
+class EventResponse(BaseModel):
+    id : UUID4
+    name_of_event : str
+    institution_id : Optional[UUID4] = None
+    description : str
+    start_date : datetime
+    end_date : datetime
+    application_deadline : Optional[datetime] = None
+    location : str
+    is_online : Optional[bool] = False
+    is_free : Optional[bool] = False
+    cost : Optional[Decimal] = None
+    currency_code : str
+    image_url : str
+    capacity : int
+    seats_remaining : int
+
+    model_config = ConfigDict(
+        from_attributes=True
+        )
+
+
+class EventPage(BaseModel):
+    events : List[EventResponse]
+    next_cursor : Optional[str] = None
+
+
+class ProgramAnalytics(BaseModel):
+    program_id : UUID4
+    name_of_program : str
+    applications : int
+
+
+class PaymentAnalytics(BaseModel):
+    currency : str
+    pending_transactions : int
+    successful_transactions : int
+    revenue : Decimal
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class InstitutionAnalytics(BaseModel):
+    programs : List[ProgramAnalytics]
+    payments : List[PaymentAnalytics]
+
 from enum import Enum
 
 class ProgramLevel(str, Enum):
@@ -88,6 +168,49 @@ class Category(str, Enum):
     education = "Education"
 
 
+class ProgramImport(BaseModel):
+    """A program row in an admin bulk import, checked like the create program form."""
+
+    # Only used to look the institution up, an unknown or malformed one is reported as not found
+    institution_email: str = Field(..., min_length=1, max_length=255)
+    name_of_program: str = Field(..., min_length=1, max_length=255)
+    program_level: ProgramLevel
+    categories: List[Category] = []
+    always_available: bool
+    is_free: bool
+    currency_code: str = Field(..., min_length=3, max_length=3)
+    description: str
+    image_url: str = Field(..., min_length=1)
+    application_deadline: Optional[datetime] = None
+    cost: Optional[Decimal] = None
+
+    @field_validator('categories', mode='before')
+    @classmethod
+    def split_categories(cls, value):
+        # CSV files carry the categories as one comma separated cell
+        if isinstance(value, str):
+            return [category.strip() for category in value.split(',') if category.strip()]
+        return value
+
+    @model_validator(mode='after')
+    def check_deadline_and_cost(self):
+        if self.always_available:
+            if self.application_deadline is not None:
+                raise ValueError('Application deadline must be NULL for always available programs.')
+        elif self.application_deadline is None:
+            raise ValueError('Application deadline is required for non-evergreen programs.')
+        elif self.application_deadline.tzinfo is None or self.application_deadline <= datetime.now(timezone.utc):
+            raise ValueError('The application deadline must be a time zone aware time in the future.')
+
+        if self.is_free:
+            if self.cost is not None and self.cost != 0:
+                raise ValueError('Cost must be 0 for free programs.')
+            self.cost = Decimal(0)
+        elif self.cost is None or self.cost <= 0:
+            raise ValueError('Cost must be a positive number.')
+        return self
+
+
 
 
 
@@ -1,12 +1,22 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timezone
+from decimal import Decimal
 from fastapi import HTTPException, status
+from sqlalchemy import case, func, literal, literal_column, or_, text, update
 from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload
 
+from tuition.config import Config
 from tuition.institution.models import Institution
 from tuition.institution.schemas import InstitutionBank
-from tuition.security.hash import Hash
-from tuition.institution.models import SubAccount, Program, program_category_association, Category
-from tuition.logger import logger
+import tuition.security.hash as hashing
+from tuition.institution.models import SubAccount, Program, program_category_association, Category, Event
+from tuition.logger import logger, hot_logger
+from tuition.services import services
 
 from sqlalchemy import select
 from tuition.institution.models import SubAccount
@@ -37,29 +47,254 @@ async def get_institution_by_email(db, username):
     stmt = select(Institution).filter(Institution.email == email)
     result = await db.execute(stmt)
     data = result.scalar_one_or_none()  # Fetches the result or None if not found
-    logger.info({
-        "all": f"{data}",
-        "event": "get_institution_by_email"
-    }) 
+    hot_logger.info("get_institution_by_email: %s", "found" if data else "not found")
     return data   
 
-async def get_program_by_id(db, program_id):
+class TrigramSupport:
+    """Remembers whether the database has the pg_trgm extension.
 
-    stmt = select(Program).filter(Program.id == program_id)
-    result = await db.execute(stmt)
-    program = result.scalar_one_or_none()  # Fetches the result or None if not found
-    logger.info(f"Program : %s" % program)
-    return program
+    The search migration skips pg_trgm where the role may not create
+    extensions, so search asks once per process instead of assuming it.
+    """
+
+    def __init__(self):
+        self.available = None
+
+    async def check(self, db):
+        if self.available is None:
+            if db.bind.dialect.name != "postgresql":
+                self.available = False
+            else:
+                result = await db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"))
+                self.available = result.scalar() is not None
+        return self.available
+
+
+services.register("trigram_support", TrigramSupport)
+
+
+def institution_search(dialect_name, name, trigram=False):
+    """Build the match condition and relevance score for a free-text institution search.
+
+    On Postgres this uses the ``search_vector`` tsvector column (name, official
+    name, country and description), plus trigram similarity on the name when
+    ``trigram`` says pg_trgm is installed, both GIN indexed. Other databases,
+    SQLite in tests, fall back to ILIKE.
+
+    Returns:
+        tuple: (where clause, relevance expression to order by descending)
+    """
+    pattern = f"%{name}%"
+    if dialect_name == "postgresql":
+        if trigram:
+            name_match = Institution.name_of_institution.op("%")(name)
+            similarity = func.similarity(Institution.name_of_institution, name)
+        else:
+            name_match = Institution.name_of_institution.ilike(pattern)
+            similarity = literal(0)
+        terms = re.findall(r"\w+", name)
+        if not terms:
+            return name_match, similarity
+
+        # Prefix match on every word so results show up while the user is typing
+        query = func.to_tsquery("simple", " & ".join(f"{term}:*" for term in terms))
+        search_vector = literal_column("institutions.search_vector")
+        condition = search_vector.op("@@")(query)
+        if trigram:
+            condition = or_(condition, name_match)
+        return condition, func.ts_rank(search_vector, query) + similarity
+
+    name_match = Institution.name_of_institution.ilike(pattern)
+    condition = or_(
+        name_match,
+        Institution.official_name.ilike(pattern),
+        Institution.country.ilike(pattern),
+        Institution.brief_description.ilike(pattern),
+    )
+    return condition, case((name_match, 1), else_=0)
+
+
+def ranked_institution_search(dialect_name, name, offset, limit, trigram=False):
+    """Select a page of institutions matching ``name``, best match first.
+
+    Only the newest ``Config.SEARCH_RANK_CANDIDATES`` matches (or as many as
+    the page reaches) are ranked. A broad term like "University" matches most
+    of the table, and scoring every one of those rows before sorting cost far
+    more than the unranked ILIKE it replaced; the candidates come straight off
+    the (created_at, id) index instead.
+    """
+    condition, relevance = institution_search(dialect_name, name, trigram)
+    candidates = (
+        select(Institution.id)
+        .filter(condition)
+        .order_by(Institution.created_at.desc(), Institution.id.desc())
+        # Inlined rather than bound: with a bound limit Postgres' generic plan for
+        # the prepared statement ranks every match again
+        .limit(literal(max(Config.SEARCH_RANK_CANDIDATES, offset + limit), literal_execute=True))
+    )
+    return (
+        select(Institution)
+        .filter(Institution.id.in_(candidates))
+        .order_by(relevance.desc(), Institution.created_at.desc(), Institution.id.desc())
+        .offset(offset)
+        .limit(limit)
+    )
+
+
+@dataclass(frozen=True)
+class CatalogueSubAccount:
+    id: object
+    subaccount_id: str | None
+    country: str
+    currency: str
+
+
+@dataclass(frozen=True)
+class CatalogueProgram:
+    """Read-only copy of a program, detached from any session.
+
+    Has the same attribute names as ``Program`` plus the institution's
+    ``subaccount`` and the program's category names.
+    """
+    id: object
+    name_of_program: str
+    program_level: str
+    always_available: bool
+    application_deadline: datetime | None
+    cost: Decimal | None
+    is_free: bool
+    currency_code: str
+    description: str | None
+    institution_id: object
+    subaccount_id: str | None
+    image_url: str
+    categories: tuple
+    subaccount: CatalogueSubAccount | None
+
+    @classmethod
+    def from_rows(cls, program, subaccount):
+        return cls(
+            id=program.id,
+            name_of_program=program.name_of_program,
+            program_level=program.program_level,
+            always_available=program.always_available,
+            application_deadline=program.application_deadline,
+            cost=program.cost,
+            is_free=program.is_free,
+            currency_code=program.currency_code,
+            description=program.description,
+            institution_id=program.institution_id,
+            subaccount_id=program.subaccount_id,
+            image_url=program.image_url,
+            categories=tuple(sorted(category.name for category in program.categories)),
+            subaccount=None if subaccount is None else CatalogueSubAccount(
+                id=subaccount.id,
+                subaccount_id=subaccount.subaccount_id,
+                country=subaccount.country,
+                currency=subaccount.currency,
+            ),
+        )
+
+    def as_json(self):
+        return {
+            "id": self.id,
+            "program_name": self.name_of_program,
+            "program_level": self.program_level,
+            "always_available": self.always_available,
+            "application_deadline": self.application_deadline,
+            "cost": self.cost,
+            "is_free": self.is_free,
+            "currency_code": self.currency_code,
+            "description": self.description,
+            "institution_id": self.institution_id,
+            "subaccount_id": self.subaccount_id,
+            "image_url": self.image_url,
+        }
+
+
+class ProgramCatalogue:
+    """Bounded LRU of programs with the subaccount they pay into and their categories.
+
+    A miss loads the program joined to its subaccount, with the categories
+    selectin-loaded, and caches a ``CatalogueProgram`` for ``ttl`` seconds.
+    The least recently used entry is dropped past ``maxsize``. Missing
+    programs are not cached. Code that changes a program or a subaccount calls
+    ``invalidate`` or ``clear`` after committing; the TTL bounds how stale
+    other workers' copies can get.
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get(self, db, program_id):
+        with self._lock:
+            entry = self._entries.get(program_id)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(program_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        program = await self._load(db, program_id)
+        if program is not None:
+            with self._lock:
+                self._entries[program_id] = (program, time.monotonic() + self.ttl)
+                self._entries.move_to_end(program_id)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return program
+
+    @staticmethod
+    async def _load(db, program_id):
+        stmt = (
+            select(Program, SubAccount)
+            # The subaccount the program stores, an institution can have several
+            .outerjoin(SubAccount, SubAccount.subaccount_id == Program.subaccount_id)
+            .options(selectinload(Program.categories))
+            .where(Program.id == program_id)
+        )
+        row = (await db.execute(stmt)).first()
+        if row is None:
+            return None
+        return CatalogueProgram.from_rows(*row)
+
+    def invalidate(self, program_id):
+        with self._lock:
+            self._entries.pop(program_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
 
 
-async def get_program_subaccount(db, program_instituition):
-    stmt1 = select(SubAccount).filter(SubAccount.institution_id == program_instituition)
-    result_sub = await db.execute(stmt1)
-    subaccount = result_sub.scalar_one_or_none() 
-    return subaccount
+services.register("program_catalogue", lambda: ProgramCatalogue(Config.PROGRAM_CACHE_SIZE, Config.PROGRAM_CACHE_TTL))
+
+
+async def get_program_by_id(db, program_id):
+    """Return the program as a ``CatalogueProgram``, or None if it doesn't exist."""
+    program = await services.get("program_catalogue").get(db, program_id)
+    hot_logger.info("Program %s %s", program_id, "found" if program else "not found")
+    return program
+
 
 def check_if_verified(institution):
-    logger.info(f"{institution}")
+    hot_logger.info("Checking verification for institution %s", institution.id)
     if not institution.is_verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -67,7 +302,7 @@ def check_if_verified(institution):
         )
     
 
-def verify_password(provided_password: str, hashed_password: str):
+async def verify_password(provided_password: str, hashed_password: str):
     """Verify the provided password against the stored hashed password.
     
     Args:
@@ -78,7 +313,7 @@ def verify_password(provided_password: str, hashed_password: str):
         HTTPException: If the provided password does not match the stored password, 
         an exception with status code 401 and a message "Incorrect password" is raised.
     """
-    if not Hash.verify(provided_password, hashed_password):
+    if not await hashing.verify_password(provided_password, hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect password"
@@ -117,14 +352,10 @@ async def create_new_program(db, payload, institution_id, subaccount_id):
         image_url=payload['image_url']
     )
 
-    # Step 2: Add the program to the database and commit
+    # Step 2: Add the program; the caller commits it together with its categories
     db.add(new_program)
-    await db.commit()
-    await db.refresh(new_program) 
-    print({
-        "I don run am" : "Yessssss!!!!!!!",
-        "event": new_program
-    })
+    await db.flush()
+    logger.info("Program %s added", new_program.id)
 
     program_json = {
             "id": new_program.id,
@@ -143,30 +374,62 @@ async def create_new_program(db, payload, institution_id, subaccount_id):
     return   program_json
     # return new_program
 
+class CategoryCache:
+    """Category name to id map, filled from the database as names are looked up.
+
+    Categories are only ever added, so a name that is not cached yet is simply
+    looked up again; ``admin_utils.add_program_category`` clears the cache
+    anyway so every lookup after a change goes back to the database.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def resolve(self, db, names):
+        """Return ``{name: id}`` for the given names that exist, with one query for the uncached ones."""
+        names = set(names)
+        found = {name: self._ids[name] for name in names if name in self._ids}
+        self.hits += len(found)
+
+        missing = names - found.keys()
+        if missing:
+            self.misses += len(missing)
+            result = await db.execute(select(Category.name, Category.id).where(Category.name.in_(missing)))
+            loaded = dict(result.all())
+            self._ids.update(loaded)
+            found.update(loaded)
+        return found
+
+    def clear(self):
+        self._ids.clear()
+
+    def stats(self):
+        return {"size": len(self._ids), "hits": self.hits, "misses": self.misses}
+
+
+services.register("category_cache", CategoryCache)
+
+
 async def update_category_program_relation(db, categories, program_id):
-    # Prepare a list for bulk insert
-    program_category_list = []
-
-    # Loop through the list of categories sent by the client
-    for category_name in categories:
-        # Query the category based on the name
-        category = await db.execute(select(Category).filter_by(name=category_name))
-        category_obj = category.scalar_one_or_none()
-
-        if category_obj:
-            # For each category, prepare a dictionary of {program_id, category_id}
-            program_category_list.append({
-                'program_id': program_id,
-                'category_id': category_obj.id
-            })
+    """Link a program to the named categories, ignoring names that don't exist.
+
+    Only adds the association rows; the caller commits them with the program.
+    """
+    category_ids = await services.get("category_cache").resolve(db, categories)
+
+    unknown = set(categories) - category_ids.keys()
+    if unknown:
+        logger.warning("Ignoring unknown categories for program %s: %s", program_id, sorted(unknown))
 
     # Ensure that there are categories to insert
-    if program_category_list:
+    if category_ids:
         # Bulk insert the associations
-        await db.execute(program_category_association.insert().values(program_category_list))
-
-    # Commit the changes to the database
-    await db.commit()
+        await db.execute(program_category_association.insert().values([
+            {'program_id': program_id, 'category_id': category_id}
+            for category_id in category_ids.values()
+        ]))
 
 async def validate_deadline(application_deadline, always_available):
 # If the program is always available, the application deadline must be None
@@ -218,14 +481,38 @@ def create_institution(payload, hashed_password):
     return new_institution
 
 
+async def claim_event_seat(db, event_id):
+    """Take a seat on an event if one is left and registration is open.
+
+    A single conditional UPDATE: concurrent registrations queue on the event's
+    own row lock only, the ``seats_taken < capacity`` check is re-evaluated
+    against the latest count once the lock is granted, so the event is never
+    oversold. The caller's transaction holds the lock until it commits.
+
+    Returns:
+        int | None: Seats remaining after this one, or None if no seat was taken.
+    """
+    stmt = (
+        update(Event)
+        .where(
+            Event.id == event_id,
+            Event.seats_taken < Event.capacity,
+            or_(Event.application_deadline.is_(None), Event.application_deadline > datetime.now(timezone.utc)),
+        )
+        .values(seats_taken=Event.seats_taken + 1)
+        .returning(Event.capacity - Event.seats_taken)
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(stmt)
+    return result.scalar_one_or_none()
+
+
 async def get_subaccount_id_by_institution(db, institution_id):
 
-    logger.info(f"{institution_id}get_subaccount_id_by_institution!!!!!!!")
+    hot_logger.info("Fetching subaccount for institution %s", institution_id)
     stmt = select(SubAccount).filter(SubAccount.institution_id == institution_id)
     result = await db.execute(stmt)
-    logger.info(f"*****{result}")
     data = result.scalar_one_or_none()  # Returns the subaccount_id or None
-    logger.info(f"*****{data}")
     return data
 
 
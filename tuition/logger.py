@@ -1,19 +1,172 @@
+import atexit
+import copy
 import logging
-from logging.handlers import SysLogHandler
+import queue
+import random
+import socket
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, SysLogHandler
 
 from tuition.config import Config
+from tuition.services import services
 
-PAPERTRAIL_HOST = Config.PAPERTRAIL_HOST
-PAPERTRAIL_PORT =  Config.PAPERTRAIL_PORT
-
-handler = SysLogHandler(address=(PAPERTRAIL_HOST, PAPERTRAIL_PORT))
+HOT_LOGGER_NAME = "tuition.hot"
 
 formatter = logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s')
-handler.setFormatter(formatter)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of INFO and DEBUG records from the hot path logger.
+
+    Warnings and errors, and anything logged elsewhere, always pass.
+    """
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+        self.sampled_out = 0
+
+    def filter(self, record):
+        if record.levelno > logging.INFO or not record.name.startswith(HOT_LOGGER_NAME):
+            return True
+        if self.rate >= 1 or random.random() < self.rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Hand records to the listener thread without ever blocking the caller.
+
+    Only the message is rendered here, so mutable arguments (ORM rows in
+    particular) aren't touched from another thread; timestamps, the format
+    string and tracebacks are applied by the listener. When the queue is full
+    the record is dropped and counted.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """Ships log records to syslog (Papertrail) from a background thread.
+
+    ``start()`` attaches a handler that feeds a bounded queue to the target
+    logger (root by default), and a ``QueueListener`` formats and sends
+    whatever is queued.
+    """
+
+    def __init__(self, address, queue_size, info_sample_rate):
+        self.address = address
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.handler = DroppingQueueHandler(self.queue)
+        self.sampler = SamplingFilter(info_sample_rate)
+        self.handler.addFilter(self.sampler)
+        self.listener = None
+        self.target = None
+
+    def start(self, target=None):
+        if self.listener is not None:
+            return
+        sink = SysLogHandler(address=self.address)
+        sink.setFormatter(formatter)
+        self.listener = QueueListener(self.queue, sink, respect_handler_level=True)
+        self.listener.start()
+        self.target = target if target is not None else logging.getLogger()
+        self.target.addHandler(self.handler)
+
+    def close(self):
+        """Flush whatever is queued and stop the listener thread."""
+        if self.listener is None:
+            return
+        self.target.removeHandler(self.handler)
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
+        self.listener = None
+
+    def stats(self):
+        return {
+            "queued": self.queue.qsize(),
+            "dropped": self.handler.dropped,
+            "sampled_out": self.sampler.sampled_out,
+        }
+
+
+class UDPSink:
+    """Local syslog endpoint that collects datagrams, for tests and benchmarks.
+
+    Point a ``LogPipeline`` at ``sink.address`` to check what would have been
+    shipped to Papertrail.
+    """
+
+    def __init__(self, host="127.0.0.1"):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        self.sock.bind((host, 0))
+        self.sock.settimeout(0.1)
+        self.address = self.sock.getsockname()
+        self.messages = []
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._receive, daemon=True)
+        self._thread.start()
+        return self
+
+    def _receive(self):
+        while self._running:
+            try:
+                data = self.sock.recv(65536)
+            except socket.timeout:
+                continue
+            self.messages.append(data.decode(errors="replace"))
+
+    def wait_for(self, count, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while len(self.messages) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return len(self.messages) >= count
+
+    def close(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+        self.sock.close()
+
+
+def create_log_pipeline():
+    pipeline = LogPipeline(
+        address=(Config.PAPERTRAIL_HOST, Config.PAPERTRAIL_PORT),
+        queue_size=Config.LOG_QUEUE_SIZE,
+        info_sample_rate=Config.LOG_INFO_SAMPLE_RATE,
+    )
+    atexit.register(pipeline.close)
+    return pipeline
+
+
+# Started with the app; until then records only reach logging's last resort stderr handler
+services.register("log_pipeline", create_log_pipeline, close=lambda pipeline: pipeline.close())
 
 # Setup root logger
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Add Papertrail handler
-logger.addHandler(handler)
+# Chatty per-request lookups log here so they can be sampled with LOG_INFO_SAMPLE_RATE
+hot_logger = logging.getLogger(HOT_LOGGER_NAME)
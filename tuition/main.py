@@ -1,17 +1,19 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Header, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 
 from tuition.student.routers import student_router
 from tuition.institution.routers import institution_router
 from tuition.admin.routers import admin_router
-from tuition.database import engine, db_dependency
+from tuition.database import db_dependency, warm_up_pool, pool_status, check_schema_revision, create_tables
 from fastapi.security import OAuth2PasswordRequestForm
 from tuition.institution import crud as crud_institution
 from tuition.student import crud as crud_student
 from tuition.admin import crud as admin_crud
-import tuition.student.utils as student_utils
-import tuition.institution.utils as institution_utils
-import tuition.admin.utils as admin_utils
+from tuition.src_utils import get_account_by_email
+from tuition.config import Config
+from tuition.payments import parse_charge_event, verify_signature
+from tuition.services import services
+from tuition.security.oauth2 import get_current_principal, Principal
 
 from fastapi import FastAPI
 # import sentry_sdk
@@ -48,21 +50,24 @@ app.add_middleware(
     allow_headers=["*"],  
 )
 
-async def create_db():
-    async with engine.begin() as conn:
-        from tuition.student import models as student_models
-        from tuition.institution import models as institution_models
-        from tuition.admin import models as admin_models
-
-        await conn.run_sync(student_models.Base.metadata.create_all)
-        await conn.run_sync(institution_models.Base.metadata.create_all)
-        await conn.run_sync(admin_models.Base.metadata.create_all)
-
-    await engine.dispose()
-
 @app.on_event("startup")
 async def on_startup():
-    await create_db()
+    await services.start("log_pipeline")
+    if Config.DB_CREATE_ALL:
+        await create_tables()
+    else:
+        await check_schema_revision()
+    await warm_up_pool()
+    await services.start("payment_gateway", "storage", "email_templates")
+    if Config.EMAIL_OUTBOX_WORKER:
+        await services.start("email_outbox_worker")
+    await services.start("payment_reconciler")
+    if Config.ANALYTICS_REBUILD_WORKER:
+        await services.start("analytics_rebuilder")
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await services.close()
 
 
 app.include_router(student_router)
@@ -71,6 +76,45 @@ app.include_router(institution_router)
 
 app.include_router(admin_router)
 
+
+@app.get("/health/db", status_code=status.HTTP_200_OK, tags=["Health"])
+async def db_health(current_user: Principal = Depends(get_current_principal)):
+    """
+    Reports connection pool occupancy and checkout wait times. Only admin users can access this endpoint.
+
+    ### Returns:
+    - Pool size, checked out and overflow connections, saturation (0.0 - 1.0),
+      and the average and worst wait to check a connection out since startup.
+    - 401 without a valid token, 403 if the current user is not an admin.
+    """
+    if not current_user.get("admin"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not authorized to access this endpoint."
+        )
+    return pool_status()
+
+@app.post("/webhooks/flutterwave", status_code=status.HTTP_200_OK, tags=["Payments"])
+async def flutterwave_webhook(request: Request, verif_hash: str | None = Header(None, alias="verif-hash")):
+    """
+    Receives Flutterwave payment notifications and settles the matching transaction.
+
+    ### Parameters:
+    - **verif-hash**: Header carrying the secret hash configured on the Flutterwave dashboard.
+    - The body is the raw `charge.completed` event; other event types are acknowledged and ignored.
+
+    ### Returns:
+    - 200 once the event is stored; redelivered events are acknowledged without changing anything.
+    - 401 for a bad signature, 503 when the event queue is full (Flutterwave retries later).
+    """
+    verify_signature(verif_hash)
+    event = parse_charge_event(await request.body())
+    if event is None:
+        return {"status": "ignored"}
+
+    changed = await services.get("payment_reconciler").submit(event)
+    return {"status": "processed" if changed else "duplicate"}
+
 # Add BackGround task to Admin login later
 @app.post("/auth/login",status_code=status.HTTP_200_OK, tags=["Login"])
 async def login(db: db_dependency, payload: OAuth2PasswordRequestForm = Depends()):
@@ -86,20 +130,22 @@ async def login(db: db_dependency, payload: OAuth2PasswordRequestForm = Depends(
     - A login response specific to the type of user (student, institution, or admin).
     - Raises a 401 HTTPException for invalid credentials.
     """
-    student = await student_utils.get_student_by_email(db, payload.username)
-    if student:
+    account = await get_account_by_email(db, payload.username)
+    if account is None:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    role, user = account
+    if role == "student":
         # Handle student login
-        return await crud_student.login_student(db, payload)
-    
-    institution = await institution_utils.get_institution_by_email(db, payload.username)
-    if institution:
+        return await crud_student.login_student(db, payload, user)
+
+    if role == "institution":
         # Handle institution login
-        return await crud_institution.login_institution(db, payload)
-    
-    admin = await admin_utils.get_admin_by_email(db, payload.username)
-    if admin:
+        return await crud_institution.login_institution(db, payload, user)
+
+    if role == "admin":
         # Handle admin login
-        return await admin_crud.login_admin(db, payload)
+        return await admin_crud.login_admin(db, payload, user)
 
     raise HTTPException(status_code=401, detail="Invalid credentials")
 
@@ -0,0 +1,276 @@
+import asyncio
+import hmac
+import json
+import uuid
+from decimal import Decimal, InvalidOperation
+
+from fastapi import HTTPException, status
+from sqlalchemy import Column, DateTime, Index, Numeric, String, Text, bindparam, func, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.future import select
+
+from tuition.analytics import record_payments_settled
+from tuition.config import Config
+from tuition.database import Base
+from tuition.logger import logger
+from tuition.services import services
+from tuition.student.models import Transaction
+
+# Transaction statuses a webhook can move a pending payment to
+FINAL_STATUSES = {"successful", "failed", "cancelled"}
+# A success reported after a failure still settles the payment, the customer was charged
+SETTLEABLE_BY_SUCCESS = ("pending", "failed", "cancelled")
+# A charge that doesn't cover the transaction in its currency, left for someone to resolve by hand
+MISMATCHED = "mismatched"
+
+
+class PaymentEvent(Base):
+    """The latest gateway notification for each tx_ref."""
+    __tablename__ = 'payment_events'
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    tx_ref = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    amount = Column(Numeric, nullable=True)
+    currency = Column(String, nullable=True)
+    flw_ref = Column(String, nullable=True)
+    gateway_transaction_id = Column(String, nullable=True)
+    payload = Column(Text, nullable=False)
+
+    received_at = Column(DateTime(timezone=True), server_default=func.now())  # timezone-aware
+
+    __table_args__ = (
+        Index('ix_payment_events_tx_ref', 'tx_ref', unique=True),
+    )
+
+
+def verify_signature(verif_hash):
+    """Check the ``verif-hash`` header Flutterwave sends against our secret hash."""
+    secret = Config.FLW_SECRET_HASH
+    if not secret or not verif_hash or not hmac.compare_digest(verif_hash.encode(), secret.encode()):
+        logger.warning("Rejected payment webhook with a missing or invalid signature")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid webhook signature"
+        )
+
+
+def parse_charge_event(body):
+    """Return the event row for a ``charge.completed`` notification, or None for anything else."""
+    try:
+        payload = json.loads(body)
+        data = payload.get("data") or {}
+    except (ValueError, AttributeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Webhook body must be a JSON object"
+        )
+    if payload.get("event") != "charge.completed" or not data.get("tx_ref") or not data.get("status"):
+        return None
+
+    try:
+        amount = Decimal(str(data["amount"])) if data.get("amount") is not None else None
+    except InvalidOperation:
+        amount = None
+    return {
+        "tx_ref": str(data["tx_ref"]),
+        "status": str(data["status"]).lower(),
+        "amount": amount,
+        "currency": data.get("currency"),
+        "flw_ref": data.get("flw_ref"),
+        "gateway_transaction_id": str(data["id"]) if data.get("id") is not None else None,
+        "payload": body.decode() if isinstance(body, bytes) else body,
+    }
+
+
+class PaymentReconciler:
+    """Records webhook events and settles their transactions in batches.
+
+    The webhook handler hands each verified event to ``submit`` and waits; one
+    task drains the queue, up to ``batch_size`` events or ``max_delay`` seconds
+    at a time, and writes the whole batch in a single transaction:
+
+    - events are upserted on ``tx_ref``, so a redelivered notification (same
+      status) or a late one for an already successful payment changes nothing
+    - pending transactions whose event did change are locked, then updated
+      with one executemany per outcome; a payment is only marked successful
+      when the amount covers the transaction in the same currency, otherwise
+      it is marked mismatched and logged, and the institution's dashboard
+      counters move with it
+
+    ``submit`` returns once the batch is committed, so the gateway only gets a
+    200 for events that are stored; if the batch fails, every event in it is
+    answered with an error and the gateway retries it. When the queue is full
+    new events get a 503 instead of piling up in memory.
+    """
+
+    def __init__(self, session_factory, batch_size, max_delay, queue_size):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.queue_size = queue_size
+        self._queue = None
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            while not self._queue.empty():
+                _, future = self._queue.get_nowait()
+                if not future.done():
+                    future.set_exception(RuntimeError("Payment reconciler stopped"))
+
+    async def submit(self, event):
+        """Queue an event and wait until its batch is committed, returning whether it changed anything."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((event, future))
+        except asyncio.QueueFull:
+            logger.warning("Payment event queue is full, asking the gateway to retry")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many payment events, retry later"
+            )
+        return await future
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_delay
+        while len(batch) < self.batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                changed = await self.process([event for event, _ in batch])
+            except Exception as e:
+                logger.exception("Payment event batch failed")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for event, future in batch:
+                if not future.done():
+                    future.set_result(event["tx_ref"] in changed)
+
+    async def process(self, events):
+        """Store a batch of events and settle their transactions, returning the tx_refs that changed."""
+        latest = {}
+        for event in events:
+            # A success is final, anything after it for the same payment is ignored
+            if latest.get(event["tx_ref"], {}).get("status") != "successful":
+                latest[event["tx_ref"]] = event
+
+        async with self.session_factory() as db:
+            changed = await self._upsert_events(db, list(latest.values()))
+            settled = await self._settle_transactions(db, [latest[tx_ref] for tx_ref in changed])
+            await db.commit()
+
+        logger.info(f"Payment events: {len(events)} received, {len(changed)} new or changed, {settled} transactions settled")
+        return changed
+
+    async def _upsert_events(self, db, events):
+        dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+        stmt = dialect.insert(PaymentEvent).values(events)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PaymentEvent.tx_ref],
+            set_={column: stmt.excluded[column] for column in
+                  ("status", "amount", "currency", "flw_ref", "gateway_transaction_id", "payload", "received_at")},
+            where=PaymentEvent.status.is_distinct_from(stmt.excluded.status) & (PaymentEvent.status != "successful"),
+        ).returning(PaymentEvent.tx_ref)
+        result = await db.execute(stmt)
+        return set(result.scalars().all())
+
+    async def _settle_transactions(self, db, events):
+        transactions = Transaction.__table__
+        if not events:
+            return 0
+        # Lock the unsettled rows first so the outcome, and the dashboard counters, match what gets written
+        unsettled = {
+            row.tx_ref: row for row in (await db.execute(
+                select(transactions.c.tx_ref, transactions.c.institution_id, transactions.c.currency,
+                       transactions.c.amount, transactions.c.status)
+                .where(transactions.c.tx_ref.in_([event["tx_ref"] for event in events]),
+                       transactions.c.status.in_(SETTLEABLE_BY_SUCCESS))
+                .order_by(transactions.c.tx_ref)
+                .with_for_update()
+            )).all()
+        }
+
+        charged, unsuccessful, settled = [], [], []
+        for event in events:
+            transaction = unsettled.get(event["tx_ref"])
+            if transaction is None:
+                continue
+            if event["status"] == "successful":
+                new_status = "successful"
+                # Only a payment covering the transaction in its currency settles it. The event is
+                # final either way, so a short or wrong-currency charge is marked for someone to look at
+                if (event["amount"] is None or event["amount"] < transaction.amount
+                        or event["currency"] != transaction.currency):
+                    logger.warning(
+                        "Payment %s expected %s %s but the gateway charged %s %s, marking it %s",
+                        event["tx_ref"], transaction.amount, transaction.currency,
+                        event["amount"], event["currency"], MISMATCHED,
+                    )
+                    new_status = MISMATCHED
+                charged.append({"b_tx_ref": event["tx_ref"], "b_flw_ref": event["flw_ref"], "b_status": new_status})
+            elif event["status"] in FINAL_STATUSES and transaction.status == "pending":
+                new_status = event["status"]
+                unsuccessful.append({"b_tx_ref": event["tx_ref"], "b_flw_ref": event["flw_ref"],
+                                     "b_status": new_status})
+            else:
+                continue
+            settled.append((transaction.institution_id, transaction.currency, transaction.amount,
+                            transaction.status, new_status))
+
+        if charged:
+            await db.execute(
+                update(transactions)
+                .where(transactions.c.tx_ref == bindparam("b_tx_ref"), transactions.c.status != "successful")
+                .values(status=bindparam("b_status"), gateway_reference=bindparam("b_flw_ref")),
+                charged,
+            )
+        if unsuccessful:
+            await db.execute(
+                update(transactions)
+                .where(transactions.c.tx_ref == bindparam("b_tx_ref"), transactions.c.status == "pending")
+                .values(status=bindparam("b_status"), gateway_reference=bindparam("b_flw_ref")),
+                unsuccessful,
+            )
+        await record_payments_settled(db, settled)
+        return len(settled)
+
+
+def create_payment_reconciler():
+    return PaymentReconciler(
+        session_factory=services.get("session_factory"),
+        batch_size=Config.PAYMENT_BATCH_SIZE,
+        max_delay=Config.PAYMENT_BATCH_DELAY,
+        queue_size=Config.PAYMENT_QUEUE_SIZE,
+    )
+
+
+services.register("payment_reconciler", create_payment_reconciler, close=lambda reconciler: reconciler.close())
@@ -1,5 +1,11 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
 from passlib.context import CryptContext
 
+from tuition.config import Config
+from tuition.services import services
+
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated = "auto")
 
@@ -11,4 +17,79 @@ class Hash:
            return hashed_password
 
     def verify(plain_password, hashed_password):
-          return pwd_context.verify( plain_password, hashed_password)
\ No newline at end of file
+          return pwd_context.verify( plain_password, hashed_password)
+
+
+class HashingService:
+    """Runs bcrypt off the event loop on a bounded worker pool.
+
+    bcrypt takes a few hundred milliseconds per call, so running it inline on the
+    loop stalls every other in-flight request. Calls are capped at ``max_workers``
+    concurrent jobs; anything above that waits its turn and is counted as queued.
+    """
+
+    def __init__(self, max_workers: int, kind: str = "thread"):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown hashing pool kind: {kind}")
+        self.max_workers = max_workers
+        self.kind = kind
+        self._executor = None
+        self._semaphore = asyncio.Semaphore(max_workers)
+        self.queued = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.peak_queued = 0
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            pool_class = ProcessPoolExecutor if self.kind == "process" else ThreadPoolExecutor
+            self._executor = pool_class(max_workers=self.max_workers)
+        return self._executor
+
+    async def run(self, func, *args):
+        self.queued += 1
+        self.peak_queued = max(self.peak_queued, self.queued)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    def metrics(self):
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "queued": self.queued,
+            "peak_queued": self.peak_queued,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+def create_hashing_service():
+    return HashingService(Config.HASH_POOL_WORKERS, Config.HASH_POOL_KIND)
+
+
+services.register("hashing", create_hashing_service, close=lambda service: service.shutdown())
+
+
+async def hash_password(password: str) -> str:
+    return await services.get("hashing").run(Hash.bcrypt, password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await services.get("hashing").run(Hash.verify, plain_password, hashed_password)
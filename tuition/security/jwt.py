@@ -1,9 +1,11 @@
-import os
-from dotenv import load_dotenv
+import time
+import hashlib
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 
-load_dotenv()
 from tuition.config import Config
+from tuition.services import services
 from jose import JWTError, jwt
 from tuition.src_utils import TokenData 
 
@@ -11,20 +13,14 @@ from tuition.src_utils import TokenData
 #Takes a string and create a token into it, also time the data is being signed 
 from itsdangerous import URLSafeTimedSerializer
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-
-SECRET_KEY = os.getenv("SECRET_KEY")
-ALGORITHM = Config.ALGORITHM
 import logging
 
-logging.basicConfig(level=logging.DEBUG)
-
 ACCESS_TOKEN_EXPIRY = 600
 REFRESH_TOKEN_EXPIRY = 86400
 #Add Expiry later, refresh token
 def create_access_token(data: dict):
     to_encode = data.copy()
-    encoded_token = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_token = jwt.encode(to_encode, Config.SECRET_KEY, algorithm=Config.ALGORITHM)
     return encoded_token
 
 
@@ -58,36 +54,123 @@ End comment
 
 def create_access_token_institution(data: dict):
     to_encode = data.copy()
-    encoded_token = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_token = jwt.encode(to_encode, Config.SECRET_KEY, algorithm=Config.ALGORITHM)
     return encoded_token
 
 
+class TokenCache:
+    """Bounded LRU of already verified tokens, keyed by the token's SHA-256 digest.
+
+    An entry lives until the token's own ``exp`` claim or ``ttl`` seconds,
+    whichever comes first. The least recently used entry is dropped once the
+    cache holds more than ``maxsize`` tokens.
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(token: str):
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str):
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            token_data, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return token_data
+
+    def set(self, token: str, token_data, exp=None):
+        expires_at = time.time() + self.ttl
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (token_data, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def create_token_cache():
+    if not Config.TOKEN_CACHE_ENABLED:
+        return None
+    return TokenCache(Config.TOKEN_CACHE_SIZE, Config.TOKEN_CACHE_TTL)
+
+
+services.register("token_cache", create_token_cache)
+
+
 def verify_token(token : str, credentials_exception):
+    token_cache = services.get("token_cache")
+    if token_cache is not None:
+        token_data = token_cache.get(token)
+        if token_data is not None:
+            return token_data
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, Config.SECRET_KEY, algorithms=[Config.ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
         token_data = TokenData(email=email)
+        if token_cache is not None:
+            token_cache.set(token, token_data, payload.get("exp"))
         return token_data
 
     except JWTError:
         raise credentials_exception
 
-serializer = URLSafeTimedSerializer(
-    SECRET_KEY,
-    salt="email-Configuration" 
-    )
+def create_serializer():
+    return URLSafeTimedSerializer(
+        Config.SECRET_KEY,
+        salt="email-Configuration"
+        )
+
+
+services.register("url_serializer", create_serializer)
 
 
 def create_url_safe_token(data : dict):
 
-    return serializer.dumps(data)
+    return services.get("url_serializer").dumps(data)
 
 
-def decode_url_safe_token(token : str):
+def decode_url_safe_token(token : str, max_age : int = None):
     try:
-        token_data = serializer.loads(token)
+        token_data = services.get("url_serializer").loads(token, max_age=max_age)
         return token_data
     
     except Exception as e:
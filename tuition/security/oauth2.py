@@ -1,6 +1,11 @@
-from fastapi import HTTPException, status, Depends
+from typing import Any
+
+from fastapi import HTTPException, status, Depends, Request
 from fastapi.security import OAuth2PasswordBearer
+from pydantic import BaseModel, ConfigDict
 import tuition.security.jwt as jwt
+from tuition.database import db_dependency
+from tuition.src_utils import get_account_by_email, TokenData
 
 
 
@@ -16,3 +21,41 @@ def get_current_user(data : str = Depends(oauth2_scheme)):
     return jwt.verify_token(data, credentials_exception)
 
 
+class Principal(BaseModel):
+    """The authenticated caller: which kind of account it is and its loaded row."""
+    role: str
+    user: Any
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @property
+    def email(self):
+        return self.user.email
+
+    def get(self, role: str):
+        """Return the account row if the caller has the given role, otherwise None."""
+        return self.user if self.role == role else None
+
+
+async def get_current_principal(request: Request, db: db_dependency, current_user: TokenData = Depends(get_current_user)):
+    """Load the caller's account once per request and keep it on ``request.state``.
+
+    Handlers and crud functions take the returned Principal instead of looking the
+    user up by email again.
+    """
+    principal = getattr(request.state, "principal", None)
+    if principal is not None:
+        return principal
+
+    account = await get_account_by_email(db, current_user.email)
+    if account is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    role, user = account
+    principal = Principal(role=role, user=user)
+    request.state.principal = principal
+    return principal
@@ -0,0 +1,92 @@
+import inspect
+import threading
+from contextlib import contextmanager
+
+
+class ServiceRegistry:
+    """Creates shared clients on first use instead of at import time.
+
+    Modules register a factory (and optionally how to close what it builds)
+    under a name; nothing is constructed until ``get`` is called, either by the
+    first request that needs it or by ``start`` in the app's startup hook.
+    Tests swap in fakes with ``override`` or ``overridden``.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._closers = {}
+        self._instances = {}
+        self._overridden = set()
+        self._lock = threading.RLock()
+
+    def register(self, name, factory, close=None):
+        self._factories[name] = factory
+        if close is not None:
+            self._closers[name] = close
+
+    def get(self, name):
+        try:
+            return self._instances[name]
+        except KeyError:
+            pass
+        with self._lock:
+            if name not in self._instances:
+                if name not in self._factories:
+                    raise KeyError(f"No service registered as {name!r}")
+                self._instances[name] = self._factories[name]()
+            return self._instances[name]
+
+    def override(self, name, instance):
+        """Use ``instance`` for ``name`` until reset. Overrides are never closed by the registry."""
+        with self._lock:
+            self._instances[name] = instance
+            self._overridden.add(name)
+
+    @contextmanager
+    def overridden(self, **fakes):
+        """Temporarily replace services, restoring whatever was there before."""
+        previous = {name: (name in self._instances, self._instances.get(name), name in self._overridden) for name in fakes}
+        for name, fake in fakes.items():
+            self.override(name, fake)
+        try:
+            yield self
+        finally:
+            with self._lock:
+                for name, (existed, instance, was_overridden) in previous.items():
+                    if existed:
+                        self._instances[name] = instance
+                    else:
+                        self._instances.pop(name, None)
+                    if not was_overridden:
+                        self._overridden.discard(name)
+
+    def reset(self, *names):
+        """Forget built instances, without closing them, so the next ``get`` rebuilds."""
+        with self._lock:
+            for name in names or list(self._instances):
+                self._instances.pop(name, None)
+                self._overridden.discard(name)
+
+    async def start(self, *names):
+        """Build the named services and call their ``start()`` if they have one."""
+        for name in names:
+            start = getattr(self.get(name), "start", None)
+            if start is not None:
+                result = start()
+                if inspect.isawaitable(result):
+                    await result
+
+    async def close(self):
+        """Close every built service, most recently created first. Overrides stay in place."""
+        for name in reversed(list(self._instances)):
+            if name in self._overridden:
+                continue
+            instance = self._instances.pop(name)
+            close = self._closers.get(name)
+            if close is not None and instance is not None:
+                result = close(instance)
+                if inspect.isawaitable(result):
+                    await result
+
+
+services = ServiceRegistry()
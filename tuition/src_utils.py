@@ -1,25 +1,29 @@
 from typing import Optional
+import asyncio
+import base64
+import json
 import random
 import string
-from fastapi import HTTPException, status, UploadFile
+import uuid
+from datetime import datetime, timezone
+from fastapi import HTTPException, status
 from pydantic import BaseModel
-from tuition.security.hash import Hash
-import httpx
+import tuition.security.hash as hashing
 
-from supabase import create_client, Client
 from tuition.config import Config
-
-from tuition.logger import logger
-from tuition.institution.models import Institution, Program
-from tuition.institution.schemas import InstitutionResponse
+from tuition.services import services
+
+from tuition.logger import logger, hot_logger
+from tuition.institution.models import Category, Event, Institution, Program
+from tuition.institution.schemas import EventResponse, InstitutionResponse, ProgramResponse
+from tuition.institution.utils import institution_search, ranked_institution_search
+from sqlalchemy import and_, literal, or_, tuple_, union_all
+from sqlalchemy.orm import selectinload
 from sqlalchemy.future import select
-from tuition.student.utils import get_student_by_email
-from tuition.admin.utils import get_admin_by_email
-from tuition.student.models import Application, Transaction
-
-SUPABASE_URL = Config.SUPABASE_URL
-SUPABASE_KEY = Config.SUPABASE_KEY
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+from tuition.student.models import Application, Transaction, Student
+from tuition.admin.models import Admin
+from tuition.exports import filter_transactions, transaction_export_response
+from tuition.database import sortable_timestamp
 
 
 class TokenData(BaseModel):
@@ -36,25 +40,7 @@ def generate_random_name(length = 10):
     return ''.join(random.choice(letters) for i in range(length))
 
 
-#Stopped at program update
-async def upload_image_to_supabase(image: UploadFile):
-    print("Uploading image")
-    image_name = generate_random_name()
-    content = await image.read()
-    print("Attempting to upload image")
-
-    response = None  # Initialize response 
-    response = supabase.storage.from_('alt_bucket').upload(image_name, content)
-    if response.status_code == 200:
-        print("Image URL:", response.url)
-        return f"{SUPABASE_URL}/storage/v1/object/public/alt_bucket/{image_name}"
-    
-    print({"Image URL":"I returned null response"})
-    return None
-
-
-
-def verify_password(provided_password: str, hashed_password: str):
+async def verify_password(provided_password: str, hashed_password: str):
     """Verify the provided password against the stored hashed password.
 
     Args:
@@ -65,24 +51,131 @@ def verify_password(provided_password: str, hashed_password: str):
         HTTPException: If the provided password does not match the stored password, 
         an exception with status code 401 and a message "Incorrect password" is raised.
     """
-    if not Hash.verify(provided_password, hashed_password):
+    if not await hashing.verify_password(provided_password, hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect password"
         )
     
 
-def send_payment_request(data, headers):
-    url = 'https://api.flutterwave.com/v3/payments'
-    response = httpx.post(url, json=data, headers=headers)
-    response.raise_for_status()
-    return response.json()
+async def get_account_by_email(db, email):
+    """Resolve the account type that owns an email and load its row in a single query.
 
+    The three account tables are searched with a UNION ALL on their unique email
+    columns, and the matching row is joined back in the same statement so callers
+    don't need to fetch it a second time.
 
-async def fetch_institutions(db, page, limit, current_user):
-    logger.info(f"Fetching institutions with page {page} and limit {limit}")
-    student  = await get_student_by_email(db, current_user.email)
-    admin = await get_admin_by_email(db, current_user.email)
+    Args:
+        db: The database session.
+        email (str): The email address to look up.
+
+    Returns:
+        tuple | None: A ``(role, row)`` pair where role is one of "student",
+        "institution" or "admin", or None if no account uses the email.
+    """
+    accounts = union_all(
+        select(literal("student").label("role"), literal(1).label("priority"), Student.id.label("id")).where(Student.email == email),
+        select(literal("institution"), literal(2), Institution.id).where(Institution.email == email),
+        select(literal("admin"), literal(3), Admin.id).where(Admin.email == email),
+    ).subquery("accounts")
+
+    stmt = (
+        select(accounts.c.role, Student, Institution, Admin)
+        .select_from(accounts)
+        .outerjoin(Student, and_(accounts.c.role == "student", Student.id == accounts.c.id))
+        .outerjoin(Institution, and_(accounts.c.role == "institution", Institution.id == accounts.c.id))
+        .outerjoin(Admin, and_(accounts.c.role == "admin", Admin.id == accounts.c.id))
+        .order_by(accounts.c.priority)
+        .limit(1)
+    )
+    result = await db.execute(stmt)
+    row = result.first()
+    if row is None:
+        return None
+
+    role, student, institution, admin = row
+    account = {"student": student, "institution": institution, "admin": admin}[role]
+    return role, account
+
+
+class PaymentGateway:
+    """Long-lived Flutterwave client that keeps a pool of keep-alive connections.
+
+    The client is opened at app startup and closed at shutdown, or opened on first
+    use if startup never ran. Creating a payment isn't idempotent, so requests are
+    retried with exponential backoff only when they were never sent: no connection
+    could be made or none was free in the pool. Any response, 5xx included, goes
+    back to the caller, since a proxy's 502 or 504 doesn't mean Flutterwave didn't
+    act on the request.
+    """
+
+    def __init__(self, base_url, timeout, connect_timeout, max_connections, max_keepalive, max_retries, backoff):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._client = None
+
+    def start(self):
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_keepalive),
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def post(self, path, data, headers):
+        import httpx
+
+        client = self.start()
+        retry_errors = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await client.post(path, json=data, headers=headers)
+            except retry_errors as e:
+                if attempt == self.max_retries:
+                    raise
+                logger.warning(f"Payment gateway connection failed: {e}, retrying")
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+                continue
+            response.raise_for_status()
+            return response.json()
+
+
+def create_payment_gateway():
+    return PaymentGateway(
+        base_url=Config.FLW_BASE_URL,
+        timeout=Config.FLW_TIMEOUT,
+        connect_timeout=Config.FLW_CONNECT_TIMEOUT,
+        max_connections=Config.FLW_MAX_CONNECTIONS,
+        max_keepalive=Config.FLW_MAX_KEEPALIVE,
+        max_retries=Config.FLW_MAX_RETRIES,
+        backoff=Config.FLW_RETRY_BACKOFF,
+    )
+
+
+services.register("payment_gateway", create_payment_gateway, close=lambda gateway: gateway.close())
+
+
+async def send_payment_request(data, headers):
+    return await services.get("payment_gateway").post("/payments", data, headers)
+
+
+def check_student_or_admin(current_user):
+    """Allow verified students and admins through, returning the student row if any."""
+    student = current_user.get("student")
+    admin = current_user.get("admin")
     if not student and not admin:
         logger.warning("User does not have permission to access this resource")
         raise HTTPException(
@@ -90,78 +183,129 @@ async def fetch_institutions(db, page, limit, current_user):
             detail="User does not have permission to access this resource"
         )
 
-    # Validate the current user
-    if student.is_verified == False:
+    if student and student.is_verified == False:
         logger.warning("Student not verified")
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Student must verify their account before accessing this resource"
         )
+    return student
+
+
+def encode_cursor(sort_value, row_id):
+    """Build an opaque continuation token from the last row's sort key, which may be NULL."""
+    raw = json.dumps([sort_value.isoformat() if sort_value is not None else None, str(row_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(sort_value) if sort_value is not None else None, uuid.UUID(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+
+def paginate_by_cursor(stmt, sort_column, id_column, cursor, limit, descending=True):
+    """Order newest first (or oldest first) on (sort_column, id_column) and seek past the cursor.
+
+    One extra row is fetched so the caller can tell whether another page exists.
+    """
+    sort_key = sortable_timestamp(sort_column)
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        # Bound with the column's type so it is stored, and then compared, like the column
+        last_value = sortable_timestamp(literal(sort_value, sort_column.type))
+        key, last = tuple_(sort_key, id_column), tuple_(last_value, row_id)
+        stmt = stmt.where(key < last if descending else key > last)
+    if descending:
+        return stmt.order_by(sort_key.desc(), id_column.desc()).limit(limit + 1)
+    return stmt.order_by(sort_key, id_column).limit(limit + 1)
+
+
+def next_cursor(rows, limit, sort_attr):
+    """Trim the look-ahead row and return (rows, cursor for the following page)."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, sort_attr), last.id)
+
+
+async def fetch_institutions(db, page, limit, current_user):
+    hot_logger.info("Fetching institutions with page %s and limit %s", page, limit)
+    check_student_or_admin(current_user)
 
     offset = (page - 1) * limit
     
-    stmt = select(Institution).order_by(Institution.id.desc()).offset(offset).limit(limit)
+    stmt = select(Institution).order_by(Institution.created_at.desc(), Institution.id.desc()).offset(offset).limit(limit)
     result = await db.execute(stmt)
     institutions = result.scalars().all()
-    logger.info(f"Fetched {len(institutions)} institutions")
+    hot_logger.info("Fetched %s institutions", len(institutions))
      # Converts each Institution instance to InstitutionResponse
     institution_responses = [InstitutionResponse.model_validate(inst) for inst in institutions]
     
     return institution_responses
 
 async def fetch_transactions(db, current_user):
-    logger.info(f"Fetching transactions for student: {current_user.email}")
-    student  = await get_student_by_email(db, current_user.email)
-    admin = await get_admin_by_email(db, current_user.email)
-    if not student and not admin:
-        logger.warning("User does not have permission to access this resource")
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="User does not have permission to access this resource"
-        )
+    hot_logger.info("Fetching transactions for student: %s", current_user.email)
+    student = check_student_or_admin(current_user)
     
-    if student.is_verified == False:
-        logger.warning("Student not verified")
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Student must verify their account before accessing this resource"
-        )
-    
-    # Fetching transactions
-    stmt = select(Transaction).where(Transaction.student_id == student.id)
+    # Fetching transactions, admins see every student's transactions
+    stmt = select(Transaction)
+    if student:
+        stmt = stmt.where(Transaction.student_id == student.id)
     result = await db.execute(stmt)
     transactions = result.scalars().all()
-    logger.info(f"Fetched {len(transactions)} transactions")
+    hot_logger.info("Fetched %s transactions", len(transactions))
 
     return transactions
 
+
+async def fetch_transactions_page(db, cursor, limit, current_user, start=None, end=None, transaction_status=None):
+    hot_logger.info("Fetching transactions after cursor %s with limit %s", cursor, limit)
+    student = check_student_or_admin(current_user)
+
+    stmt = select(Transaction)
+    if student:
+        stmt = stmt.where(Transaction.student_id == student.id)
+    stmt = filter_transactions(stmt, start, end, transaction_status)
+    stmt = paginate_by_cursor(stmt, Transaction.transaction_date, Transaction.id, cursor, limit)
+
+    result = await db.execute(stmt)
+    transactions, cursor = next_cursor(result.scalars().all(), limit, "transaction_date")
+    hot_logger.info("Fetched %s transactions", len(transactions))
+
+    return {
+        "transactions": transactions,
+        "next_cursor": cursor
+    }
+
+
+async def export_transactions(current_user, export_format, start=None, end=None, transaction_status=None):
+    logger.info(f"Exporting transactions as {export_format} for: {current_user.email}")
+    student = check_student_or_admin(current_user)
+    scope = [Transaction.student_id == student.id] if student else []
+    return transaction_export_response(scope, export_format, start, end, transaction_status)
+
 async def search_institution(db, name, page, limit, current_user):
 
-    logger.info(f"Searching institutions by name '{name}' with page {page} and limit {limit}")
+    hot_logger.info("Searching institutions by name '%s' with page %s and limit %s", name, page, limit)
     # Validate current_user
-    student  = await get_student_by_email(db, current_user.email)
-    admin = await get_admin_by_email(db, current_user.email)
-    if not student and not admin:
-        logger.warning("User does not have permission to access this resource")
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="User does not have permission to access this resource"
-        )
-
-    if student.is_verified == False:
-        logger.warning("Student not verified")
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Student must verify their account before accessing this resource"
-        )
+    check_student_or_admin(current_user)
     
     offset = (page - 1) * limit
     
-    stmt = select(Institution).filter(Institution.name_of_institution.ilike(f'%{name}%')).order_by(Institution.id.desc()).offset(offset).limit(limit)
+    trigram = await services.get("trigram_support").check(db)
+    stmt = ranked_institution_search(db.bind.dialect.name, name, offset, limit, trigram)
 
     result = await db.execute(stmt)
     institutions = result.scalars().all()
-    logger.info(f"Found {len(institutions)} institutions")
+    hot_logger.info("Found %s institutions", len(institutions))
     if len(institutions) == 0:
         return {
             "message" : "No instances were found for the specified name."
@@ -172,36 +316,155 @@ async def search_institution(db, name, page, limit, current_user):
     return institution_responses
 
 
-async def get_program_by_id(db, program_id):
-    logger.info(f"Fetching program with id {program_id}")
-    stmt = select(Program).filter(Program.id == program_id)
+async def fetch_institutions_page(db, cursor, limit, current_user, name=None):
+    hot_logger.info("Fetching institutions after cursor %s with limit %s", cursor, limit)
+    check_student_or_admin(current_user)
+
+    stmt = select(Institution)
+    if name:
+        trigram = await services.get("trigram_support").check(db)
+        condition, _ = institution_search(db.bind.dialect.name, name, trigram)
+        stmt = stmt.filter(condition)
+    stmt = paginate_by_cursor(stmt, Institution.created_at, Institution.id, cursor, limit)
+
     result = await db.execute(stmt)
-    program = result.scalar_one_or_none()
+    institutions, cursor = next_cursor(result.scalars().all(), limit, "created_at")
+    hot_logger.info("Fetched %s institutions", len(institutions))
+
+    return {
+        "institutions": [InstitutionResponse.model_validate(inst) for inst in institutions],
+        "next_cursor": cursor
+    }
+
+
+def paginate_by_deadline(stmt, cursor, limit):
+    """Order programs soonest deadline first, always-available ones (no deadline) last, and seek past the cursor.
+
+    Matches the (program_level, application_deadline, id) index, which sorts
+    NULLs last like Postgres' default ascending order. One extra row is
+    fetched so the caller can tell whether another page exists.
+    """
+    deadline = Program.application_deadline
+    if cursor:
+        last_deadline, last_id = decode_cursor(cursor)
+        if last_deadline is None:
+            stmt = stmt.where(deadline.is_(None), Program.id > last_id)
+        else:
+            stmt = stmt.where(or_(
+                deadline > last_deadline,
+                and_(deadline == last_deadline, Program.id > last_id),
+                deadline.is_(None),
+            ))
+    return stmt.order_by(deadline.asc().nulls_last(), Program.id).limit(limit + 1)
+
+
+async def fetch_programs_page(db, level, cursor, limit, current_user, category=None, is_free=None,
+                              deadline_before=None, include_closed=False):
+    hot_logger.info("Fetching %s programs after cursor %s with limit %s", level, cursor, limit)
+    check_student_or_admin(current_user)
+
+    stmt = select(Program).where(Program.program_level == level).options(selectinload(Program.categories))
+    if not include_closed:
+        stmt = stmt.where(or_(Program.always_available.is_(True), Program.application_deadline > datetime.now(timezone.utc)))
+    if deadline_before is not None:
+        stmt = stmt.where(Program.application_deadline < deadline_before)
+    if is_free is not None:
+        stmt = stmt.where(Program.is_free.is_(is_free))
+    if category:
+        stmt = stmt.where(Program.categories.any(Category.name == category))
+    stmt = paginate_by_deadline(stmt, cursor, limit)
+
+    result = await db.execute(stmt)
+    programs, cursor = next_cursor(result.scalars().all(), limit, "application_deadline")
+    hot_logger.info("Fetched %s programs", len(programs))
+
+    return {
+        "programs": [ProgramResponse.model_validate(program) for program in programs],
+        "next_cursor": cursor,
+        "links": {
+            "self": { "href": f"/programs/{level}" },
+            "levels": { "href": "/programs/levels" },
+            "enrollments": { "href": "/enrollments" },
+            "student": { "href": "/students/me" }
+        }
+    }
+
+
+async def fetch_events_page(db, cursor, limit, current_user, institution_id=None, is_free=None):
+    hot_logger.info("Fetching events after cursor %s with limit %s", cursor, limit)
+    check_student_or_admin(current_user)
+
+    # Upcoming and running events, soonest first
+    stmt = select(Event).where(Event.end_date > datetime.now(timezone.utc))
+    if institution_id is not None:
+        stmt = stmt.where(Event.institution_id == institution_id)
+    if is_free is not None:
+        stmt = stmt.where(Event.is_free.is_(is_free))
+    stmt = paginate_by_cursor(stmt, Event.start_date, Event.id, cursor, limit, descending=False)
+
+    result = await db.execute(stmt)
+    events, cursor = next_cursor(result.scalars().all(), limit, "start_date")
+    hot_logger.info("Fetched %s events", len(events))
+
+    return {
+        "events": [EventResponse.model_validate(event) for event in events],
+        "next_cursor": cursor
+    }
+
+
+async def get_program_by_id(db, program_id):
+    hot_logger.info("Fetching program with id %s", program_id)
+    program = await services.get("program_catalogue").get(db, program_id)
     if not program:
         raise HTTPException(status_code=404, detail="Program not found")
-    program_json = {
-            "id": program.id,
-            "program_name": program.name_of_program,
-            "program_level": program.program_level,
-            "always_available": program.always_available,
-            "application_deadline": program.application_deadline,
-            "cost": program.cost,
-            "is_free": program.is_free,
-            "currency_code": program.currency_code,
-            "description": program.description,
-            "institution_id": program.institution_id,
-            "subaccount_id": program.subaccount_id,
-            "image_url": program.image_url
-        }
-    return  program_json
+    return program.as_json()
+
+async def get_program_costs(db, program_ids):
+    """Return ``{program id: cost}`` for the given ids that exist, in one query."""
+    if not program_ids:
+        return {}
+    stmt = select(Program.id, Program.cost).where(Program.id.in_(program_ids))
+    result = await db.execute(stmt)
+    return dict(result.all())
+
+
+async def get_applied_program_ids(db, student_id, program_ids):
+    """Return the subset of ``program_ids`` the student has already applied for, in one query."""
+    program_ids = list(program_ids)
+    if not program_ids:
+        return set()
+    hot_logger.info("Fetching existing applications for student_id %s and %s programs", student_id, len(program_ids))
+    stmt = (
+        select(Application.application_type_id)
+        .where(Application.student_id == student_id, Application.application_type_id.in_(program_ids))
+    )
+    result = await db.execute(stmt)
+    return set(result.scalars().all())
 
-async def get_existing_application(db, student_id, program_id):
 
-    logger.info(f"Fetching existing application for student_id {student_id} and program_id {program_id}")
-    stmt = select(Application).filter(Application.student_id == student_id).filter(Application.application_type_id == program_id)
+async def get_transaction_by_idempotency_key(db, student_id, idempotency_key):
+    stmt = select(Transaction).where(Transaction.student_id == student_id,
+                                     Transaction.idempotency_key == idempotency_key)
     result = await db.execute(stmt)
-    application = result.scalar_one_or_none()
-    return application
+    return result.scalar_one_or_none()
+
+
+async def fetch_transaction_by_reference(db, reference, current_user):
+    """Find a transaction by our tx_ref or Flutterwave's flw_ref, both uniquely indexed."""
+    hot_logger.info("Fetching transaction with reference %s", reference)
+    student = check_student_or_admin(current_user)
+
+    stmt = select(Transaction).where(or_(Transaction.tx_ref == reference, Transaction.gateway_reference == reference))
+    if student:
+        stmt = stmt.where(Transaction.student_id == student.id)
+    result = await db.execute(stmt)
+    transaction = result.scalars().first()
+    if not transaction:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Transaction not found"
+        )
+    return transaction
 
 
 async def get_application_by_id(db, application_id):
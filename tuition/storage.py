@@ -0,0 +1,139 @@
+import asyncio
+import os
+
+from fastapi import HTTPException, status, UploadFile
+
+from tuition.config import Config
+from tuition.services import services
+from tuition.logger import logger
+from tuition.src_utils import generate_random_name
+
+
+async def read_chunks(image: UploadFile, chunk_size: int, max_bytes: int):
+    """Yield an upload in chunks, stopping as soon as it goes over ``max_bytes``.
+
+    The declared size is checked before anything is read, so oversized files are
+    rejected without touching the body when the client sends a length.
+    """
+    if image.size is not None and image.size > max_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Image must be at most {max_bytes // (1024 * 1024)}MB"
+        )
+
+    total = 0
+    while chunk := await image.read(chunk_size):
+        total += len(chunk)
+        if total > max_bytes:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Image must be at most {max_bytes // (1024 * 1024)}MB"
+            )
+        yield chunk
+
+
+class SupabaseStorage:
+    """Streams uploads to a Supabase Storage bucket over its REST API."""
+
+    def __init__(self, url, key, bucket, timeout):
+        self.url = url
+        self.key = key
+        self.bucket = bucket
+        self.timeout = timeout
+        self._client = None
+
+    def start(self):
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                base_url=self.url,
+                timeout=self.timeout,
+                headers={"Authorization": f"Bearer {self.key}", "apikey": self.key},
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def save(self, name, chunks, content_type):
+        client = self.start()
+        response = await client.post(
+            f"/storage/v1/object/{self.bucket}/{name}",
+            content=chunks,
+            headers={"Content-Type": content_type or "application/octet-stream"},
+        )
+        if response.status_code != 200:
+            logger.error(f"Supabase upload of {name} failed: {response.status_code} {response.text}")
+            return None
+        return f"{self.url}/storage/v1/object/public/{self.bucket}/{name}"
+
+    async def delete(self, name):
+        client = self.start()
+        response = await client.delete(f"/storage/v1/object/{self.bucket}/{name}")
+        if response.status_code not in (200, 404):
+            logger.error(f"Supabase delete of {name} failed: {response.status_code} {response.text}")
+
+
+class LocalStorage:
+    """Writes uploads to a local directory, used in tests and local development."""
+
+    def __init__(self, directory, base_url):
+        self.directory = directory
+        self.base_url = base_url
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+
+    async def close(self):
+        return None
+
+    async def save(self, name, chunks, content_type):
+        self.start()
+        path = os.path.join(self.directory, name)
+        handle = await asyncio.to_thread(open, path, "wb")
+        try:
+            async for chunk in chunks:
+                await asyncio.to_thread(handle.write, chunk)
+        except BaseException:
+            handle.close()
+            os.remove(path)
+            raise
+        handle.close()
+        return f"{self.base_url}/{name}"
+
+    async def delete(self, name):
+        try:
+            await asyncio.to_thread(os.remove, os.path.join(self.directory, name))
+        except FileNotFoundError:
+            pass
+
+
+def create_storage():
+    if Config.STORAGE_BACKEND == "local":
+        return LocalStorage(Config.STORAGE_LOCAL_DIR, Config.STORAGE_LOCAL_URL)
+    return SupabaseStorage(Config.SUPABASE_URL, Config.SUPABASE_KEY, Config.STORAGE_BUCKET, Config.STORAGE_TIMEOUT)
+
+
+services.register("storage", create_storage, close=lambda storage: storage.close())
+
+
+async def upload_image(image: UploadFile):
+    """Stream an uploaded image to the configured storage backend and return its public URL."""
+    image_name = generate_random_name()
+    logger.info(f"Uploading image {image.filename} as {image_name}")
+    chunks = read_chunks(image, Config.UPLOAD_CHUNK_SIZE, Config.MAX_UPLOAD_BYTES)
+    return await services.get("storage").save(image_name, chunks, image.content_type)
+
+
+async def delete_image(url):
+    """Remove an image ``upload_image`` stored for something that then failed to be created."""
+    name = url.rsplit("/", 1)[-1]
+    logger.info(f"Deleting image {name}, what it was uploaded for wasn't created")
+    try:
+        await services.get("storage").delete(name)
+    except Exception:
+        # Don't hide the error that got us here
+        logger.exception(f"Could not delete image {name}")
@@ -1,39 +1,41 @@
 import os
-from sqlalchemy.sql import text
 from fastapi import HTTPException, status
 from fastapi.responses import JSONResponse
-from tuition.security.hash import Hash
+import tuition.security.hash as hashing
 from tuition.student.models import Student, Application, Transaction
-from tuition.src_utils import send_payment_request, get_program_by_id, get_existing_application, get_application_by_id
+from tuition.institution.models import Event, EventRegistration
+from sqlalchemy.exc import IntegrityError
+from tuition.database import violates_unique
+from tuition.src_utils import send_payment_request, get_program_by_id, get_application_by_id, get_program_costs, get_applied_program_ids, get_transaction_by_idempotency_key
 from sqlalchemy.future import select
 from tuition.security.jwt import create_access_token, decode_url_safe_token
 from tuition.emails_utils import SmtpMailService
 import tuition.student.utils as student_utils
 import tuition.institution.utils as institution_utils
 import tuition.admin.utils as admin_utils
+from tuition.analytics import record_applications, record_payment_created
 
-from tuition.student.schemas import StudentResponse
+from tuition.student.schemas import StudentResponse, ApplicationResult
 from tuition.logger import logger
+from tuition.config import Config
 
-FLW_SECRET_KEY = os.getenv('FLW_SECRET_KEY')
-
-async def sign_up_student(db, payload, background_task):
+async def sign_up_student(db, payload):
     logger.info("Creating a new student: %s", payload.email)
 
     await admin_utils.check_existing_email(db, payload.email)
     await institution_utils.check_existing_email(db, payload.email)
     await student_utils.check_existing_email(db, payload.email)
 
-    hashed_password = Hash.bcrypt(payload.password)
+    hashed_password = await hashing.hash_password(payload.password)
     new_student = student_utils.create_student(payload, hashed_password)
 
     db.add(new_student)
+    # Queued in the same transaction, so the student is never created without their email
+    smtp_service = SmtpMailService(new_student.email)
+    smtp_service.queue_verification_email(db, user = "student")
     await db.commit()
     await db.refresh(new_student)
 
-    smtp_service = SmtpMailService(new_student.email)  
-    background_task.add_task(smtp_service.send_verification_email, user = "student")
-
     logger.info(f"User {new_student.email} has been created")
     return new_student
 
@@ -90,16 +92,17 @@ async def verify_student_account(token, db):
         )
 
 
-async def login_student(db, payload):
+async def login_student(db, payload, student=None):
     logger.info(f"Login attempt for Student: {payload.username}")
 
     email = payload.username
-    student = await student_utils.get_student_by_email(db, email)
+    if student is None:
+        student = await student_utils.get_student_by_email(db, email)
 
     logger.info(f"Student found: {email}")
     student_utils.check_if_verified(student)
     student_object =  StudentResponse.model_validate(student)
-    student_utils.verify_password(payload.password, student.hashed_password)
+    await student_utils.verify_password(payload.password, student.hashed_password)
     
     access_token =  create_access_token(data = {
         "sub" : email
@@ -113,7 +116,7 @@ async def login_student(db, payload):
     }
 
 
-async def reset_password(db, email, background_task):
+async def reset_password(db, email):
     try:
         logger.info(f"Attempting to reset password for email: {email}")
         
@@ -125,8 +128,9 @@ async def reset_password(db, email, background_task):
                 detail="Student not found"
             )
         
-        smtp_service = SmtpMailService(student.email) 
-        background_task.add_task(smtp_service.send_password_reset_email, user = "student")
+        smtp_service = SmtpMailService(student.email)
+        smtp_service.queue_password_reset_email(db, user = "student")
+        await db.commit()
         
         logger.info(f"Password reset link sent to email: {email}")
         return JSONResponse(
@@ -170,7 +174,7 @@ async def confirm_password_reset(token, new_password, db):
             )
         
         # Reset the password
-        new_hash = Hash.bcrypt(new_password)
+        new_hash = await hashing.hash_password(new_password)
         student.hashed_password = new_hash
         await db.commit()
         
@@ -192,7 +196,7 @@ async def confirm_password_reset(token, new_password, db):
 async def update_student_profile(db, payload, current_student):
     logger.info(f"Updating student profile for {current_student.email}")
     
-    student = await student_utils.get_student_by_email(db, current_student.email)
+    student = current_student.get("student")
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
     
@@ -212,7 +216,7 @@ async def update_student_profile(db, payload, current_student):
 async def apply_for_program(db, application, current_student):
     logger.info(f"Application for: {application.program_id} for student: {current_student.email}")
     
-    student = await student_utils.get_student_by_email(db, current_student.email)
+    student = current_student.get("student")
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
     
@@ -220,12 +224,7 @@ async def apply_for_program(db, application, current_student):
     if not program:
         raise HTTPException(status_code=404, detail="Program not found")
     
-    # Check if the student has already applied for the program
-    existing_application = await get_existing_application(db, student.id, application.program_id)
-    if existing_application:
-        raise HTTPException(status_code=409, detail="Student has already applied for this program")
-    
-    # Create a new application
+    # Create a new application; the (student_id, application_type_id) constraint rejects a repeat
     application = Application(
         student_id=student.id,
         application_type_id=application.program_id,
@@ -233,6 +232,15 @@ async def apply_for_program(db, application, current_student):
         custom_fields = application.custom_field
     )
     db.add(application)
+    try:
+        await db.flush()
+    except IntegrityError as e:
+        await db.rollback()
+        if not violates_unique(e, Application.__table__, "uq_applications_student_id_application_type_id"):
+            raise
+        raise HTTPException(status_code=409, detail="Student has already applied for this program")
+    # Counted in the same transaction, so the dashboard total never misses or double counts it
+    await record_applications(db, [application.application_type_id])
     await db.commit()
     await db.refresh(application)
     
@@ -243,9 +251,63 @@ async def apply_for_program(db, application, current_student):
     }
 
 
-async def create_payment(db, application_id, current_student):
+async def apply_for_programs(db, batch, current_student):
+    """Apply for several programs at once, returning a result per requested program.
+
+    Programs and earlier applications are checked with one query each and the
+    new applications are inserted together in one transaction. A program the
+    student already applied for, in an earlier request, a concurrent one or
+    twice in this batch, is reported as ``already_applied`` rather than failing
+    the batch.
+    """
+    logger.info(f"Batch application for {len(batch.applications)} programs by student: {current_student.email}")
+
+    student = current_student.get("student")
+    if not student:
+        raise HTTPException(status_code=404, detail="Student not found")
+
+    program_ids = list(dict.fromkeys(item.program_id for item in batch.applications))
+    costs = await get_program_costs(db, program_ids)
+    applied = await get_applied_program_ids(db, student.id, costs.keys())
+
+    rows = {}
+    for item in batch.applications:
+        if item.program_id in costs and item.program_id not in applied and item.program_id not in rows:
+            rows[item.program_id] = {
+                "student_id": student.id,
+                "application_type_id": item.program_id,
+                "application_type": "program",
+                "custom_fields": item.custom_field,
+            }
+
+    created = {}
+    if rows:
+        created = await student_utils.insert_applications(db, list(rows.values()))
+        await record_applications(db, created.keys())
+        await db.commit()
+
+    results = []
+    for item in batch.applications:
+        program_id = item.program_id
+        if program_id not in costs:
+            result = ApplicationResult(program_id=program_id, status="program_not_found")
+        elif program_id in created:
+            result = ApplicationResult(program_id=program_id, status="created",
+                                       application_id=created.pop(program_id), program_cost=costs[program_id])
+        else:
+            result = ApplicationResult(program_id=program_id, status="already_applied", program_cost=costs[program_id])
+        results.append(result)
+
+    logger.info(f"Batch application: {sum(r.status == 'created' for r in results)} of {len(results)} created")
+    return {
+        "message" : "Applications processed",
+        "results" : results
+    }
+
+
+async def create_payment(db, application_id, current_student, idempotency_key=None):
     logger.info(f"Creating payment for student********: {current_student.email}")
-    student = await student_utils.get_student_by_email(db, current_student.email)
+    student = current_student.get("student")
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
     application = await get_application_by_id(db, application_id)
@@ -255,78 +317,143 @@ async def create_payment(db, application_id, current_student):
     if not program:
         raise HTTPException(status_code=404, detail="Program not found")
     
-    subaccount = await institution_utils.get_program_subaccount(db, program.institution_id)  
+    subaccount = program.subaccount
     if not subaccount:
         raise HTTPException(status_code=404, detail="Subaccount not found")
-    headers = {
-        'Authorization': f'Bearer {FLW_SECRET_KEY}',
-        'Content-Type': 'application/json'
-    }
-    
-    float_cost = float(program.cost)
     logger.info(f"{subaccount.subaccount_id}")
 
-    data = {
-        "tx_ref": f"FLW_{student.id}_{os.urandom(8).hex()}",  # Unique transaction reference
-        "amount": float_cost,  # Fetch the amount from the program
-        "currency": "NGN",
-        "redirect_url": "https://altwavetuition.vercel.app/",
-        "customer": {
-            "email": student.email,
-            "name": student.full_name,
-            "phonenumber": student.phone_number
-        },
-        "customizations": {
-            "title": program.name_of_program  
-        },
-        "subaccounts": [
-            {
-                "id": program.subaccount_id  
-            }
-        ]
+    # Read before any commit or rollback expires the student and application rows
+    student_id = student.id
+    application_id = application.id
+    customer = {
+        "email": student.email,
+        "name": student.full_name,
+        "phonenumber": student.phone_number
     }
+
+    if idempotency_key:
+        existing = await get_transaction_by_idempotency_key(db, student_id, idempotency_key)
+        if existing:
+            return await resume_payment(db, existing, application_id, program, customer)
+
+    tx_ref = f"FLW_{student_id}_{os.urandom(8).hex()}"  # Unique transaction reference
     new_transaction = Transaction(
         title=program.name_of_program,
         description=f"Payment for {program.name_of_program}",
         payment_method="flutterwave",
         currency=program.currency_code, 
-        student_id=student.id,
+        student_id=student_id,
         institution_id=program.institution_id,
         transaction_type="program_payment",
-        amount=program.cost
+        amount=program.cost,
+        tx_ref=tx_ref,
+        idempotency_key=idempotency_key,
+        application_id=application_id
     )
     db.add(new_transaction)
-    await db.commit()
-    await db.refresh(new_transaction)
+    try:
+        await db.flush()
+        await record_payment_created(db, program.institution_id, program.currency_code)
+        await db.commit()
+    except IntegrityError:
+        # A concurrent retry with the same Idempotency-Key got there first
+        await db.rollback()
+        existing = await get_transaction_by_idempotency_key(db, student_id, idempotency_key) if idempotency_key else None
+        if existing is None:
+            raise
+        return await resume_payment(db, existing, application_id, program, customer)
 
-    return send_payment_request(data, headers)
+    return await request_payment_link(db, new_transaction, tx_ref, program, customer)
 
-async def get_level_programs(db, level):
-    query = text("SELECT * FROM fetch_program(:level)")
-    result = await db.execute(query, {"level": level})
-    rows = result.fetchall()  # Or use result.mappings().all() if your DB driver supports it
 
-    programs = []
-    for r in rows:
-        program = {
-            "id": r[0],
-            "name": r[1],
-            "email": r[2]
+async def resume_payment(db, transaction, application_id, program, customer):
+    """Answer a retried payment request with the transaction its Idempotency-Key created."""
+    logger.info(f"Idempotent retry for transaction {transaction.tx_ref}")
+    if transaction.application_id != application_id:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="This Idempotency-Key was already used to pay for a different application"
+        )
+    if transaction.status != "pending":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"This Idempotency-Key was already used for a {transaction.status} payment"
+        )
+    if transaction.payment_link:
+        return {
+            "status": "success",
+            "message": "Hosted Link",
+            "data": {"link": transaction.payment_link}
         }
-        programs.append(program)
+    # The first attempt never got a link back from Flutterwave, ask again with the same tx_ref
+    return await request_payment_link(db, transaction, transaction.tx_ref, program, customer)
 
-    return {
-        "programs": programs,
-        "_links": {
-            "self": { "href": f"/programs/{level}" },
-            "levels": { "href": "/programs/levels" },
-            "enrollments": { "href": "/enrollments" },
-            "student": { "href": "/students/me" }
-        }
-    }
-    
 
+async def request_payment_link(db, transaction, tx_ref, program, customer):
+    headers = {
+        'Authorization': f'Bearer {Config.FLW_SECRET_KEY}',
+        'Content-Type': 'application/json'
+    }
+    data = {
+        "tx_ref": tx_ref,
+        "amount": float(program.cost),  # Fetch the amount from the program
+        # The transaction was created in the program's currency, the webhook checks the charge against it
+        "currency": program.currency_code,
+        "redirect_url": "https://altwavetuition.vercel.app/",
+        "customer": customer,
+        "customizations": {
+            "title": program.name_of_program  
+        },
+        "subaccounts": [
+            {
+                "id": program.subaccount_id  
+            }
+        ]
+    }
+    response = await send_payment_request(data, headers)
 
+    link = (response.get("data") or {}).get("link")
+    if link:
+        transaction.payment_link = link
+        await db.commit()
+    return response
 
 
+async def register_for_event(db, event_id, current_student):
+    # Read before the commit, which expires the principal's row on this session
+    email = current_student.email
+    logger.info(f"Registering student {email} for event {event_id}")
+    student = current_student.get("student")
+    if not student:
+        raise HTTPException(status_code=404, detail="Student not found")
+    student_id = student.id
+
+    seats_remaining = await institution_utils.claim_event_seat(db, event_id)
+    if seats_remaining is None:
+        await db.rollback()
+        event = await db.get(Event, event_id)
+        if event is None:
+            raise HTTPException(status_code=404, detail="Event not found")
+        if event.seats_taken >= event.capacity:
+            raise HTTPException(status_code=409, detail="This event is fully booked")
+        raise HTTPException(status_code=409, detail="Registration for this event has closed")
+
+    registration = EventRegistration(event_id=event_id, student_id=student_id)
+    db.add(registration)
+    try:
+        await db.flush()
+    except IntegrityError as e:
+        # Rolling back gives the seat back
+        await db.rollback()
+        if not violates_unique(e, EventRegistration.__table__, "uq_event_registrations_event_id_student_id"):
+            raise
+        raise HTTPException(status_code=409, detail="You are already registered for this event")
+    registration_id = registration.id
 
+    await db.commit()
+    logger.info(f"Student {email} registered for event {event_id}, {seats_remaining} seats left")
+    return {
+        "message" : "Registered for event",
+        "registration_id" : registration_id,
+        "seats_remaining" : seats_remaining
+    }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, DateTime, func, ForeignKey, Numeric, Date, Boolean, JSON, Integer
+from sqlalchemy import Column, String, Text, DateTime, func, ForeignKey, Numeric, Date, Boolean, JSON, Integer, UniqueConstraint, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import uuid
@@ -9,7 +9,7 @@ from tuition.database import Base
 class Student(Base):
     __tablename__ = 'students'
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
 
     bio = Column(Text, nullable=True)
     date_of_birth = Column(Date, nullable=True)
@@ -34,7 +34,7 @@ class Transaction(Base):
 
     __tablename__ = 'transactions'
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
 
     title = Column(String, nullable=False)
     description = Column(Text, nullable=False)
@@ -57,15 +57,29 @@ class Transaction(Base):
     transaction_type = Column(String, nullable=False)
     amount = Column(Numeric, nullable=False)
     status = Column(String, default='pending')
+    tx_ref = Column(String, nullable=True)  # Reference sent to Flutterwave, matched by payment webhooks
+    gateway_reference = Column(String, nullable=True)  # Flutterwave's flw_ref, set once the gateway reports back
+    idempotency_key = Column(String, nullable=True)  # Idempotency-Key the student's client sent, unique per student
+    application_id = Column(UUID, ForeignKey('applications.id'), nullable=True)  # What the Idempotency-Key was used for
+    payment_link = Column(String, nullable=True)
 
     student = relationship("Student", back_populates="transactions")
     institution = relationship("Institution", back_populates="transactions")
 
+    __table_args__ = (
+        # Per-student and per-institution history, paged and exported by (transaction_date, id)
+        Index('ix_transactions_student_id_transaction_date_id', 'student_id', 'transaction_date', 'id'),
+        Index('ix_transactions_institution_id_transaction_date_id', 'institution_id', 'transaction_date', 'id'),
+        Index('ix_transactions_tx_ref', 'tx_ref', unique=True),
+        Index('ix_transactions_gateway_reference', 'gateway_reference', unique=True),
+        Index('ix_transactions_student_id_idempotency_key', 'student_id', 'idempotency_key', unique=True),
+    )
+
 
 class Application(Base):
     __tablename__ = 'applications'
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     application_date = Column(DateTime, default=func.now(), nullable=False)
     updated_date = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False)  
     status = Column(String, default='Pending', nullable=False)
@@ -79,6 +93,12 @@ class Application(Base):
     program = relationship("Program", back_populates="applications")
     student = relationship("Student", back_populates="applications")
 
+    __table_args__ = (
+        # A student applies to a program once; also serves lookups by student
+        UniqueConstraint('student_id', 'application_type_id', name='uq_applications_student_id_application_type_id'),
+        Index('ix_applications_application_type_id', 'application_type_id'),
+    )
+
 
 
 
@@ -1,12 +1,14 @@
-from typing import List
+from datetime import datetime
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, status, BackgroundTasks, Depends, HTTPException
+from fastapi import APIRouter, status, Depends, Header, HTTPException, Query
 from pydantic import UUID4
 
-from tuition.student.schemas import StudentSignUp, StudentResponse, PasswordResquest, PasswordResetConfirm, Login, UpdateProfile, Application
+from tuition.student.schemas import StudentSignUp, StudentResponse, PasswordResquest, PasswordResetConfirm, UpdateProfile, Application, ApplicationBatch
+from tuition.institution.schemas import EventPage, ProgramLevel, ProgramPage
 from tuition.database import db_dependency
 from tuition.student import crud
-from tuition.security.oauth2 import get_current_user
+from tuition.security.oauth2 import get_current_principal, Principal
 import tuition.src_utils as src_utils
 
 
@@ -17,12 +19,12 @@ student_router = APIRouter(
 
 
 @student_router.post("/signup", response_model= StudentResponse, status_code= status.HTTP_201_CREATED)
-async def sign_up_student(db : db_dependency,  payload: StudentSignUp, background_task : BackgroundTasks):
+async def sign_up_student(db : db_dependency,  payload: StudentSignUp):
 
     """
     ## Creates a new student account
 
-    This endpoint is used to register a new student in the system. It saves the student details in the database and triggers background tasks (e.g., sending a welcome email).
+    This endpoint is used to register a new student in the system. It saves the student details in the database and queues a verification email.
 
     ### Parameters:
     - **db**: Database session dependency used to interact with the database.
@@ -33,15 +35,13 @@ async def sign_up_student(db : db_dependency,  payload: StudentSignUp, backgroun
         - **phone_number**: The student's contact phone number (str).
         - **field_of_interest**: The student's primary field of interest (str).
 
-    - **background_task**: A FastAPI BackgroundTask object used to execute background processes, such as sending a confirmation or welcome email.
-
     ### Returns:
     - A `StudentResponse` object with the newly created student's details.
 
     ### Status Code:
     - **201 Created**: Indicates that the student account was successfully created.
     """
-    return await crud.sign_up_student(db, payload, background_task)
+    return await crud.sign_up_student(db, payload)
 
 @student_router.get('/verify/{token}', status_code= status.HTTP_200_OK)
 async def verify_student_account(token : str, db :db_dependency):
@@ -65,7 +65,7 @@ async def verify_student_account(token : str, db :db_dependency):
 
 
 @student_router.post("/password-reset", status_code= status.HTTP_200_OK)
-async def reset_password(db : db_dependency, payload : PasswordResquest, background_task :BackgroundTasks):
+async def reset_password(db : db_dependency, payload : PasswordResquest):
     """
     ## Sends a password reset link to the user's email
 
@@ -76,12 +76,10 @@ async def reset_password(db : db_dependency, payload : PasswordResquest, backgro
     - **payload**: Contains the necessary information for the password reset request:
         - **email**: The email address (str) associated with the user's account to which the password reset link will be sent.
 
-    - **background_task**: A FastAPI BackgroundTasks object used to handle background processes, such as sending the email asynchronously.
-
     ### Returns:
     - A 200 OK response indicating that the password reset link has been sent successfully to the user's email.
     """
-    return await crud.reset_password(db, payload.email, background_task)
+    return await crud.reset_password(db, payload.email)
 
 
 @student_router.post('/password-reset-confirm/{token}', status_code= status.HTTP_201_CREATED)
@@ -108,7 +106,7 @@ async def confirm_reset_account_password(token : str, payload : PasswordResetCon
 
 
 @student_router.patch('/update_profile', status_code= status.HTTP_200_OK)
-async def update_student_profile(db: db_dependency, payload: UpdateProfile, current_student: Login = Depends(get_current_user)):
+async def update_student_profile(db: db_dependency, payload: UpdateProfile, current_student: Principal = Depends(get_current_principal)):
 
     """
     ## Updates a student's profile
@@ -123,7 +121,7 @@ async def update_student_profile(db: db_dependency, payload: UpdateProfile, curr
     return await crud.update_student_profile(db, payload, current_student)
 
 @student_router.post('/application/{program_id}')
-async def apply_for_program(db : db_dependency, application: Application, current_student : Login = Depends(get_current_user)):
+async def apply_for_program(db : db_dependency, application: Application, current_student: Principal = Depends(get_current_principal)):
     """
     ## Apply for a program
 
@@ -138,12 +136,29 @@ async def apply_for_program(db : db_dependency, application: Application, curren
     return await crud.apply_for_program(db, application, current_student)
 
 
+@student_router.post('/applications')
+async def apply_for_programs(db : db_dependency, batch: ApplicationBatch, current_student: Principal = Depends(get_current_principal)):
+    """
+    ## Apply for several programs at once
+
+    This endpoint submits up to 20 program applications in one request, each with its own custom fields.
+    ### Parameters:
+    - **db**: Database session dependency to interact with the database.
+    - **batch**: The list of applications, each with a `program_id` and optional `custom_field`.
+    - **current_student**: The current logged-in student's credentials.
+    ### Returns:
+    - A 200 OK response with one result per application, in request order, whose `status` is
+      `created`, `already_applied` or `program_not_found`.
+    """
+    return await crud.apply_for_programs(db, batch, current_student)
+
+
 @student_router.get("/institions/{page}/{limit}")
 async def fetch_institutions(
                             db: db_dependency,
                             page : int = 1,
                             limit : int = 10,
-                            current_student: Login = Depends(get_current_user)
+                            current_student: Principal = Depends(get_current_principal)
                             ):
     """
     ## Fetch all institutions
@@ -153,6 +168,8 @@ async def fetch_institutions(
     - **db**: Database session dependency to interact with the database.
     ### Returns:
     - A list of `InstitutionResponse` objects representing all institutions in the database.
+
+    Kept for existing clients; deep pages get slower, so prefer `/student/institutions`.
     """
 
     if page < 1 or limit >= 100:
@@ -169,7 +186,7 @@ async def search_institutions(
                         name : str,
                         page : int = 1, 
                         limit : int = 10,
-                        current_student: Login = Depends(get_current_user)
+                        current_student: Principal = Depends(get_current_principal)
                           ):
 
      """
@@ -180,6 +197,8 @@ async def search_institutions(
     - **name**: The name of the institution to search for(Name with strings like).
     ### Returns:
     - A list of `InstitutionResponse` objects representing the institutions that match the search query.
+
+    Kept for existing clients; deep pages get slower, so prefer `/student/institutions/search/{name}`.
     """
      
      if page < 1 or limit >= 100:
@@ -191,8 +210,118 @@ async def search_institutions(
      return await  src_utils.search_institution(db, name, page, limit, current_student)
 
 
+@student_router.get("/institutions")
+async def fetch_institutions_page(
+                            db: db_dependency,
+                            cursor : Optional[str] = None,
+                            limit : int = 10,
+                            current_student: Principal = Depends(get_current_principal)
+                            ):
+    """
+    ## Fetch institutions a page at a time
+
+    Institutions are returned newest first. Pass the `next_cursor` from one response as `cursor` to get the following page; it is `null` on the last page.
+    ### Parameters:
+    - **db**: Database session dependency to interact with the database.
+    - **cursor**: Opaque continuation token from the previous page, omit it for the first page.
+    - **limit**: Number of institutions per page (1-99).
+    ### Returns:
+    - `institutions`: a list of `InstitutionResponse` objects.
+    - `next_cursor`: token for the next page, or `null` when there are no more results.
+    """
+
+    if limit < 1 or limit >= 100:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid limit. Limit must be between 1 and 100."
+        )
+
+    return await src_utils.fetch_institutions_page(db, cursor, limit, current_student)
+
+
+@student_router.get("/institutions/search/{name}")
+async def search_institutions_page(
+                        db: db_dependency,
+                        name : str,
+                        cursor : Optional[str] = None,
+                        limit : int = 10,
+                        current_student: Principal = Depends(get_current_principal)
+                          ):
+    """
+    ## Search for institutions by name a page at a time
+
+    Same as `/student/search/{name}`, but paged with continuation tokens like `/student/institutions`.
+    ### Parameters:
+    - **db**: Database session dependency to interact with the database.
+    - **name**: The name of the institution to search for(Name with strings like).
+    - **cursor**: Opaque continuation token from the previous page, omit it for the first page.
+    - **limit**: Number of institutions per page (1-99).
+    ### Returns:
+    - `institutions`: a list of matching `InstitutionResponse` objects.
+    - `next_cursor`: token for the next page, or `null` when there are no more results.
+    """
+
+    if limit < 1 or limit >= 100:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid limit. Limit must be between 1 and 100."
+        )
+
+    return await src_utils.fetch_institutions_page(db, cursor, limit, current_student, name=name)
+
+
+@student_router.get("/events", response_model=EventPage)
+async def fetch_events_page(
+                            db: db_dependency,
+                            cursor : Optional[str] = None,
+                            limit : int = 10,
+                            institution_id : Optional[UUID4] = None,
+                            is_free : Optional[bool] = None,
+                            current_student: Principal = Depends(get_current_principal)
+                            ):
+    """
+    ## Fetch upcoming events a page at a time
+
+    Events that have not ended yet are returned soonest first, with the seats still available. Pass the `next_cursor` from one response as `cursor` to get the following page; it is `null` on the last page.
+    ### Parameters:
+    - **cursor**: Opaque continuation token from the previous page, omit it for the first page.
+    - **limit**: Number of events per page (default 10, max 99).
+    - **institution_id**: Only events run by this institution.
+    - **is_free**: `true` for free events only, `false` for paid ones only.
+    ### Returns:
+    - An `EventPage` with the events and `next_cursor`.
+    """
+    if limit < 1 or limit >= 100:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid limit. Limit must be between 1 and 100."
+        )
+
+    return await src_utils.fetch_events_page(db, cursor, limit, current_student, institution_id, is_free)
+
+
+@student_router.post("/events/{event_id}/registrations", status_code=status.HTTP_201_CREATED)
+async def register_for_event(db: db_dependency, event_id: UUID4, current_student: Principal = Depends(get_current_principal)):
+    """
+    ## Register the student for an event
+
+    Takes one of the event's seats. Seats are counted atomically, so a popular event is never overbooked however many students register at once.
+    ### Parameters:
+    - **event_id**: UUID of the event.
+    ### Returns:
+    - The registration id and the seats remaining.
+    - 404 if the event doesn't exist, 409 if it is fully booked, registration has closed or the student is already registered.
+    """
+    return await crud.register_for_event(db, event_id, current_student)
+
+
 @student_router.post("/payments/{application_id}", status_code=status.HTTP_201_CREATED)
-async def create_payment(db: db_dependency, application_id: UUID4, current_student: Login = Depends(get_current_user)):
+async def create_payment(
+                        db: db_dependency,
+                        application_id: UUID4,
+                        idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+                        current_student: Principal = Depends(get_current_principal)
+                        ):
     """
     ## Create a payment for the student
 
@@ -201,6 +330,7 @@ async def create_payment(db: db_dependency, application_id: UUID4, current_stude
     ### Parameters:
     - **db**: Database session dependency to interact with the database.
     - **application_id**: UUID of the program the student is paying for.
+    - **Idempotency-Key** (header, optional): A client-generated key, e.g. a UUID, reused when retrying the same payment. A retry gets the pending transaction's payment link back instead of creating a second transaction; a key whose payment already completed or failed gets 409.
     - **current_student**: Current authenticated student object retrieved using the login token.
 
     ### Body Parameters (from `crud.create_payment` function):
@@ -215,11 +345,11 @@ async def create_payment(db: db_dependency, application_id: UUID4, current_stude
     ### Returns:
     - A Flutterwave-hosted payment URL that the student can use to complete the payment.
     """
-    return await crud.create_payment(db, application_id, current_student)
+    return await crud.create_payment(db, application_id, current_student, idempotency_key)
 
 
 @student_router.post('/transactions/', status_code=status.HTTP_200_OK)
-async def fetch_transactions(db: db_dependency, current_student: Login = Depends(get_current_user)):
+async def fetch_transactions(db: db_dependency, current_student: Principal = Depends(get_current_principal)):
     """
     ## Fetch all transactions for the student
     This endpoint retrieves all transactions for the student from the database and returns them as a list of `TransactionResponse` objects.
@@ -231,21 +361,110 @@ async def fetch_transactions(db: db_dependency, current_student: Login = Depends
     """
     return await src_utils.fetch_transactions(db, current_student)
 
-@student_router.post('/programs/{level}', status_code=status.HTTP_200_OK)
-async def fetch_level_programs(db : db_dependency, level : str, current_student: Login = Depends(get_current_user)):
+
+@student_router.get('/transactions', status_code=status.HTTP_200_OK)
+async def fetch_transactions_page(
+                            db: db_dependency,
+                            cursor : Optional[str] = None,
+                            limit : int = 20,
+                            start : Optional[datetime] = None,
+                            end : Optional[datetime] = None,
+                            status_filter : Optional[str] = Query(None, alias="status"),
+                            current_student: Principal = Depends(get_current_principal)
+                            ):
+    """
+    ## Fetch the student's transactions a page at a time
+
+    Transactions are returned newest first. Pass the `next_cursor` from one response as `cursor` to get the following page; it is `null` on the last page.
+    ### Parameters:
+    - **db**: Database session dependency to interact with the database.
+    - **cursor**: Opaque continuation token from the previous page, omit it for the first page.
+    - **limit**: Number of transactions per page (1-99).
+    - **start**, **end**: Optional ISO 8601 bounds on `transaction_date`, start inclusive and end exclusive.
+    - **status**: Optional transaction status to filter on, e.g. `pending`.
+    ### Returns:
+    - `transactions`: a list of transactions.
+    - `next_cursor`: token for the next page, or `null` when there are no more results.
+    """
+
+    if limit < 1 or limit >= 100:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid limit. Limit must be between 1 and 100."
+        )
+
+    return await src_utils.fetch_transactions_page(db, cursor, limit, current_student, start, end, status_filter)
+
+
+@student_router.get('/transactions/reference/{reference}', status_code=status.HTTP_200_OK)
+async def fetch_transaction_by_reference(db: db_dependency, reference: str, current_student: Principal = Depends(get_current_principal)):
+    """
+    ## Look a transaction up by its payment reference
+
+    ### Parameters:
+    - **reference**: Either the `tx_ref` sent to Flutterwave or Flutterwave's own `flw_ref`, as shown on gateway statements.
+    ### Returns:
+    - The matching transaction. Students only find their own; admins find any. 404 if there is none.
+    """
+    return await src_utils.fetch_transaction_by_reference(db, reference, current_student)
+
+
+@student_router.get('/transactions/export', status_code=status.HTTP_200_OK)
+async def export_transactions(
+                            export_format : Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+                            start : Optional[datetime] = None,
+                            end : Optional[datetime] = None,
+                            status_filter : Optional[str] = Query(None, alias="status"),
+                            current_student: Principal = Depends(get_current_principal)
+                            ):
+    """
+    ## Export the student's transactions
+
+    Streams every matching transaction, oldest first, as a file download. Admins get every student's transactions.
+    ### Parameters:
+    - **format**: `ndjson` (one JSON object per line) or `csv`.
+    - **start**, **end**: Optional ISO 8601 bounds on `transaction_date`, start inclusive and end exclusive.
+    - **status**: Optional transaction status to filter on, e.g. `pending`.
+    ### Returns:
+    - A streamed `transactions.ndjson` or `transactions.csv` attachment.
     """
-    Fetch a list of programs available for a specific academic level.
+    return await src_utils.export_transactions(current_student, export_format, start, end, status_filter)
 
-    Args:
-        level (str): The academic level to filter programs by (e.g., 'Undergraduate', 'Graduate').
-        current_student (Login): Requires authentication of a logged-in student.
+@student_router.api_route('/programs/{level}', methods=["GET", "POST"], response_model=ProgramPage, status_code=status.HTTP_200_OK)
+async def fetch_level_programs(
+                            db : db_dependency,
+                            level : ProgramLevel,
+                            cursor : Optional[str] = None,
+                            limit : int = 10,
+                            category : Optional[str] = None,
+                            is_free : Optional[bool] = None,
+                            deadline_before : Optional[datetime] = None,
+                            include_closed : bool = False,
+                            current_student: Principal = Depends(get_current_principal)
+                            ):
+    """
+    ## Fetch the programs offered at an academic level a page at a time
 
-    Returns:
-        dict: A JSON response containing a list of programs and related links.
-              The 'programs' key holds an array of program objects, each with 'id', 'name', and 'email' (example fields).
-              The '_links' key provides HATEOAS links for navigation.
+    Programs are returned soonest application deadline first, with always-available programs last. Pass the `next_cursor` from one response as `cursor` to get the following page; it is `null` on the last page.
+    ### Parameters:
+    - **level**: The academic level, e.g. `Undergraduate`.
+    - **cursor**: Opaque continuation token from the previous page, omit it for the first page.
+    - **limit**: Number of programs per page (default 10, max 99).
+    - **category**: Only programs in this category.
+    - **is_free**: `true` for free programs only, `false` for paid ones only.
+    - **deadline_before**: Only programs whose application deadline is before this ISO 8601 time.
+    - **include_closed**: Also list programs whose deadline has passed.
+    ### Returns:
+    - A `ProgramPage` with the programs, `next_cursor` and HATEOAS `_links`.
     """
-    return await crud.get_level_programs(db, level)
+    if limit < 1 or limit >= 100:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid limit. Limit must be between 1 and 100."
+        )
+
+    return await src_utils.fetch_programs_page(db, level.value, cursor, limit, current_student, category, is_free,
+                                               deadline_before, include_closed)
 
 
 
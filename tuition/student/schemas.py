@@ -63,6 +63,15 @@ class Application(BaseModel):
     program_id: UUID4
     custom_field : Optional[Dict[str, Any]] = None 
 
+class ApplicationBatch(BaseModel):
+    applications: List[Application] = Field(..., min_length=1, max_length=20)
+
+class ApplicationResult(BaseModel):
+    program_id: UUID4
+    status: str  # created, already_applied or program_not_found
+    application_id: Optional[UUID4] = None
+    program_cost: Optional[float] = None
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -1,7 +1,8 @@
 from fastapi import HTTPException, status
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.future import select
-from tuition.student.models import Student
-from tuition.security.hash import Hash
+from tuition.student.models import Student, Application
+import tuition.security.hash as hashing
 
 
     
@@ -36,7 +37,7 @@ async def get_student_by_email(db, username):
 
 
 
-def verify_password(provided_password: str, hashed_password: str):
+async def verify_password(provided_password: str, hashed_password: str):
     """Verify the provided password against the stored hashed password.
     
     Args:
@@ -47,7 +48,7 @@ def verify_password(provided_password: str, hashed_password: str):
         HTTPException: If the provided password does not match the stored password, 
         an exception with status code 401 and a message "Incorrect password" is raised.
     """
-    if not Hash.verify(provided_password, hashed_password):
+    if not await hashing.verify_password(provided_password, hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect password"
@@ -74,7 +75,18 @@ def create_student(payload, hashed_password):
         return new_student
 
 
+async def insert_applications(db, rows):
+    """Insert application rows in one statement, skipping any the unique constraint rejects.
 
-
-
-
+    Returns:
+        dict: {program id: new application id} for the rows actually inserted.
+    """
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    stmt = (
+        dialect.insert(Application)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["student_id", "application_type_id"])
+        .returning(Application.application_type_id, Application.id)
+    )
+    result = await db.execute(stmt)
+    return dict(result.all())
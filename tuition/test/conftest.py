@@ -1,8 +1,13 @@
+import asyncio
+from datetime import datetime, timezone
+
 import pytest
 from unittest.mock import AsyncMock, patch
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.pool import NullPool
 from tuition.database import Base, db_dependency, get_db  # Adjust as needed
 from tuition.main import app  # Ensure the FastAPI app is imported
 
@@ -58,6 +63,25 @@ def test_client():
         yield client
 # ---!!! Your test functions should be able to access the mocked database now
 
+
+@pytest.fixture
+def sqlite_engine(tmp_path):
+    """A throwaway SQLite database file. Tests create only the tables they need on it."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/test.db", poolclass=NullPool)
+
+    # The programs deadline check calls now(), which SQLite doesn't have
+    @event.listens_for(engine.sync_engine, "connect")
+    def add_now(dbapi_connection, connection_record):
+        dbapi_connection.create_function("now", 0, lambda: datetime.now(timezone.utc).isoformat(" "))
+
+    yield engine
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def session_factory(sqlite_engine):
+    return sessionmaker(bind=sqlite_engine, class_=AsyncSession, autocommit=False, autoflush=False)
+
 # mock_student_crud = AsyncMock()
 # @pytest.fixture
 # def fake_student_utils():
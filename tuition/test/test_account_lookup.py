@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event
+
+from tuition.admin.models import Admin
+from tuition.institution.models import Institution
+from tuition.src_utils import get_account_by_email
+from tuition.student.models import Student
+
+TABLES = [Student.__table__, Institution.__table__, Admin.__table__]
+
+
+def student(email):
+    return Student(full_name="Test Student", email=email, phone_number="08012345678", hashed_password="x",
+                   field_of_interest="Engineering", is_verified=True)
+
+
+def institution(email):
+    return Institution(name_of_institution="Institution", type_of_institution="University", email=email,
+                       country="Nigeria", official_name="Institution", brief_description="An institution",
+                       hashed_password="x", is_verified=True)
+
+
+@pytest.fixture
+def accounts_session(sqlite_engine, session_factory):
+    async def setup():
+        async with sqlite_engine.begin() as conn:
+            await conn.run_sync(lambda sync_conn: [t.create(sync_conn) for t in TABLES])
+        async with session_factory() as db:
+            db.add_all([
+                student("student@example.com"),
+                institution("inst@example.com"),
+                Admin(full_name="Admin", email="admin@example.com", hashed_password="x"),
+                # Registered as both; the student account wins, as with the old per-table lookups
+                student("shared@example.com"),
+                institution("shared@example.com"),
+            ])
+            await db.commit()
+
+    asyncio.run(setup())
+    yield sqlite_engine, session_factory
+
+
+def test_account_is_found_in_any_table_with_one_query(accounts_session):
+    engine, session_factory = accounts_session
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    async def run():
+        found = {}
+        async with session_factory() as db:
+            for email in ("student@example.com", "inst@example.com", "admin@example.com", "shared@example.com",
+                          "nobody@example.com"):
+                found[email] = await get_account_by_email(db, email)
+        return found
+
+    found = asyncio.run(run())
+
+    assert len(statements) == 5
+    assert {email: account and (account[0], type(account[1]), account[1].email) for email, account in found.items()} == {
+        "student@example.com": ("student", Student, "student@example.com"),
+        "inst@example.com": ("institution", Institution, "inst@example.com"),
+        "admin@example.com": ("admin", Admin, "admin@example.com"),
+        "shared@example.com": ("student", Student, "shared@example.com"),
+        "nobody@example.com": None,
+    }
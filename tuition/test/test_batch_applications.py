@@ -0,0 +1,105 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete, event, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.future import select
+
+from tuition.analytics import ProgramStats
+from tuition.institution.models import Category, Institution, Program, SubAccount, program_category_association
+from tuition.institution.utils import ProgramCatalogue
+from tuition.security.oauth2 import Principal
+from tuition.services import services
+from tuition.student import crud
+from tuition.student.models import Application, Student
+from tuition.student.schemas import Application as ApplicationRequest, ApplicationBatch
+
+TABLES = [Student.__table__, Institution.__table__, SubAccount.__table__, Program.__table__, Category.__table__,
+          program_category_association, Application.__table__, ProgramStats.__table__]
+
+
+@pytest.fixture
+def application_session(sqlite_engine, session_factory):
+    session_factory.configure(expire_on_commit=False)
+
+    # Foreign keys are off by default in SQLite
+    @event.listens_for(sqlite_engine.sync_engine, "connect")
+    def enable_foreign_keys(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA foreign_keys = ON")
+
+    async def setup():
+        async with sqlite_engine.begin() as conn:
+            await conn.run_sync(lambda sync_conn: [t.create(sync_conn) for t in TABLES])
+        async with session_factory() as db:
+            student = Student(full_name="Test Student", email="student@example.com", phone_number="08012345678",
+                              hashed_password="x", field_of_interest="Engineering", is_verified=True)
+            programs = [Program(name_of_program=f"Program {i}", program_level="Undergraduate", always_available=True,
+                                cost=100 * (i + 1), currency_code="NGN", image_url="https://example.com/p.png")
+                        for i in range(3)]
+            db.add_all([student, *programs])
+            await db.commit()
+            return Principal(role="student", user=student), [program.id for program in programs]
+
+    principal, program_ids = asyncio.run(setup())
+    with services.overridden(program_catalogue=ProgramCatalogue(maxsize=10, ttl=60)):
+        yield session_factory, principal, program_ids
+
+
+def test_batch_reports_each_program_and_inserts_new_applications_once(application_session):
+    session_factory, principal, (first, second, third) = application_session
+    missing = uuid.uuid4()
+
+    async def run():
+        async with session_factory() as db:
+            await crud.apply_for_program(db, ApplicationRequest(program_id=first), principal)
+        async with session_factory() as db:
+            batch = ApplicationBatch(applications=[
+                ApplicationRequest(program_id=first),
+                ApplicationRequest(program_id=second, custom_field={"essay": "Why me"}),
+                ApplicationRequest(program_id=missing),
+                ApplicationRequest(program_id=third),
+                ApplicationRequest(program_id=second),
+            ])
+            response = await crud.apply_for_programs(db, batch, principal)
+            count = (await db.execute(select(func.count()).select_from(Application))).scalar_one()
+            essay = (await db.execute(
+                select(Application.custom_fields).where(Application.application_type_id == second)
+            )).scalar_one()
+        return response["results"], count, essay
+
+    results, count, essay = asyncio.run(run())
+
+    assert [r.status for r in results] == ["already_applied", "created", "program_not_found", "created", "already_applied"]
+    assert results[1].program_cost == 200 and results[1].application_id is not None
+    assert count == 3
+    assert essay == {"essay": "Why me"}
+
+
+def test_repeat_single_application_is_rejected_by_the_constraint(application_session):
+    session_factory, principal, (program_id, _, _) = application_session
+
+    async def run():
+        for _ in range(2):
+            async with session_factory() as db:
+                await crud.apply_for_program(db, ApplicationRequest(program_id=program_id), principal)
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(run())
+    assert exc.value.status_code == 409
+
+
+def test_other_integrity_errors_are_not_reported_as_a_repeat(application_session):
+    session_factory, principal, (program_id, _, _) = application_session
+
+    async def run():
+        # The student's account is gone by the time the application is written
+        async with session_factory() as db:
+            await db.execute(delete(Student))
+            await db.commit()
+        async with session_factory() as db:
+            await crud.apply_for_program(db, ApplicationRequest(program_id=program_id), principal)
+
+    with pytest.raises(IntegrityError, match="FOREIGN KEY"):
+        asyncio.run(run())
@@ -0,0 +1,152 @@
+import asyncio
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload
+
+from tuition.admin.models import Admin
+from tuition.email_outbox import EmailOutbox
+from tuition.imports import run_import
+from tuition.institution import crud as institution_crud
+from tuition.institution.models import Category, Institution, Program, SubAccount, program_category_association
+from tuition.institution.utils import CategoryCache
+from tuition.services import services
+from tuition.student.models import Student
+
+TABLES = [Student.__table__, Institution.__table__, Admin.__table__, SubAccount.__table__, Program.__table__,
+          Category.__table__, program_category_association, EmailOutbox.__table__]
+
+
+def institution(name, email, **overrides):
+    return {"name_of_institution": name, "type_of_institution": "University", "website": "https://example.com",
+            "address": "1 University Road", "email": email, "country": "Nigeria", "official_name": name,
+            "brief_description": "A university in Lagos", **overrides}
+
+
+def upload(content, filename):
+    return UploadFile(file=io.BytesIO(content.encode()), filename=filename)
+
+
+@pytest.fixture
+def import_session(sqlite_engine, session_factory):
+    async def setup():
+        async with sqlite_engine.begin() as conn:
+            await conn.run_sync(lambda sync_conn: [t.create(sync_conn) for t in TABLES])
+        async with session_factory(expire_on_commit=False) as db:
+            admin = Admin(full_name="Admin", email="admin@example.com", hashed_password="x")
+            banked = Institution(**institution("Banked University", "banked@example.com"), hashed_password="x",
+                                 is_verified=True)
+            db.add_all([admin, banked, Category(name="Engineering"), Category(name="Business"),
+                        Student(full_name="Student", email="student@example.com", phone_number="08012345678",
+                                hashed_password="x", field_of_interest="Engineering")])
+            await db.flush()
+            db.add(SubAccount(institution_id=banked.id, subaccount_id="RS_1", account_name="Banked University",
+                              account_number="0123456789", country="NG", currency="NGN", bank_name="Bank"))
+            await db.commit()
+
+    asyncio.run(setup())
+    with services.overridden(category_cache=CategoryCache()):
+        yield session_factory
+
+
+async def import_file(session_factory, kind, content, import_format):
+    # Small chunks, so rows and duplicates span several of them
+    async with session_factory() as db:
+        return await run_import(db, upload(content, f"{kind}.{import_format}"), kind, import_format, chunk_size=2)
+
+
+def test_institutions_import_reports_bad_rows_and_queues_setup_emails(import_session):
+    session_factory = import_session
+    lines = [
+        json.dumps(institution("Lagos University", "lagos@example.com")),
+        json.dumps(institution("Abuja University", "not-an-email")),
+        json.dumps(institution("Lagos Again", "lagos@example.com")),
+        "",
+        "{not json",
+        json.dumps(institution("Student Clash", "student@example.com")),
+        json.dumps(institution("Ibadan University", "ibadan@example.com", website=None)),
+        json.dumps(institution("Ab", "short@example.com", brief_description="Short")),
+    ]
+
+    async def run():
+        report = await import_file(session_factory, "institutions", "\n".join(lines), "ndjson")
+        async with session_factory() as db:
+            imported = (await db.execute(
+                select(Institution.email, Institution.is_verified).where(Institution.email != "banked@example.com")
+            )).all()
+            outbox = (await db.execute(select(EmailOutbox.recipient, EmailOutbox.body))).all()
+        link = dict(outbox)["lagos@example.com"].split('href="')[1].split('"')[0]
+        token = link.rsplit("/", 1)[1]
+        async with session_factory() as db:
+            await institution_crud.set_up_password(db, token, "Str0ng#Password")
+        async with session_factory() as db:
+            with pytest.raises(HTTPException) as reused:
+                await institution_crud.set_up_password(db, token, "An0ther#Password")
+            lagos = (await db.execute(select(Institution).where(Institution.email == "lagos@example.com"))).scalar_one()
+        return report, sorted(imported), sorted(recipient for recipient, _ in outbox), lagos, reused.value
+
+    report, imported, recipients, lagos, reused = asyncio.run(run())
+
+    assert (report["rows"], report["imported"], report["rejected"]) == (7, 2, 5)
+    assert [(error["row"], error["errors"][0].split(":")[0]) for error in report["errors"]] == [
+        (2, "email"),
+        (3, "Email already exists"),
+        (4, "Invalid JSON"),
+        (5, "Email already exists"),
+        (7, "name_of_institution"),
+    ]
+    assert report["errors"][-1]["errors"] == [
+        "name_of_institution: String should have at least 3 characters",
+        "official_name: String should have at least 3 characters",
+        "brief_description: String should have at least 10 characters",
+    ]
+    assert imported == [("ibadan@example.com", False), ("lagos@example.com", False)]
+    assert recipients == ["ibadan@example.com", "lagos@example.com"]
+    assert lagos.is_verified and lagos.hashed_password.startswith("$2")
+    assert reused.status_code == 409
+
+
+def test_programs_import_from_csv(import_session):
+    session_factory = import_session
+    deadline = (datetime.now(timezone.utc) + timedelta(days=30)).isoformat()
+    past = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat()
+    header = "institution_email,name_of_program,program_level,categories,always_available,is_free,currency_code," \
+             "description,image_url,application_deadline,cost\n"
+    rows = [
+        f'banked@example.com,Civil Engineering,Undergraduate,"Engineering,Business",false,false,NGN,Civil,https://example.com/c.png,{deadline},150000',
+        "banked@example.com,Music,Undergraduate,,true,true,NGN,Music,https://example.com/m.png,,",
+        "banked@example.com,Law,Undergraduate,,true,true,NGN,Law,https://example.com/l.png,,100",
+        f"banked@example.com,History,Graduate,,false,false,NGN,History,https://example.com/h.png,{past},100",
+        "banked@example.com,Physics,Doctorate,Astrology,true,false,NGN,Physics,https://example.com/p.png,,100",
+        "missing@example.com,Physics,Undergraduate,,true,false,NGN,Physics,https://example.com/p.png,,100",
+        "banked@example.com,Music,Undergraduate,,true,true,NGN,Music again,https://example.com/m.png,,",
+    ]
+
+    async def run():
+        report = await import_file(session_factory, "programs", header + "\n".join(rows), "csv")
+        rerun = await import_file(session_factory, "programs", header + rows[0], "csv")
+        async with session_factory() as db:
+            programs = (await db.execute(select(Program).options(selectinload(Program.categories)))).scalars().all()
+            imported = sorted((program.name_of_program, program.cost, program.subaccount_id,
+                               sorted(category.name for category in program.categories)) for program in programs)
+        return report, rerun, imported
+
+    report, rerun, imported = asyncio.run(run())
+
+    assert (report["rows"], report["imported"], report["rejected"]) == (7, 2, 5)
+    assert {error["row"]: error["errors"] for error in report["errors"]} == {
+        3: ["Value error, Cost must be 0 for free programs."],
+        4: ["Value error, The application deadline must be a time zone aware time in the future."],
+        5: ["program_level: Input should be 'Graduate', 'Undergraduate' or 'Postgraduate'",
+            "categories.0: Input should be 'Arts and Humanities', 'Business', 'language learning', "
+            "'Applied Natural Science', 'Health', 'Information Technology', 'Math and Logic', 'Engineering', "
+            "'Social Science', 'Physical Science', 'Data Science' or 'Education'"],
+        6: ["Institution not found"],
+        7: ["Program already exists"],
+    }
+    assert rerun["errors"] == [{"row": 1, "errors": ["Program already exists"]}]
+    assert imported == [("Civil Engineering", 150000, "RS_1", ["Business", "Engineering"]), ("Music", 0, "RS_1", [])]
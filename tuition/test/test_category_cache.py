@@ -0,0 +1,56 @@
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy.future import select
+
+import tuition.admin.utils as admin_utils
+from tuition.institution.models import Category, program_category_association
+from tuition.institution.utils import CategoryCache, update_category_program_relation
+from tuition.services import services
+
+
+@pytest.fixture
+def category_session(sqlite_engine, session_factory):
+    async def setup():
+        async with sqlite_engine.begin() as conn:
+            await conn.run_sync(Category.__table__.create)
+            await conn.run_sync(program_category_association.create)
+        async with session_factory() as db:
+            db.add_all([Category(name="Engineering"), Category(name="Medicine")])
+            await db.commit()
+
+    asyncio.run(setup())
+    with services.overridden(category_cache=CategoryCache()):
+        yield session_factory
+
+
+def test_categories_are_resolved_once_and_cleared_when_one_is_added(category_session):
+    cache = services.get("category_cache")
+
+    async def run():
+        async with category_session() as db:
+            first = await cache.resolve(db, ["Engineering", "Medicine", "Astrology"])
+            second = await cache.resolve(db, ["Engineering", "Medicine"])
+            assert first == second and set(first) == {"Engineering", "Medicine"}
+            assert (cache.hits, cache.misses) == (2, 3)
+
+            await admin_utils.add_program_category(db, "Astrology")
+            assert cache.stats()["size"] == 0
+            assert "Astrology" in await cache.resolve(db, ["Astrology"])
+
+    asyncio.run(run())
+
+
+def test_associations_are_left_for_the_caller_to_commit(category_session):
+    program_id = uuid.uuid4()
+
+    async def run():
+        async with category_session() as db:
+            await update_category_program_relation(db, ["Engineering", "Astrology"], program_id)
+            rows = (await db.execute(select(program_category_association))).all()
+            assert len(rows) == 1
+            await db.rollback()
+            assert (await db.execute(select(program_category_association))).all() == []
+
+    asyncio.run(run())
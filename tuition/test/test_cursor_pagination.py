@@ -0,0 +1,90 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import insert
+from sqlalchemy.future import select
+
+from tuition.institution.models import Institution
+from tuition.security.oauth2 import Principal
+from tuition.src_utils import fetch_institutions_page
+from tuition.student.models import Student
+
+STUDENT = Principal(role="student", user=Student(email="student@example.com", is_verified=True))
+
+
+def institution(i, **values):
+    return {"name_of_institution": f"Institution {i}", "type_of_institution": "University", "email": f"inst{i}@example.com",
+            "country": "Nigeria", "official_name": f"Institution {i}", "brief_description": "An institution",
+            "website": "https://example.com", "address": "1 Road", "hashed_password": "x", "is_verified": True, **values}
+
+
+@pytest.fixture
+def institutions_session(sqlite_engine, session_factory):
+    # created_at comes from SQLite's CURRENT_TIMESTAMP, stored without fractional seconds
+    async def setup():
+        async with sqlite_engine.begin() as conn:
+            await conn.run_sync(Institution.__table__.create)
+
+    asyncio.run(setup())
+    return session_factory
+
+
+def walk_pages(session_factory, limit):
+    async def run():
+        pages, cursor = [], None
+        # Bounded, so a cursor that never moves on fails the test instead of hanging it
+        for _ in range(10):
+            async with session_factory() as db:
+                page = await fetch_institutions_page(db, cursor, limit, STUDENT)
+            pages.append([inst.email for inst in page["institutions"]])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        return pages
+    return asyncio.run(run())
+
+
+async def seed(session_factory, rows):
+    async with session_factory() as db:
+        await db.execute(insert(Institution), rows)
+        await db.commit()
+        result = await db.execute(select(Institution.email).order_by(Institution.created_at.desc(), Institution.id.desc()))
+        return result.scalars().all()
+
+
+def test_pages_cover_rows_created_in_the_same_second_once(institutions_session):
+    newest_first = asyncio.run(seed(institutions_session, [institution(i) for i in range(7)]))
+
+    pages = walk_pages(institutions_session, 2)
+
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+    assert [email for page in pages for email in page] == newest_first
+
+
+def test_pages_mix_default_and_explicit_timestamps(institutions_session):
+    now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    rows = [institution(i) for i in range(3)]
+    # Same second as the defaulted rows, and either side of it with fractional seconds
+    rows += [institution(3, created_at=now), institution(4, created_at=now + timedelta(microseconds=250)),
+             institution(5, created_at=now - timedelta(seconds=1, microseconds=-500)),
+             institution(6, created_at=now + timedelta(seconds=1, microseconds=999))]
+    asyncio.run(seed(institutions_session, rows))
+
+    pages = walk_pages(institutions_session, 2)
+    emails = [email for page in pages for email in page]
+
+    assert sorted(emails) == sorted(row["email"] for row in rows)
+    assert emails[0] == "inst6@example.com" and emails[-1] == "inst5@example.com"
+
+
+def test_invalid_cursor_is_rejected(institutions_session):
+    async def run():
+        async with institutions_session() as db:
+            return await fetch_institutions_page(db, "not-a-cursor", 2, STUDENT)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(run())
+
+    assert error.value.status_code == 400
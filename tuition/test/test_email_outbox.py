@@ -0,0 +1,66 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from sqlalchemy.future import select
+
+from tuition.email_outbox import DryRunSink, EmailOutbox, EmailOutboxWorker, enqueue_email, utcnow
+
+
+@pytest.fixture
+def outbox_session(sqlite_engine, session_factory):
+    async def setup():
+        async with sqlite_engine.begin() as conn:
+            await conn.run_sync(EmailOutbox.__table__.create)
+
+    asyncio.run(setup())
+    yield session_factory
+
+
+def make_worker(session_factory, sink, max_attempts=3):
+    return EmailOutboxWorker(session_factory, sink, batch_size=10, poll_interval=0.01,
+                             max_attempts=max_attempts, backoff=60, lease=300)
+
+
+async def queue(session_factory, recipients):
+    async with session_factory() as db:
+        enqueue_email(db, recipients, "Email Account Verification", "<p>verify</p>")
+        await db.commit()
+
+
+async def outbox(session_factory):
+    async with session_factory() as db:
+        rows = (await db.execute(select(EmailOutbox).order_by(EmailOutbox.recipient))).scalars().all()
+        return {row.recipient: row for row in rows}
+
+
+def test_batch_is_sent_over_one_connection_and_failures_are_retried_later(outbox_session):
+    sink = DryRunSink(failing={"bounce@example.com"})
+    worker = make_worker(outbox_session, sink)
+
+    asyncio.run(queue(outbox_session, ["a@example.com", "b@example.com", "bounce@example.com"]))
+    assert asyncio.run(worker.process_batch()) == 3
+
+    assert sink.connections == 1
+    assert sorted(recipient for recipient, _, _ in sink.sent) == ["a@example.com", "b@example.com"]
+
+    rows = asyncio.run(outbox(outbox_session))
+    assert rows["a@example.com"].status == "sent"
+    bounced = rows["bounce@example.com"]
+    assert (bounced.status, bounced.attempts) == ("pending", 1)
+    assert bounced.next_attempt_at.replace(tzinfo=None) > (utcnow() + timedelta(seconds=30)).replace(tzinfo=None)
+
+    # Nothing is due until the backoff has passed
+    assert asyncio.run(worker.process_batch()) == 0
+
+
+def test_message_is_marked_failed_after_max_attempts(outbox_session):
+    sink = DryRunSink(failing={"bounce@example.com"})
+    worker = make_worker(outbox_session, sink, max_attempts=1)
+
+    asyncio.run(queue(outbox_session, "bounce@example.com"))
+    asyncio.run(worker.process_batch())
+
+    bounced = asyncio.run(outbox(outbox_session))["bounce@example.com"]
+    assert (bounced.status, bounced.attempts) == ("failed", 1)
+    assert "rejected" in bounced.last_error
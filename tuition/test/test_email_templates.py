@@ -0,0 +1,44 @@
+from dataclasses import dataclass
+
+import pytest
+from jinja2 import UndefinedError
+
+from tuition.email_templates import EmailTemplates, PasswordResetEmail, VerificationEmail
+
+
+def test_templates_are_compiled_once_and_render_the_link():
+    templates = EmailTemplates()
+    templates.start()
+    compiled = templates.get("verification.html")
+
+    subject, body = templates.render(VerificationEmail(link="https://tuition.test/student/verify/abc"))
+
+    assert subject == "Email Account Verification"
+    assert 'href="https://tuition.test/student/verify/abc"' in body
+    assert "<title>Tuition Verification</title>" in body
+    assert templates.get("verification.html") is compiled
+
+
+def test_render_many_matches_render_and_escapes_context():
+    templates = EmailTemplates()
+    contexts = [
+        VerificationEmail(link="https://tuition.test/verify/1"),
+        VerificationEmail(link='https://tuition.test/verify/"><script>'),
+        PasswordResetEmail(link="https://tuition.test/reset/2"),
+    ]
+
+    rendered = templates.render_many(contexts)
+
+    assert rendered == [templates.render(context) for context in contexts]
+    assert "<script>" not in rendered[1][1]
+    assert rendered[2][0] == "Password Reset Request"
+
+
+def test_missing_context_variable_is_an_error():
+    @dataclass
+    class Broken:
+        template = "verification.html"
+        subject = "Broken"
+
+    with pytest.raises(UndefinedError):
+        EmailTemplates().render(Broken())
@@ -0,0 +1,195 @@
+"""Event listing and seat counting.
+
+The concurrency test needs real row locks, so it runs against Postgres only:
+set ``TEST_POSTGRES_URL`` (an asyncpg URL) and it builds the tables in a
+scratch schema and drops them afterwards.
+"""
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, func, insert, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+
+from tuition.institution.models import Event, EventRegistration, Institution
+from tuition.security.oauth2 import Principal
+from tuition.src_utils import fetch_events_page
+from tuition.student import crud
+from tuition.student.models import Student
+
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+SCHEMA = "event_registrations"
+TABLES = [Student.__table__, Institution.__table__, Event.__table__, EventRegistration.__table__]
+
+
+def make_event(name, capacity, starts_in_days, deadline_in_days=None):
+    now = datetime.now(timezone.utc)
+    return {
+        "id": uuid.uuid4(), "name_of_event": name, "description": "Open day", "location": "Lagos",
+        "start_date": now + timedelta(days=starts_in_days), "end_date": now + timedelta(days=starts_in_days, hours=6),
+        "application_deadline": now + timedelta(days=deadline_in_days) if deadline_in_days is not None else None,
+        "image_url": "https://example.com/e.png", "currency_code": "NGN", "is_free": True, "capacity": capacity,
+    }
+
+
+def make_students(count):
+    return [
+        {"id": uuid.uuid4(), "full_name": f"Student {i}", "email": f"student{i}@example.com",
+         "phone_number": "08012345678", "hashed_password": "x", "field_of_interest": "Engineering", "is_verified": True}
+        for i in range(count)
+    ]
+
+
+async def seed(engine, events, students):
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: [t.create(sync_conn) for t in TABLES])
+        await conn.execute(insert(Student.__table__), students)
+        await conn.execute(insert(Event.__table__), events)
+
+
+async def register(session_factory, event_id, student_id):
+    async with session_factory() as db:
+        # Loaded on the same session, as get_current_principal does, so the commit expires it
+        principal = Principal(role="student", user=await db.get(Student, student_id))
+        try:
+            return (await crud.register_for_event(db, event_id, principal))["seats_remaining"]
+        except HTTPException as e:
+            return e.status_code, e.detail
+
+
+@pytest.fixture
+def event_session(sqlite_engine, session_factory):
+    # Foreign keys are off by default in SQLite
+    @event.listens_for(sqlite_engine.sync_engine, "connect")
+    def enable_foreign_keys(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA foreign_keys = ON")
+
+    events = {
+        "small": make_event("Small open day", capacity=2, starts_in_days=3),
+        "closed": make_event("Closed open day", capacity=10, starts_in_days=2, deadline_in_days=-1),
+        "later": make_event("Later open day", capacity=10, starts_in_days=10),
+        "past": make_event("Past open day", capacity=10, starts_in_days=-5),
+    }
+    students = make_students(3)
+    asyncio.run(seed(sqlite_engine, list(events.values()), students))
+    yield session_factory, events, [student["id"] for student in students]
+
+
+def test_upcoming_events_are_paged_soonest_first(event_session):
+    session_factory, events, _ = event_session
+    principal = Principal(role="student", user=Student(email="student@example.com", is_verified=True))
+
+    async def run():
+        pages, cursor = [], None
+        while True:
+            async with session_factory() as db:
+                page = await fetch_events_page(db, cursor, 2, principal)
+            pages.append([(event.name_of_event, event.seats_remaining) for event in page["events"]])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return pages
+
+    assert asyncio.run(run()) == [
+        [("Closed open day", 10), ("Small open day", 2)],
+        [("Later open day", 10)],
+    ]
+
+
+def test_registration_takes_a_seat_until_the_event_is_full(event_session):
+    session_factory, events, (first, second, third) = event_session
+    small = events["small"]["id"]
+
+    async def run():
+        results = [await register(session_factory, small, student) for student in (first, second, third)]
+        results.append(await register(session_factory, events["later"]["id"], first))
+        results.append(await register(session_factory, events["later"]["id"], first))
+        results.append(await register(session_factory, events["closed"]["id"], first))
+        results.append(await register(session_factory, uuid.uuid4(), first))
+        async with session_factory() as db:
+            taken = dict((await db.execute(select(Event.name_of_event, Event.seats_taken))).all())
+            registered = (await db.execute(select(func.count()).select_from(EventRegistration))).scalar_one()
+        return results, taken, registered
+
+    results, taken, registered = asyncio.run(run())
+
+    assert results == [
+        1, 0,
+        (409, "This event is fully booked"),
+        9,
+        (409, "You are already registered for this event"),
+        (409, "Registration for this event has closed"),
+        (404, "Event not found"),
+    ]
+    # The duplicate's seat was given back
+    assert (taken["Small open day"], taken["Later open day"], registered) == (2, 1, 3)
+
+
+def test_registration_answers_after_committing_with_a_session_loaded_principal(event_session):
+    session_factory, events, (student_id, *_) = event_session
+
+    async def run():
+        async with session_factory() as db:
+            principal = Principal(role="student", user=await db.get(Student, student_id))
+            return await crud.register_for_event(db, events["later"]["id"], principal)
+
+    response = asyncio.run(run())
+
+    assert response["message"] == "Registered for event"
+    assert response["seats_remaining"] == 9
+
+
+def test_other_integrity_errors_are_not_reported_as_a_repeat(event_session):
+    session_factory, events, _ = event_session
+    # No such student row, so the registration's foreign key fails instead of the unique constraint
+    unknown = Principal(role="student", user=Student(id=uuid.uuid4(), email="ghost@example.com", is_verified=True))
+
+    async def run():
+        async with session_factory() as db:
+            with pytest.raises(IntegrityError):
+                await crud.register_for_event(db, events["later"]["id"], unknown)
+        async with session_factory() as db:
+            return (await db.execute(select(Event.seats_taken).where(Event.id == events["later"]["id"]))).scalar_one()
+
+    # The seat claimed before the failed insert was given back
+    assert asyncio.run(run()) == 0
+
+
+@pytest.mark.skipif(not TEST_POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+def test_parallel_registrations_never_oversell():
+    event = make_event("Open day", capacity=100, starts_in_days=7)
+    students = make_students(1000)
+
+    async def run():
+        admin = create_async_engine(TEST_POSTGRES_URL)
+        async with admin.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+
+        engine = create_async_engine(TEST_POSTGRES_URL, pool_size=50, max_overflow=0, pool_timeout=120,
+                                     connect_args={"server_settings": {"search_path": SCHEMA}})
+        session_factory = sessionmaker(bind=engine, class_=AsyncSession, autocommit=False, autoflush=False)
+        try:
+            await seed(engine, [event], students)
+            results = await asyncio.gather(*(register(session_factory, event["id"], student["id"]) for student in students))
+            async with session_factory() as db:
+                taken = (await db.execute(select(Event.seats_taken))).scalar_one()
+                registered = (await db.execute(select(func.count()).select_from(EventRegistration))).scalar_one()
+            return results, taken, registered
+        finally:
+            await engine.dispose()
+            async with admin.begin() as conn:
+                await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            await admin.dispose()
+
+    results, taken, registered = asyncio.run(run())
+
+    seats = sorted(result for result in results if isinstance(result, int))
+    assert seats == list(range(100))
+    assert results.count((409, "This event is fully booked")) == 900
+    assert (taken, registered) == (100, 100)
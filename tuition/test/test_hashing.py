@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from tuition.security.hash import HashingService, hash_password, verify_password
+from tuition.services import services
+
+
+def test_passwords_are_hashed_and_verified_on_the_pool():
+    service = HashingService(max_workers=2)
+
+    async def run():
+        hashed = await hash_password("correct horse")
+        return hashed, await verify_password("correct horse", hashed), await verify_password("wrong", hashed)
+
+    with services.overridden(hashing=service):
+        hashed, correct, wrong = asyncio.run(run())
+    service.shutdown()
+
+    assert hashed.startswith("$2b$")
+    assert correct is True and wrong is False
+    assert service.metrics()["completed"] == 3
+
+
+def test_pool_caps_concurrent_jobs_and_keeps_the_loop_free():
+    service = HashingService(max_workers=2)
+    lock = threading.Lock()
+    running = {"now": 0, "peak": 0}
+
+    def slow_hash(password):
+        with lock:
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+        time.sleep(0.05)
+        with lock:
+            running["now"] -= 1
+        return password.upper()
+
+    async def ticker(ticks):
+        # Would only get to run between jobs if hashing blocked the loop
+        while True:
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    async def run():
+        ticks = []
+        tick_task = asyncio.create_task(ticker(ticks))
+        results = await asyncio.gather(*(service.run(slow_hash, f"password {i}") for i in range(5)))
+        tick_task.cancel()
+        return results, ticks
+
+    results, ticks = asyncio.run(run())
+    service.shutdown()
+
+    assert results == [f"PASSWORD {i}" for i in range(5)]
+    assert running["peak"] == 2
+    # The first two jobs start straight away, the other three wait for a worker
+    assert service.metrics() == {"kind": "thread", "max_workers": 2, "queued": 0, "peak_queued": 3,
+                                 "in_flight": 0, "completed": 5}
+    # Three rounds of 50 ms jobs; the loop kept ticking throughout
+    assert len(ticks) >= 10
+
+
+def test_unknown_pool_kind_is_rejected():
+    with pytest.raises(ValueError):
+        HashingService(max_workers=1, kind="fiber")
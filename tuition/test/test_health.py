@@ -0,0 +1,41 @@
+import asyncio
+
+import httpx
+import pytest
+
+from tuition.admin.models import Admin
+from tuition.main import app
+from tuition.security.oauth2 import Principal, get_current_principal
+from tuition.student.models import Student
+
+
+@pytest.fixture
+def signed_in():
+    """Answer requests as the Principal the test sets, instead of looking a token up."""
+    caller = {}
+    app.dependency_overrides[get_current_principal] = lambda: caller["principal"]
+    yield caller
+    app.dependency_overrides.pop(get_current_principal)
+
+
+async def get_db_health(headers=None):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get("/health/db", headers=headers)
+
+
+def test_db_health_needs_a_token():
+    response = asyncio.run(get_db_health())
+
+    assert response.status_code == 401
+
+
+def test_db_health_is_only_for_admins(signed_in):
+    signed_in["principal"] = Principal(role="student", user=Student(email="student@example.com"))
+    student = asyncio.run(get_db_health())
+    signed_in["principal"] = Principal(role="admin", user=Admin(email="admin@example.com"))
+    admin = asyncio.run(get_db_health())
+
+    assert student.status_code == 403
+    assert admin.status_code == 200
+    assert {"pool", "checkouts", "timeouts", "avg_wait_ms", "max_wait_ms"} <= admin.json().keys()
@@ -0,0 +1,144 @@
+import asyncio
+import json
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete, event, update
+from sqlalchemy.future import select
+
+from tuition.analytics import InstitutionPaymentStats, ProgramStats, get_institution_analytics, rebuild_summaries
+from tuition.institution.models import Category, Institution, Program, SubAccount, program_category_association
+from tuition.institution.utils import ProgramCatalogue
+from tuition.payments import PaymentEvent, PaymentReconciler, parse_charge_event
+from tuition.security.oauth2 import Principal
+from tuition.services import services
+from tuition.student import crud
+from tuition.student.models import Application, Student, Transaction
+from tuition.student.schemas import Application as ApplicationRequest, ApplicationBatch
+
+TABLES = [Student.__table__, Institution.__table__, SubAccount.__table__, Program.__table__, Category.__table__,
+          program_category_association, Application.__table__, Transaction.__table__, PaymentEvent.__table__,
+          ProgramStats.__table__, InstitutionPaymentStats.__table__]
+
+
+class FakeGateway:
+
+    def __init__(self):
+        self.requests = []
+
+    async def post(self, path, data, headers):
+        self.requests.append(data)
+        return {"status": "success", "message": "Hosted Link",
+                "data": {"link": f"https://checkout.example.com/{data['tx_ref']}"}}
+
+
+@pytest.fixture
+def analytics_session(sqlite_engine, session_factory):
+    async def setup():
+        async with sqlite_engine.begin() as conn:
+            await conn.run_sync(lambda sync_conn: [t.create(sync_conn) for t in TABLES])
+        async with session_factory(expire_on_commit=False) as db:
+            students = [Student(full_name=f"Student {i}", email=f"student{i}@example.com", phone_number="08012345678",
+                                hashed_password="x", field_of_interest="Engineering", is_verified=True)
+                        for i in range(3)]
+            institution = Institution(name_of_institution="Institution", type_of_institution="University",
+                                      email="inst@example.com", country="Nigeria", official_name="Institution",
+                                      brief_description="An institution", hashed_password="x", is_verified=True)
+            db.add_all([*students, institution])
+            await db.flush()
+            db.add(SubAccount(institution_id=institution.id, subaccount_id="RS_1", account_name="Institution",
+                              account_number="0123456789", country="NG", currency="NGN", bank_name="Bank"))
+            programs = [Program(name_of_program=name, program_level="Undergraduate", always_available=True,
+                                cost=1000, currency_code="NGN", image_url="https://example.com/p.png",
+                                institution_id=institution.id, subaccount_id="RS_1")
+                        for name in ("Computer Science", "Law", "Music")]
+            db.add_all(programs)
+            await db.commit()
+            return ([Principal(role="student", user=student) for student in students], institution.id,
+                    [program.id for program in programs])
+
+    principals, institution_id, program_ids = asyncio.run(setup())
+    gateway = FakeGateway()
+    with services.overridden(payment_gateway=gateway, program_catalogue=ProgramCatalogue(maxsize=10, ttl=60)):
+        yield session_factory, principals, institution_id, program_ids, gateway
+
+
+async def dashboard(session_factory, institution_id):
+    async with session_factory() as db:
+        analytics = await get_institution_analytics(db, institution_id)
+        return (
+            {program["name_of_program"]: program["applications"] for program in analytics["programs"]},
+            [(row.currency, row.pending_transactions, row.successful_transactions, Decimal(row.revenue))
+             for row in analytics["payments"]],
+        )
+
+
+def test_counters_follow_writes_and_match_a_rebuild(analytics_session):
+    session_factory, principals, institution_id, (computing, law, music), gateway = analytics_session
+    reconciler = PaymentReconciler(session_factory, batch_size=10, max_delay=0.01, queue_size=10)
+
+    async def run():
+        for principal in principals:
+            async with session_factory() as db:
+                await crud.apply_for_program(db, ApplicationRequest(program_id=computing), principal)
+        async with session_factory() as db:
+            await crud.apply_for_programs(db, ApplicationBatch(applications=[
+                ApplicationRequest(program_id=law), ApplicationRequest(program_id=computing)]), principals[0])
+        async with session_factory() as db:
+            with pytest.raises(HTTPException):
+                await crud.apply_for_program(db, ApplicationRequest(program_id=computing), principals[1])
+
+        async with session_factory() as db:
+            applications = dict((await db.execute(
+                select(Application.student_id, Application.id).where(Application.application_type_id == computing)
+            )).all())
+        for principal in principals:
+            async with session_factory() as db:
+                await crud.create_payment(db, applications[principal.user.id], principal, "key")
+
+        paid, declined, _ = [request["tx_ref"] for request in gateway.requests]
+        # Submitted one at a time, so the late success for the declined payment lands in its own batch
+        for tx_ref, outcome in ((paid, "successful"), (declined, "failed"), (paid, "successful"),
+                                (declined, "successful")):
+            event = {"event": "charge.completed", "data": {"id": 1, "tx_ref": tx_ref, "flw_ref": f"FLW-{tx_ref}",
+                                                           "amount": 1000, "currency": "NGN", "status": outcome}}
+            await reconciler.submit(parse_charge_event(json.dumps(event)))
+        await reconciler.close()
+
+        incremental = await dashboard(session_factory, institution_id)
+        async with session_factory() as db:
+            await rebuild_summaries(db)
+        rebuilt = await dashboard(session_factory, institution_id)
+        return incremental, rebuilt
+
+    incremental, rebuilt = asyncio.run(run())
+
+    assert incremental == rebuilt
+    assert incremental == (
+        {"Computer Science": 3, "Law": 1, "Music": 0},
+        [("NGN", 1, 2, Decimal(2000))],
+    )
+
+
+def test_rebuild_corrects_drift(analytics_session):
+    session_factory, (principal, *_), institution_id, (computing, law, music), gateway = analytics_session
+
+    async def run():
+        async with session_factory() as db:
+            await crud.apply_for_programs(db, ApplicationBatch(applications=[
+                ApplicationRequest(program_id=computing), ApplicationRequest(program_id=music)]), principal)
+        # Writes that bypass the app, e.g. a manual fix in SQL
+        async with session_factory() as db:
+            await db.execute(delete(Application).where(Application.application_type_id == music))
+            await db.execute(update(ProgramStats).where(ProgramStats.program_id == computing).values(applications=7))
+            await db.commit()
+        drifted = await dashboard(session_factory, institution_id)
+        async with session_factory() as db:
+            await rebuild_summaries(db)
+        return drifted, await dashboard(session_factory, institution_id)
+
+    drifted, rebuilt = asyncio.run(run())
+
+    assert drifted[0] == {"Computer Science": 7, "Law": 0, "Music": 1}
+    assert rebuilt == ({"Computer Science": 1, "Law": 0, "Music": 0}, [])
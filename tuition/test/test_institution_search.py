@@ -0,0 +1,69 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from tuition.institution.models import Institution
+from tuition.institution.utils import TrigramSupport
+from tuition.security.oauth2 import Principal
+from tuition.services import services
+from tuition.src_utils import search_institution
+from tuition.student.models import Student
+
+STUDENT = Principal(role="student", user=Student(email="student@example.com", is_verified=True))
+
+
+@pytest.fixture
+def search_session(sqlite_engine, session_factory):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    async def setup():
+        async with sqlite_engine.begin() as conn:
+            await conn.run_sync(Institution.__table__.create)
+        async with session_factory() as db:
+            # Oldest first, so newest-first ordering is distinguishable from relevance
+            rows = [
+                ("Lagos State University", "LASU", "Nigeria", "A state university"),
+                ("Eko Polytechnic", "Polytechnic of LAGOS", "Nigeria", "Technical courses"),
+                ("Yaba College", "Yaba College of Technology", "Nigeria", "A college in Lagos"),
+                ("Kwame Institute", "Kwame Institute", "Ghana", "Engineering"),
+            ]
+            db.add_all(Institution(name_of_institution=name, type_of_institution="University", official_name=official,
+                                   country=country, brief_description=description, website="https://example.com",
+                                   address="1 Road", email=f"inst{i}@example.com", hashed_password="x",
+                                   is_verified=True, created_at=start + timedelta(days=i))
+                       for i, (name, official, country, description) in enumerate(rows))
+            await db.commit()
+
+    asyncio.run(setup())
+    with services.overridden(trigram_support=TrigramSupport()):
+        yield session_factory
+
+
+def search(session_factory, name, page=1, limit=10):
+    async def run():
+        async with session_factory() as db:
+            return await search_institution(db, name, page, limit, STUDENT)
+    found = asyncio.run(run())
+    return found if isinstance(found, dict) else [inst.name_of_institution for inst in found]
+
+
+def test_sqlite_search_falls_back_to_ilike_with_name_matches_first(search_session):
+    # Matches the name, official name and description, case-insensitively
+    assert search(search_session, "lagos") == ["Lagos State University", "Yaba College", "Eko Polytechnic"]
+    assert search(search_session, "ghana") == ["Kwame Institute"]
+    assert search(search_session, "Harvard") == {"message": "No instances were found for the specified name."}
+    assert services.get("trigram_support").available is False
+
+
+def test_only_the_newest_matches_are_ranked(search_session):
+    settings = services.get("settings").model_copy(update={"SEARCH_RANK_CANDIDATES": 2})
+
+    with services.overridden(settings=settings):
+        first_page = search(search_session, "lagos", page=1, limit=1)
+        # A page past the candidate limit still ranks enough rows to be filled
+        third_page = search(search_session, "lagos", page=3, limit=1)
+
+    # The oldest match, though the only name match, is outside the two newest
+    assert first_page == ["Yaba College"]
+    assert third_page == ["Eko Polytechnic"]
@@ -0,0 +1,64 @@
+import logging
+
+import pytest
+
+from tuition.logger import HOT_LOGGER_NAME, LogPipeline, UDPSink
+
+
+@pytest.fixture
+def sink():
+    sink = UDPSink().start()
+    yield sink
+    sink.close()
+
+
+def isolated_logger(name):
+    log = logging.getLogger(name)
+    log.propagate = False
+    log.setLevel(logging.INFO)
+    return log
+
+
+def test_records_are_shipped_from_the_listener(sink):
+    log = isolated_logger("test.shipping")
+    pipeline = LogPipeline(sink.address, queue_size=100, info_sample_rate=1.0)
+    pipeline.start(log)
+    try:
+        log.info("lookup for %s", "student@example.com")
+        log.error("gateway down")
+        assert sink.wait_for(2)
+    finally:
+        pipeline.close()
+
+    assert "INFO test.shipping: lookup for student@example.com" in sink.messages[0]
+    assert "ERROR test.shipping: gateway down" in sink.messages[1]
+
+
+def test_full_queue_drops_instead_of_blocking(sink):
+    log = isolated_logger("test.overflow")
+    pipeline = LogPipeline(sink.address, queue_size=3, info_sample_rate=1.0)
+    log.addHandler(pipeline.handler)  # attached without a listener draining the queue
+    try:
+        for i in range(10):
+            log.info("record %d", i)
+    finally:
+        log.removeHandler(pipeline.handler)
+
+    assert pipeline.stats() == {"queued": 3, "dropped": 7, "sampled_out": 0}
+
+
+def test_hot_path_info_is_sampled(sink):
+    hot = isolated_logger(f"{HOT_LOGGER_NAME}.test")
+    pipeline = LogPipeline(sink.address, queue_size=100, info_sample_rate=0.0)
+    pipeline.start(hot)
+    try:
+        for _ in range(5):
+            hot.info("fetched institutions")
+        hot.warning("student not verified")
+        assert sink.wait_for(1)
+    finally:
+        pipeline.close()
+
+    assert len(sink.messages) == 1
+    assert "WARNING" in sink.messages[0]
+    assert pipeline.stats()["sampled_out"] == 5
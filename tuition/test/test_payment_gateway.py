@@ -0,0 +1,49 @@
+import asyncio
+
+import httpx
+import pytest
+
+from tuition.src_utils import PaymentGateway
+
+
+def gateway_answering(responses):
+    """A gateway whose client answers each request with the next of ``responses``, raising it if it's an error."""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        answer = responses[len(requests) - 1]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    gateway = PaymentGateway("https://flutterwave.test/v3", timeout=1, connect_timeout=1, max_connections=1,
+                             max_keepalive=1, max_retries=2, backoff=0)
+    gateway._client = httpx.AsyncClient(base_url=gateway.base_url, transport=httpx.MockTransport(handler))
+    return gateway, requests
+
+
+def test_requests_that_never_left_are_retried():
+    gateway, requests = gateway_answering([
+        httpx.ConnectError("connection refused"),
+        httpx.PoolTimeout("no free connection"),
+        httpx.Response(200, json={"status": "success", "data": {"link": "https://checkout.test/1"}}),
+    ])
+
+    response = asyncio.run(gateway.post("/payments", {"tx_ref": "FLW_1"}, {}))
+
+    assert response["data"]["link"] == "https://checkout.test/1"
+    assert len(requests) == 3
+
+
+@pytest.mark.parametrize("status_code", [500, 502, 503, 504])
+def test_server_errors_are_not_retried(status_code):
+    # The checkout may exist even though a proxy in front of Flutterwave answered with an error
+    gateway, requests = gateway_answering([
+        httpx.Response(status_code),
+        httpx.Response(200, json={"status": "success", "data": {"link": "https://checkout.test/2"}}),
+    ])
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(gateway.post("/payments", {"tx_ref": "FLW_2"}, {}))
+    assert len(requests) == 1
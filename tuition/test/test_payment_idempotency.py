@@ -0,0 +1,189 @@
+import asyncio
+import json
+import os
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.future import select
+from unittest.mock import patch
+
+from tuition.analytics import InstitutionPaymentStats
+from tuition.institution.models import Category, Institution, Program, SubAccount, program_category_association
+from tuition.institution.utils import ProgramCatalogue
+from tuition.payments import PaymentEvent, PaymentReconciler, parse_charge_event
+from tuition.security.oauth2 import Principal
+from tuition.services import services
+from tuition.src_utils import fetch_transaction_by_reference
+from tuition.student import crud
+from tuition.student.models import Application, Student, Transaction
+
+TABLES = [Student.__table__, Institution.__table__, SubAccount.__table__, Program.__table__, Category.__table__,
+          program_category_association, Application.__table__, Transaction.__table__, PaymentEvent.__table__,
+          InstitutionPaymentStats.__table__]
+
+
+class FakeGateway:
+    """Stands in for Flutterwave's /payments endpoint, handing out a link per tx_ref."""
+
+    def __init__(self):
+        self.requests = []
+
+    async def post(self, path, data, headers):
+        self.requests.append(data)
+        await asyncio.sleep(0)
+        return {"status": "success", "message": "Hosted Link",
+                "data": {"link": f"https://checkout.example.com/{data['tx_ref']}"}}
+
+
+@pytest.fixture
+def payment_session(sqlite_engine, session_factory):
+    async def setup():
+        async with sqlite_engine.begin() as conn:
+            await conn.run_sync(lambda sync_conn: [t.create(sync_conn) for t in TABLES])
+        async with session_factory(expire_on_commit=False) as db:
+            students = [Student(full_name=f"Student {i}", email=f"student{i}@example.com", phone_number="08012345678",
+                                hashed_password="x", field_of_interest="Engineering", is_verified=True)
+                        for i in range(2)]
+            institution = Institution(name_of_institution="Institution", type_of_institution="University",
+                                      email="inst@example.com", country="Nigeria", official_name="Institution",
+                                      brief_description="An institution", hashed_password="x", is_verified=True)
+            db.add_all([*students, institution])
+            await db.flush()
+            db.add(SubAccount(institution_id=institution.id, subaccount_id="RS_1", account_name="Institution",
+                              account_number="0123456789", country="NG", currency="NGN", bank_name="Bank"))
+            program = Program(name_of_program="Computer Science", program_level="Undergraduate", always_available=True,
+                              cost=1000, currency_code="NGN", image_url="https://example.com/p.png",
+                              institution_id=institution.id, subaccount_id="RS_1")
+            db.add(program)
+            await db.flush()
+            application = Application(student_id=students[0].id, application_type_id=program.id,
+                                      application_type="program")
+            db.add(application)
+            await db.commit()
+            return [Principal(role="student", user=student) for student in students], application.id
+
+    principals, application_id = asyncio.run(setup())
+    gateway = FakeGateway()
+    with services.overridden(payment_gateway=gateway, program_catalogue=ProgramCatalogue(maxsize=10, ttl=60)):
+        yield session_factory, principals, application_id, gateway
+
+
+async def pay(session_factory, application_id, principal, idempotency_key):
+    async with session_factory() as db:
+        return await crud.create_payment(db, application_id, principal, idempotency_key)
+
+
+async def transaction_count(session_factory):
+    async with session_factory() as db:
+        return (await db.execute(select(func.count()).select_from(Transaction))).scalar_one()
+
+
+def test_retries_with_the_same_key_get_the_same_pending_payment(payment_session):
+    session_factory, (principal, _), application_id, gateway = payment_session
+
+    async def run():
+        # A double tap racing itself, then a retry once the first response is lost
+        raced = await asyncio.gather(*(pay(session_factory, application_id, principal, "retry-key") for _ in range(3)))
+        retried = await pay(session_factory, application_id, principal, "retry-key")
+        other = await pay(session_factory, application_id, principal, "another-key")
+        return raced, retried, other, await transaction_count(session_factory)
+
+    raced, retried, other, count = asyncio.run(run())
+
+    links = {response["data"]["link"] for response in [*raced, retried]}
+    assert len(links) == 1
+    assert other["data"]["link"] not in links
+    assert count == 2
+    assert len({request["tx_ref"] for request in gateway.requests}) == 2
+
+
+def test_key_of_a_finished_payment_is_rejected_and_references_are_looked_up(payment_session):
+    session_factory, (principal, other_student), application_id, gateway = payment_session
+    reconciler = PaymentReconciler(session_factory, batch_size=10, max_delay=0.01, queue_size=10)
+
+    async def run():
+        await pay(session_factory, application_id, principal, "paid-key")
+        tx_ref = gateway.requests[0]["tx_ref"]
+        event = {"event": "charge.completed", "data": {"id": 1, "tx_ref": tx_ref, "flw_ref": "FLW-MOCK-1",
+                                                       "amount": 1000, "currency": "NGN", "status": "successful"}}
+        await reconciler.submit(parse_charge_event(json.dumps(event)))
+        await reconciler.close()
+
+        with pytest.raises(HTTPException) as retried:
+            await pay(session_factory, application_id, principal, "paid-key")
+        async with session_factory() as db:
+            by_tx_ref = await fetch_transaction_by_reference(db, tx_ref, principal)
+            by_flw_ref = await fetch_transaction_by_reference(db, "FLW-MOCK-1", principal)
+            with pytest.raises(HTTPException) as hidden:
+                await fetch_transaction_by_reference(db, "FLW-MOCK-1", other_student)
+        return retried.value, by_tx_ref, by_flw_ref, hidden.value
+
+    retried, by_tx_ref, by_flw_ref, hidden = asyncio.run(run())
+
+    assert retried.status_code == 409
+    assert by_tx_ref.id == by_flw_ref.id and by_flw_ref.status == "successful"
+    assert by_flw_ref.gateway_reference == "FLW-MOCK-1"
+    assert hidden.status_code == 404
+
+
+def test_payment_is_requested_in_the_program_currency(payment_session):
+    session_factory, (principal, _), application_id, gateway = payment_session
+
+    async def run():
+        async with session_factory() as db:
+            application = await db.get(Application, application_id)
+            (await db.get(Program, application.application_type_id)).currency_code = "USD"
+            await db.commit()
+        await pay(session_factory, application_id, principal, None)
+        async with session_factory() as db:
+            return (await db.execute(select(Transaction.currency))).scalar_one()
+
+    currency = asyncio.run(run())
+
+    assert currency == "USD"
+    assert gateway.requests[0]["currency"] == "USD"
+
+
+def test_key_reused_for_another_application_is_rejected(payment_session):
+    session_factory, (principal, _), application_id, gateway = payment_session
+
+    async def run():
+        async with session_factory(expire_on_commit=False) as db:
+            first = (await db.execute(select(Application).where(Application.id == application_id))).scalar_one()
+            program = Program(name_of_program="Law", program_level="Undergraduate", always_available=True,
+                              cost=2000, currency_code="NGN", image_url="https://example.com/l.png",
+                              institution_id=(await db.get(Program, first.application_type_id)).institution_id,
+                              subaccount_id="RS_1")
+            db.add(program)
+            await db.flush()
+            other = Application(student_id=first.student_id, application_type_id=program.id, application_type="program")
+            db.add(other)
+            await db.commit()
+
+        paid = await pay(session_factory, application_id, principal, "shared-key")
+        with pytest.raises(HTTPException) as reused:
+            await pay(session_factory, other.id, principal, "shared-key")
+        return paid, reused.value, await transaction_count(session_factory)
+
+    paid, reused, count = asyncio.run(run())
+
+    assert paid["data"]["link"].endswith(gateway.requests[0]["tx_ref"])
+    assert reused.status_code == 422
+    assert count == 1 and len(gateway.requests) == 1
+
+
+def test_conflict_without_a_key_is_not_swallowed(payment_session):
+    session_factory, (principal, _), application_id, gateway = payment_session
+
+    async def run():
+        # Both payments get the same tx_ref, which is unique
+        urandom = os.urandom
+        with patch("tuition.student.crud.os.urandom", side_effect=lambda n: bytes(n) if n == 8 else urandom(n)):
+            await pay(session_factory, application_id, principal, None)
+            with pytest.raises(IntegrityError):
+                await pay(session_factory, application_id, principal, None)
+        return await transaction_count(session_factory)
+
+    assert asyncio.run(run()) == 1
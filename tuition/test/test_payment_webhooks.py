@@ -0,0 +1,157 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from tuition.main import app
+from tuition.payments import PaymentEvent, PaymentReconciler, parse_charge_event
+from tuition.services import services
+from tuition.student.models import Student, Transaction
+
+SECRET_HASH = "test-secret-hash"
+TABLES = [Student.__table__, Transaction.__table__, PaymentEvent.__table__]
+
+
+class FakeFlutterwave:
+    """Sends webhooks the way Flutterwave does, with the dashboard secret in ``verif-hash``."""
+
+    def __init__(self, client, secret_hash=SECRET_HASH):
+        self.client = client
+        self.secret_hash = secret_hash
+        self.next_id = 1000
+
+    def charge_completed(self, tx_ref, status="successful", amount=100, currency="NGN"):
+        self.next_id += 1
+        return {
+            "event": "charge.completed",
+            "data": {"id": self.next_id, "tx_ref": tx_ref, "flw_ref": f"FLW-MOCK-{self.next_id}", "amount": amount,
+                     "currency": currency, "charged_amount": amount, "status": status},
+        }
+
+    async def deliver(self, event, secret_hash=None):
+        return await self.client.post("/webhooks/flutterwave", content=json.dumps(event),
+                                      headers={"verif-hash": secret_hash or self.secret_hash})
+
+
+@pytest.fixture
+def payments_session(sqlite_engine, session_factory):
+    async def setup():
+        async with sqlite_engine.begin() as conn:
+            await conn.run_sync(lambda sync_conn: [t.create(sync_conn) for t in TABLES])
+        async with session_factory() as db:
+            db.add_all([Transaction(title=f"Payment {tx_ref}", description="Tuition", transaction_type="program_payment",
+                                    amount=100, currency="NGN", tx_ref=tx_ref)
+                        for tx_ref in ("FLW_paid", "FLW_declined", "FLW_short", "FLW_retried")])
+            await db.commit()
+
+    asyncio.run(setup())
+    settings = services.get("settings").model_copy(update={"FLW_SECRET_HASH": SECRET_HASH})
+    with services.overridden(settings=settings):
+        yield session_factory
+
+
+async def statuses(session_factory):
+    async with session_factory() as db:
+        rows = (await db.execute(select(Transaction.tx_ref, Transaction.status))).all()
+        events = (await db.execute(select(func.count()).select_from(PaymentEvent))).scalar_one()
+    return dict(rows), events
+
+
+def test_webhook_settles_transaction_once_and_rejects_bad_signatures(payments_session):
+    reconciler = PaymentReconciler(payments_session, batch_size=50, max_delay=0.01, queue_size=100)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            gateway = FakeFlutterwave(client)
+            event = gateway.charge_completed("FLW_paid")
+            forged = await gateway.deliver(event, secret_hash="wrong")
+            first = await gateway.deliver(event)
+            redelivered = await gateway.deliver(event)
+            other = await gateway.deliver({"event": "transfer.completed", "data": {"id": 1}})
+        await reconciler.close()
+        return forged, first, redelivered, other
+
+    with services.overridden(payment_reconciler=reconciler):
+        forged, first, redelivered, other = asyncio.run(run())
+
+    assert forged.status_code == 401
+    assert first.json() == {"status": "processed"}
+    assert redelivered.json() == {"status": "duplicate"}
+    assert other.json() == {"status": "ignored"}
+    transactions, events = asyncio.run(statuses(payments_session))
+    assert transactions["FLW_paid"] == "successful"
+    assert events == 1
+
+
+def test_batch_settles_each_payment_by_its_final_outcome(payments_session):
+    reconciler = PaymentReconciler(payments_session, batch_size=50, max_delay=0.05, queue_size=100)
+    gateway = FakeFlutterwave(client=None)
+    events = [
+        gateway.charge_completed("FLW_paid"),
+        gateway.charge_completed("FLW_declined", status="failed"),
+        gateway.charge_completed("FLW_short", amount=40),
+        gateway.charge_completed("FLW_retried", status="failed"),
+        gateway.charge_completed("FLW_retried"),
+        gateway.charge_completed("FLW_paid", status="failed"),
+        gateway.charge_completed("FLW_unknown"),
+    ]
+
+    async def run():
+        results = await asyncio.gather(*(reconciler.submit(parse_charge_event(json.dumps(event))) for event in events))
+        # A failure reported after the payment succeeded doesn't undo it
+        late = await reconciler.submit(parse_charge_event(json.dumps(gateway.charge_completed("FLW_retried", status="failed"))))
+        await reconciler.close()
+        return results, late
+
+    results, late = asyncio.run(run())
+
+    transactions, stored = asyncio.run(statuses(payments_session))
+    assert transactions == {"FLW_paid": "successful", "FLW_declined": "failed", "FLW_short": "mismatched",
+                            "FLW_retried": "successful"}
+    assert all(results) and stored == 5
+    assert late is False
+
+
+def test_charge_in_another_currency_is_marked_mismatched_and_logged(payments_session, caplog):
+    reconciler = PaymentReconciler(payments_session, batch_size=50, max_delay=0.01, queue_size=100)
+    gateway = FakeFlutterwave(client=None)
+
+    async def run():
+        await reconciler.submit(parse_charge_event(json.dumps(gateway.charge_completed("FLW_paid", currency="USD"))))
+        await reconciler.close()
+
+    asyncio.run(run())
+
+    transactions, _ = asyncio.run(statuses(payments_session))
+    assert transactions["FLW_paid"] == "mismatched"
+    [warning] = [record.getMessage() for record in caplog.records if record.levelname == "WARNING"]
+    assert "FLW_paid" in warning and "NGN" in warning and "100 USD" in warning
+
+
+def test_success_after_a_failure_in_an_earlier_batch_settles_the_payment(payments_session):
+    reconciler = PaymentReconciler(payments_session, batch_size=50, max_delay=0.01, queue_size=100)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            gateway = FakeFlutterwave(client)
+            # Each delivery waits for its batch, so the two outcomes are settled separately
+            failed = await gateway.deliver(gateway.charge_completed("FLW_declined", status="failed"))
+            after_failure = await statuses(payments_session)
+            paid = await gateway.deliver(gateway.charge_completed("FLW_declined"))
+        await reconciler.close()
+        async with payments_session() as db:
+            event = (await db.execute(select(PaymentEvent.status).where(PaymentEvent.tx_ref == "FLW_declined"))).scalar_one()
+        return failed, after_failure, paid, event
+
+    with services.overridden(payment_reconciler=reconciler):
+        failed, (after_failure, _), paid, event = asyncio.run(run())
+
+    transactions, _ = asyncio.run(statuses(payments_session))
+    assert failed.json() == paid.json() == {"status": "processed"}
+    assert after_failure["FLW_declined"] == "failed"
+    assert transactions["FLW_declined"] == event == "successful"
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from tuition.main import app
+from tuition.database import get_db
+from tuition.security.jwt import create_access_token
+from tuition.student.models import Student, Transaction
+from tuition.institution.models import Institution
+from tuition.admin.models import Admin
+
+TABLES = [Student.__table__, Institution.__table__, Admin.__table__, Transaction.__table__]
+
+
+@pytest.fixture
+def sqlite_session(sqlite_engine, session_factory):
+    async def setup():
+        async with sqlite_engine.begin() as conn:
+            await conn.run_sync(lambda sync_conn: [t.create(sync_conn) for t in TABLES])
+        async with session_factory() as db:
+            db.add(Student(full_name="Test Student", email="student@example.com", phone_number="08012345678",
+                           hashed_password="x", field_of_interest="Engineering", is_verified=True))
+            for i in range(3):
+                db.add(Institution(name_of_institution=f"Institution {i}", type_of_institution="University",
+                                   website="https://example.com", address="1 Example Road", email=f"inst{i}@example.com",
+                                   country="Nigeria", official_name=f"Institution {i}", brief_description="An institution",
+                                   hashed_password="x", is_verified=True))
+            await db.commit()
+
+    asyncio.run(setup())
+
+    async def override_get_db():
+        async with session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield sqlite_engine
+    app.dependency_overrides.pop(get_db, None)
+
+
+def count_statements(engine, request):
+    statements = []
+
+    def on_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", on_execute)
+    try:
+        response = request()
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", on_execute)
+    return response, statements
+
+
+def auth_headers(email):
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': email})}"}
+
+
+def test_fetch_institutions_loads_principal_once(sqlite_session):
+    client = TestClient(app)
+    response, statements = count_statements(
+        sqlite_session,
+        lambda: client.get("/student/institions/1/10", headers=auth_headers("student@example.com")),
+    )
+
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+    # One principal lookup plus the listing itself, down from separate
+    # student and admin lookups before the listing.
+    assert len(statements) == 2
+
+
+def test_fetch_transactions_loads_principal_once(sqlite_session):
+    client = TestClient(app)
+    response, statements = count_statements(
+        sqlite_session,
+        lambda: client.post("/student/transactions/", headers=auth_headers("student@example.com")),
+    )
+
+    assert response.status_code == 200
+    assert response.json() == []
+    assert len(statements) == 2
+
+
+def test_unknown_principal_is_rejected(sqlite_session):
+    client = TestClient(app)
+    response = client.get("/student/institions/1/10", headers=auth_headers("nobody@example.com"))
+
+    assert response.status_code == 401
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event
+
+from tuition.institution.models import Category, Institution, Program, SubAccount, program_category_association
+from tuition.institution.utils import ProgramCatalogue
+from tuition.services import services
+from tuition.src_utils import get_program_by_id
+
+TABLES = [Institution.__table__, SubAccount.__table__, Program.__table__, Category.__table__, program_category_association]
+
+
+@pytest.fixture
+def catalogue_session(sqlite_engine, session_factory):
+    async def setup():
+        async with sqlite_engine.begin() as conn:
+            await conn.run_sync(lambda sync_conn: [t.create(sync_conn) for t in TABLES])
+        async with session_factory() as db:
+            institution = Institution(name_of_institution="Institution", type_of_institution="University",
+                                      email="inst@example.com", country="Nigeria", official_name="Institution",
+                                      brief_description="An institution", hashed_password="x", is_verified=True)
+            db.add(institution)
+            await db.flush()
+            db.add(SubAccount(institution_id=institution.id, subaccount_id="RS_1", account_name="Institution",
+                              account_number="0123456789", country="NG", currency="NGN", bank_name="Bank"))
+            db.add(Program(name_of_program="Computer Science", program_level="Undergraduate", always_available=True,
+                           cost=1000, currency_code="NGN", image_url="https://example.com/p.png",
+                           institution_id=institution.id, subaccount_id="RS_1",
+                           categories=[Category(name="Engineering"), Category(name="Technology")]))
+            await db.commit()
+
+    asyncio.run(setup())
+    with services.overridden(program_catalogue=ProgramCatalogue(maxsize=10, ttl=60)):
+        yield sqlite_engine, session_factory
+
+
+def count_statements(engine):
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_program_is_loaded_with_relations_once_and_served_from_cache(catalogue_session):
+    engine, session_factory = catalogue_session
+    catalogue = services.get("program_catalogue")
+    statements = count_statements(engine)
+
+    async def run():
+        async with session_factory() as db:
+            program_id = (await db.execute(Program.__table__.select())).first().id
+            statements.clear()
+            first = await catalogue.get(db, program_id)
+            loaded = len(statements)
+            second = await catalogue.get(db, program_id)
+            program_json = await get_program_by_id(db, program_id)
+        return first, second, loaded, program_json
+
+    first, second, loaded, program_json = asyncio.run(run())
+
+    assert loaded == 2  # program joined to its subaccount, then the categories
+    assert len(statements) == 2
+    assert second is first
+    assert first.subaccount.subaccount_id == "RS_1"
+    assert first.categories == ("Engineering", "Technology")
+    assert program_json["program_name"] == "Computer Science"
+    assert catalogue.stats()["hits"] == 2
+
+
+def test_invalidated_and_expired_programs_are_reloaded(catalogue_session):
+    engine, session_factory = catalogue_session
+    catalogue = services.get("program_catalogue")
+
+    async def run():
+        async with session_factory() as db:
+            program_id = (await db.execute(Program.__table__.select())).first().id
+            first = await catalogue.get(db, program_id)
+            catalogue.invalidate(program_id)
+            second = await catalogue.get(db, program_id)
+            catalogue.ttl = 0
+            catalogue.invalidate(program_id)
+            await catalogue.get(db, program_id)
+            third = await catalogue.get(db, program_id)
+            return first, second, third
+
+    first, second, third = asyncio.run(run())
+
+    assert second is not first and second == first
+    assert third is not second
+    assert catalogue.stats()["misses"] == 4
+
+
+def test_each_program_gets_the_subaccount_it_pays_into(catalogue_session):
+    engine, session_factory = catalogue_session
+    catalogue = services.get("program_catalogue")
+
+    async def run():
+        async with session_factory() as db:
+            institution_id = (await db.execute(Institution.__table__.select())).first().id
+            db.add(SubAccount(institution_id=institution_id, subaccount_id="RS_2", account_name="Institution Law School",
+                              account_number="9876543210", country="NG", currency="NGN", bank_name="Bank"))
+            db.add(Program(name_of_program="Law", program_level="Undergraduate", always_available=True, cost=2000,
+                           currency_code="NGN", image_url="https://example.com/l.png", institution_id=institution_id,
+                           subaccount_id="RS_2"))
+            await db.commit()
+            programs = (await db.execute(Program.__table__.select())).all()
+            return {program.name_of_program: (await catalogue.get(db, program.id)).subaccount.subaccount_id
+                    for program in programs}
+
+    assert asyncio.run(run()) == {"Computer Science": "RS_1", "Law": "RS_2"}
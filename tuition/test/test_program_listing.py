@@ -0,0 +1,94 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from tuition.institution.models import Category, Institution, Program, program_category_association
+from tuition.security.oauth2 import Principal
+from tuition.src_utils import fetch_programs_page
+from tuition.student.models import Student
+
+TABLES = [Student.__table__, Institution.__table__, Program.__table__, Category.__table__, program_category_association]
+
+
+@pytest.fixture
+def program_session(sqlite_engine, session_factory):
+    session_factory.configure(expire_on_commit=False)
+
+    async def setup():
+        async with sqlite_engine.begin() as conn:
+            await conn.run_sync(lambda sync_conn: [t.create(sync_conn) for t in TABLES])
+        async with session_factory() as db:
+            student = Student(full_name="Test Student", email="student@example.com", phone_number="08012345678",
+                              hashed_password="x", field_of_interest="Engineering", is_verified=True)
+            engineering = Category(name="Engineering")
+            soon = datetime.now(timezone.utc) + timedelta(days=1)
+
+            def program(name, level="Undergraduate", days=None, is_free=False, categories=()):
+                return Program(name_of_program=name, program_level=level,
+                               application_deadline=soon + timedelta(days=days) if days is not None else None,
+                               always_available=days is None, is_free=is_free, cost=None if is_free else 100,
+                               currency_code="NGN", image_url="https://example.com/p.png", categories=list(categories))
+
+            db.add_all([
+                student,
+                program("Civil", days=0, categories=[engineering]),
+                program("History", days=0),
+                program("Law", days=3, is_free=True),
+                program("Mechanical", categories=[engineering]),
+                program("Music", is_free=True),
+                program("Physics", days=1),
+                program("MBA", level="Graduate", days=0),
+            ])
+            await db.commit()
+        return Principal(role="student", user=student)
+
+    principal = asyncio.run(setup())
+    yield session_factory, principal
+
+
+async def list_all(session_factory, principal, limit, **filters):
+    pages, cursor = [], None
+    while True:
+        async with session_factory() as db:
+            page = await fetch_programs_page(db, "Undergraduate", cursor, limit, principal, **filters)
+        pages.append([program.name_of_program for program in page["programs"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_pages_run_by_deadline_with_always_available_programs_last(program_session):
+    session_factory, principal = program_session
+
+    pages = asyncio.run(list_all(session_factory, principal, limit=2))
+    names = [name for page in pages for name in page]
+
+    assert [len(page) for page in pages] == [2, 2, 2]
+    assert sorted(names[:2]) == ["Civil", "History"]
+    assert names[2:4] == ["Physics", "Law"]
+    assert sorted(names[4:]) == ["Mechanical", "Music"]
+
+
+def test_filters_by_category_price_and_deadline(program_session):
+    session_factory, principal = program_session
+
+    engineering = asyncio.run(list_all(session_factory, principal, limit=10, category="Engineering"))
+    free = asyncio.run(list_all(session_factory, principal, limit=10, is_free=True))
+    closing = asyncio.run(list_all(session_factory, principal, limit=1,
+                                   deadline_before=datetime.now(timezone.utc) + timedelta(days=3)))
+
+    assert engineering == [["Civil", "Mechanical"]]
+    assert free == [["Law", "Music"]]
+    assert sorted(name for page in closing for name in page) == ["Civil", "History", "Physics"]
+
+
+def test_categories_are_returned_by_name(program_session):
+    session_factory, principal = program_session
+
+    async def run():
+        async with session_factory() as db:
+            return await fetch_programs_page(db, "Undergraduate", None, 10, principal, category="Engineering")
+
+    page = asyncio.run(run())
+    assert [program.categories for program in page["programs"]] == [["Engineering"], ["Engineering"]]
@@ -0,0 +1,163 @@
+"""Fails if a hot query stops using an index.
+
+Runs EXPLAIN against Postgres with sequential scans disabled, so the planner
+only falls back to one when no index can serve the query. Walking a whole
+index, without a condition on its leading column, counts as a sequential scan
+too. Set
+``TEST_POSTGRES_URL`` (an asyncpg URL) to run it; it builds the tables in a
+scratch schema and drops them afterwards.
+"""
+import asyncio
+import os
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy import literal_column, or_, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload
+
+from tuition.admin.models import Admin
+from tuition.analytics import InstitutionPaymentStats, ProgramStats
+from tuition.database import Base
+from tuition.email_outbox import EmailOutbox
+from tuition.exports import TRANSACTION_EXPORT_COLUMNS
+from tuition.institution.models import Category, Event, EventRegistration, Institution, Program, SubAccount, program_category_association
+from tuition.payments import PaymentEvent
+from tuition.src_utils import encode_cursor, paginate_by_cursor, paginate_by_deadline
+from tuition.student.models import Application, Student, Transaction
+
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+SCHEMA = "query_plans"
+
+pytestmark = pytest.mark.skipif(not TEST_POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+
+STUDENT_ID, INSTITUTION_ID, PROGRAM_ID = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+
+HOT_QUERIES = {
+    "student transactions page": paginate_by_cursor(
+        select(Transaction).where(Transaction.student_id == STUDENT_ID),
+        Transaction.transaction_date, Transaction.id, encode_cursor(datetime(2024, 6, 1), uuid.uuid4()), 20,
+    ),
+    "institution transactions export": (
+        select(*TRANSACTION_EXPORT_COLUMNS)
+        .where(Transaction.institution_id == INSTITUTION_ID)
+        .order_by(Transaction.transaction_date, Transaction.id)
+    ),
+    "applied programs": select(Application.application_type_id).where(
+        Application.student_id == STUDENT_ID, Application.application_type_id.in_([PROGRAM_ID, uuid.uuid4()])
+    ),
+    "program applications": select(Application).where(Application.application_type_id == PROGRAM_ID),
+    "program catalogue": (
+        select(Program, SubAccount)
+        .outerjoin(SubAccount, SubAccount.subaccount_id == Program.subaccount_id)
+        .where(Program.id == PROGRAM_ID)
+    ),
+    "program categories": (
+        select(Category.name)
+        .join(program_category_association, program_category_association.c.category_id == Category.id)
+        .where(program_category_association.c.program_id.in_([PROGRAM_ID]))
+    ),
+    "institution programs": select(Program).where(Program.institution_id == INSTITUTION_ID),
+    "programs by level": paginate_by_deadline(
+        select(Program).where(
+            Program.program_level == "Undergraduate",
+            or_(Program.always_available.is_(True), Program.application_deadline > datetime(2024, 6, 1)),
+        ),
+        encode_cursor(datetime(2024, 9, 1), uuid.uuid4()), 20,
+    ),
+    "institution subaccount": select(SubAccount).where(SubAccount.institution_id == INSTITUTION_ID),
+    "institution events": select(Event).where(Event.institution_id == INSTITUTION_ID),
+    "upcoming events page": paginate_by_cursor(
+        select(Event).where(Event.end_date > datetime(2024, 6, 1)),
+        Event.start_date, Event.id, encode_cursor(datetime(2024, 6, 1), uuid.uuid4()), 20, descending=False,
+    ),
+    "event registration": select(EventRegistration.id).where(
+        EventRegistration.event_id == uuid.uuid4(), EventRegistration.student_id == STUDENT_ID
+    ),
+    "student by email": select(Student).where(Student.email == "student@example.com"),
+    "transaction by reference": select(Transaction).where(
+        or_(Transaction.tx_ref == "FLW_ref", Transaction.gateway_reference == "FLW_ref")
+    ),
+    "transaction by idempotency key": select(Transaction).where(
+        Transaction.student_id == STUDENT_ID, Transaction.idempotency_key == "retry-key"
+    ),
+    "payment event by tx_ref": select(PaymentEvent).where(PaymentEvent.tx_ref == "FLW_ref"),
+    "email outbox claim": (
+        select(EmailOutbox)
+        .where(EmailOutbox.status == literal_column("'pending'"), EmailOutbox.next_attempt_at <= datetime(2024, 6, 1))
+        .order_by(EmailOutbox.next_attempt_at)
+        .limit(200)
+        .with_for_update(skip_locked=True)
+    ),
+    "institution program analytics": (
+        select(Program.id, Program.name_of_program, ProgramStats.applications)
+        .outerjoin(ProgramStats, ProgramStats.program_id == Program.id)
+        .where(Program.institution_id == INSTITUTION_ID)
+    ),
+    "institution payment analytics": select(InstitutionPaymentStats).where(
+        InstitutionPaymentStats.institution_id == INSTITUTION_ID
+    ),
+}
+
+TABLES = [Student.__table__, Institution.__table__, Admin.__table__, SubAccount.__table__, Program.__table__,
+          Category.__table__, program_category_association, Event.__table__, Transaction.__table__,
+          Application.__table__, EmailOutbox.__table__, PaymentEvent.__table__, EventRegistration.__table__,
+          ProgramStats.__table__, InstitutionPaymentStats.__table__]
+
+
+@pytest.fixture(scope="module")
+def plans():
+    async def explain_all():
+        admin = create_async_engine(TEST_POSTGRES_URL)
+        async with admin.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+
+        engine = create_async_engine(TEST_POSTGRES_URL, connect_args={"server_settings": {"search_path": SCHEMA}})
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(lambda sync_conn: Base.metadata.create_all(sync_conn, tables=TABLES))
+                await conn.execute(text("SET LOCAL enable_seqscan = off"))
+                leading_columns = dict((await conn.execute(text(f"""
+                    SELECT index_class.relname, attribute.attname
+                    FROM pg_index
+                    JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid
+                    JOIN pg_namespace ON pg_namespace.oid = index_class.relnamespace
+                    JOIN pg_attribute attribute ON attribute.attrelid = pg_index.indrelid
+                                               AND attribute.attnum = pg_index.indkey[0]
+                    WHERE pg_namespace.nspname = '{SCHEMA}'
+                """))).all())
+                results = {}
+                for name, stmt in HOT_QUERIES.items():
+                    sql = stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+                    plan = (await conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))).scalar_one()
+                    results[name] = plan[0]["Plan"]
+                return results, leading_columns
+        finally:
+            await engine.dispose()
+            async with admin.begin() as conn:
+                await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            await admin.dispose()
+
+    return asyncio.run(explain_all())
+
+
+def full_scans(node, leading_columns):
+    """Yield the scans in a plan that read a whole table or a whole index."""
+    node_type = node["Node Type"]
+    if node_type == "Seq Scan":
+        yield f"Seq Scan on {node['Relation Name']}"
+    elif node_type in ("Index Scan", "Index Only Scan", "Bitmap Index Scan"):
+        leading_column = leading_columns[node["Index Name"]]
+        if leading_column not in node.get("Index Cond", ""):
+            yield f"{node_type} over all of {node['Index Name']}"
+    for child in node.get("Plans", []):
+        yield from full_scans(child, leading_columns)
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_hot_query_uses_an_index(plans, name):
+    results, leading_columns = plans
+    assert list(full_scans(results[name], leading_columns)) == []
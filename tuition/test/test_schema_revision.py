@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+
+from tuition import database
+from tuition.services import services
+
+
+def test_migration_heads_match_alembic():
+    script = ScriptDirectory(str(database.MIGRATIONS_DIR.parent))
+    assert database.migration_heads() == set(script.get_heads())
+
+
+@pytest.fixture
+def versioned_engine(sqlite_engine):
+    async def stamp(revision):
+        async with sqlite_engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE IF NOT EXISTS alembic_version (version_num VARCHAR(32))"))
+            await conn.execute(text("DELETE FROM alembic_version"))
+            await conn.execute(text("INSERT INTO alembic_version VALUES (:rev)"), {"rev": revision})
+
+    with services.overridden(engine=sqlite_engine):
+        yield stamp
+
+
+def test_check_schema_revision(versioned_engine):
+    head = next(iter(database.migration_heads()))
+
+    asyncio.run(versioned_engine(head))
+    assert asyncio.run(database.check_schema_revision()) == {head}
+
+    asyncio.run(versioned_engine("a0f70cce2993"))
+    with pytest.raises(RuntimeError, match="alembic upgrade head"):
+        asyncio.run(database.check_schema_revision())
+
+
+def test_check_schema_revision_unmigrated(sqlite_engine):
+    with services.overridden(engine=sqlite_engine), pytest.raises(RuntimeError, match="alembic_version"):
+        asyncio.run(database.check_schema_revision())
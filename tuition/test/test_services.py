@@ -0,0 +1,38 @@
+import asyncio
+
+from tuition.services import ServiceRegistry
+
+
+class FakeClient:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+def test_services_are_built_once_on_first_use():
+    registry = ServiceRegistry()
+    built = []
+    registry.register("client", lambda: built.append(1) or FakeClient())
+
+    assert built == []
+    assert registry.get("client") is registry.get("client")
+    assert built == [1]
+
+
+def test_overrides_are_restored_and_never_closed():
+    registry = ServiceRegistry()
+    registry.register("client", FakeClient, close=lambda client: client.close())
+    real = registry.get("client")
+    fake = FakeClient()
+
+    with registry.overridden(client=fake):
+        assert registry.get("client") is fake
+        asyncio.run(registry.close())
+        assert registry.get("client") is fake
+        assert not fake.closed
+
+    assert registry.get("client") is real
+    asyncio.run(registry.close())
+    assert real.closed
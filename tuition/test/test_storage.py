@@ -0,0 +1,159 @@
+import asyncio
+import io
+
+import httpx
+import pytest
+from fastapi import HTTPException, UploadFile
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.future import select
+
+from tuition.institution import crud
+from tuition.institution.models import Category, Institution, Program, SubAccount, program_category_association
+from tuition.institution.utils import CategoryCache
+from tuition.security.oauth2 import Principal
+from tuition.services import services
+from tuition.storage import LocalStorage, SupabaseStorage, read_chunks
+
+TABLES = [Institution.__table__, SubAccount.__table__, Program.__table__, Category.__table__, program_category_association]
+
+
+def image(content, size=None):
+    return UploadFile(file=io.BytesIO(content), filename="logo.png", size=size)
+
+
+async def collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+def test_read_chunks_streams_the_upload_in_pieces():
+    chunks = asyncio.run(collect(read_chunks(image(b"abcdefghij"), chunk_size=4, max_bytes=10)))
+
+    assert chunks == [b"abcd", b"efgh", b"ij"]
+
+
+def test_read_chunks_rejects_oversized_uploads():
+    upload = image(b"x" * 20, size=20)
+    with pytest.raises(HTTPException) as declared:
+        asyncio.run(collect(read_chunks(upload, chunk_size=4, max_bytes=10)))
+    # A declared size over the limit is rejected before the body is read
+    assert upload.file.tell() == 0
+
+    undeclared = []
+
+    async def read_undeclared():
+        async for chunk in read_chunks(image(b"x" * 20), chunk_size=4, max_bytes=10):
+            undeclared.append(chunk)
+
+    with pytest.raises(HTTPException) as streamed:
+        asyncio.run(read_undeclared())
+
+    assert declared.value.status_code == streamed.value.status_code == 413
+    assert len(undeclared) == 2
+
+
+def test_local_storage_saves_deletes_and_drops_partial_files(tmp_path):
+    storage = LocalStorage(str(tmp_path / "media"), "/media")
+
+    async def run():
+        url = await storage.save("logo", read_chunks(image(b"png bytes"), 4, 100), "image/png")
+        saved = (tmp_path / "media" / "logo").read_bytes()
+        await storage.delete("logo")
+        await storage.delete("logo")
+        with pytest.raises(HTTPException):
+            await storage.save("too_big", read_chunks(image(b"x" * 20), 4, 10), "image/png")
+        return url, saved
+
+    url, saved = asyncio.run(run())
+
+    assert url == "/media/logo"
+    assert saved == b"png bytes"
+    assert list((tmp_path / "media").iterdir()) == []
+
+
+def test_supabase_storage_streams_to_the_bucket_and_deletes():
+    requests = []
+
+    def handler(request):
+        requests.append((request.method, request.url.path, request.read()))
+        if request.url.path.endswith("/rejected"):
+            return httpx.Response(400, json={"error": "Duplicate"})
+        return httpx.Response(200, json={})
+
+    storage = SupabaseStorage("https://project.supabase.test", "key", "bucket", timeout=5)
+    storage._client = httpx.AsyncClient(base_url=storage.url, transport=httpx.MockTransport(handler))
+
+    async def run():
+        url = await storage.save("logo", read_chunks(image(b"png bytes"), 4, 100), "image/png")
+        rejected = await storage.save("rejected", read_chunks(image(b"png"), 4, 100), "image/png")
+        await storage.delete("logo")
+        await storage.close()
+        return url, rejected
+
+    url, rejected = asyncio.run(run())
+
+    assert url == "https://project.supabase.test/storage/v1/object/public/bucket/logo"
+    assert rejected is None
+    assert requests == [
+        ("POST", "/storage/v1/object/bucket/logo", b"png bytes"),
+        ("POST", "/storage/v1/object/bucket/rejected", b"png"),
+        ("DELETE", "/storage/v1/object/bucket/logo", b""),
+    ]
+
+
+@pytest.fixture
+def program_session(tmp_path, sqlite_engine, session_factory):
+    session_factory.configure(expire_on_commit=False)
+
+    async def setup():
+        async with sqlite_engine.begin() as conn:
+            await conn.run_sync(lambda sync_conn: [t.create(sync_conn) for t in TABLES])
+        async with session_factory() as db:
+            institutions = [Institution(name_of_institution=name, type_of_institution="University",
+                                        email=f"{name.lower()}@example.com", country="Nigeria", official_name=name,
+                                        brief_description="An institution", hashed_password="x", is_verified=True)
+                            for name in ("Banked", "Unbanked")]
+            db.add_all(institutions)
+            await db.flush()
+            db.add(SubAccount(institution_id=institutions[0].id, subaccount_id="RS_1", account_name="Banked",
+                              account_number="0123456789", country="NG", currency="NGN", bank_name="Bank"))
+            await db.commit()
+            return [Principal(role="institution", user=institution) for institution in institutions]
+
+    principals = asyncio.run(setup())
+    media = tmp_path / "media"
+    with services.overridden(storage=LocalStorage(str(media), "/media"), category_cache=CategoryCache()):
+        yield session_factory, principals, media
+
+
+def program_payload(**overrides):
+    return {"name_of_program": "Computer Science", "program_level": "Undergraduate", "categories": [],
+            "always_available": True, "is_free": False, "currency_code": "NGN", "description": "Computing",
+            "application_deadline": None, "cost": 1000, **overrides}
+
+
+def test_program_image_is_kept_only_when_the_program_is_created(program_session):
+    session_factory, (banked, unbanked), media = program_session
+
+    async def create(payload, principal):
+        async with session_factory() as db:
+            return await crud.create_program(db, payload, image(b"png bytes"), principal)
+
+    async def run():
+        with pytest.raises(HTTPException) as unbanked_error:
+            await create(program_payload(), unbanked)
+        after_rejection = list(media.iterdir()) if media.exists() else []
+        # Fails once the image is stored, when the program row is written
+        with pytest.raises(IntegrityError):
+            await create(program_payload(currency_code=None), banked)
+        after_failure = list(media.iterdir())
+        created = await create(program_payload(), banked)
+        async with session_factory() as db:
+            programs = (await db.execute(select(Program.image_url))).scalars().all()
+        return unbanked_error.value, after_rejection, after_failure, created, programs
+
+    unbanked_error, after_rejection, after_failure, created, programs = asyncio.run(run())
+
+    assert unbanked_error.status_code == 404
+    assert after_rejection == [] and after_failure == []
+    assert programs == [created["image_url"]]
+    assert [f"/media/{path.name}" for path in media.iterdir()] == programs
@@ -112,14 +112,13 @@ async def test_reset_password_called_once(fake_db_dependency, test_client):
     # Mock the DB response
     fake_db_dependency.scalar_one_or_none.return_value = mock_student
 
-    # Mock background task and SMTP service
+    # Mock the SMTP service
     smtp_service_mock = AsyncMock()
-    background_task_mock = AsyncMock()
 
     with patch("tuition.student_utils.get_student_by_email", return_value=mock_student):
         with patch("tuition.emails_utils.SmtpMailService.send_password_reset_email", smtp_service_mock):
             # Call the reset_password function
-            response = await reset_password(fake_db_dependency, mock_student.email, background_task_mock)
+            response = await reset_password(fake_db_dependency, mock_student.email)
 
             # Ensure the email service was called once
             smtp_service_mock.assert_called_once_with(user="student")
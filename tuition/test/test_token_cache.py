@@ -0,0 +1,60 @@
+import pytest
+from fastapi import HTTPException
+
+from tuition.security import jwt as security_jwt
+from tuition.security.jwt import TokenCache, create_access_token, verify_token
+from tuition.services import services
+from tuition.src_utils import TokenData
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {"time": 1_000_000.0}
+    monkeypatch.setattr(security_jwt.time, "time", lambda: now["time"])
+    return now
+
+
+def test_entries_expire_after_the_ttl_or_the_token_exp(clock):
+    cache = TokenCache(maxsize=10, ttl=60)
+    cache.set("long-lived", TokenData(email="a@example.com"))
+    cache.set("expiring", TokenData(email="b@example.com"), exp=clock["time"] + 10)
+
+    fresh = cache.get("long-lived"), cache.get("expiring")
+    clock["time"] += 10
+    after_exp = cache.get("long-lived"), cache.get("expiring")
+    clock["time"] += 50
+    after_ttl = cache.get("long-lived")
+
+    assert [data.email for data in fresh] == ["a@example.com", "b@example.com"]
+    assert after_exp[0].email == "a@example.com" and after_exp[1] is None
+    assert after_ttl is None
+    assert cache.stats() == {"size": 0, "maxsize": 10, "hits": 3, "misses": 2, "evictions": 0}
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = TokenCache(maxsize=2, ttl=60)
+    cache.set("first", TokenData(email="first@example.com"))
+    cache.set("second", TokenData(email="second@example.com"))
+    cache.get("first")
+    cache.set("third", TokenData(email="third@example.com"))
+
+    assert cache.get("second") is None
+    assert cache.get("first").email == "first@example.com"
+    assert cache.get("third").email == "third@example.com"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_verified_tokens_are_served_from_the_cache():
+    cache = TokenCache(maxsize=10, ttl=60)
+    token = create_access_token({"sub": "student@example.com"})
+    credentials_exception = HTTPException(status_code=401)
+
+    with services.overridden(token_cache=cache):
+        first = verify_token(token, credentials_exception)
+        second = verify_token(token, credentials_exception)
+        with pytest.raises(HTTPException):
+            verify_token("not-a-token", credentials_exception)
+
+    assert second is first
+    assert first.email == "student@example.com"
+    assert cache.stats()["hits"] == 1 and cache.stats()["size"] == 1
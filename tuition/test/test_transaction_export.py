@@ -0,0 +1,88 @@
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+
+from tuition.main import app
+from tuition.database import get_db
+from tuition.security.jwt import create_access_token
+from tuition.services import services
+from tuition.admin.models import Admin
+from tuition.institution.models import Institution
+from tuition.student.models import Student, Transaction
+
+START = datetime(2024, 1, 1)
+TABLES = [Student.__table__, Institution.__table__, Admin.__table__, Transaction.__table__]
+
+
+@pytest.fixture
+def transactions_client(sqlite_engine, session_factory):
+    async def setup():
+        async with sqlite_engine.begin() as conn:
+            await conn.run_sync(lambda sync_conn: [t.create(sync_conn) for t in TABLES])
+        async with session_factory() as db:
+            students = [Student(full_name=f"Student {i}", email=f"student{i}@example.com", phone_number="08012345678",
+                                hashed_password="x", field_of_interest="Engineering", is_verified=True)
+                        for i in range(2)]
+            db.add_all(students)
+            await db.flush()
+            for student in students:
+                for day in range(5):
+                    db.add(Transaction(title=f"Payment {day}", description="Tuition", student_id=student.id,
+                                       transaction_type="program_payment", amount=100 + day,
+                                       status="successful" if day % 2 == 0 else "pending",
+                                       transaction_date=START + timedelta(days=day)))
+            await db.commit()
+
+    asyncio.run(setup())
+
+    async def override_get_db():
+        async with session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    with services.overridden(session_factory=session_factory):
+        yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+
+
+def auth_headers(email):
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': email})}"}
+
+
+def test_export_streams_only_the_students_filtered_transactions(transactions_client):
+    params = {"status": "successful", "start": (START + timedelta(days=1)).isoformat()}
+
+    response = transactions_client.get("/student/transactions/export", headers=auth_headers("student0@example.com"),
+                                       params=params)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["title"] for row in rows] == ["Payment 2", "Payment 4"]
+    assert {row["student_name"] for row in rows} == {"Student Name"}
+    assert Decimal(rows[0]["amount"]) == 102
+
+    response = transactions_client.get("/student/transactions/export", headers=auth_headers("student0@example.com"),
+                                       params={**params, "format": "csv"})
+    assert response.status_code == 200
+    table = list(csv.reader(io.StringIO(response.text)))
+    assert table[0][:3] == ["id", "transaction_date", "title"]
+    assert [row[2] for row in table[1:]] == ["Payment 2", "Payment 4"]
+
+
+def test_transactions_are_paged_newest_first_with_a_cursor(transactions_client):
+    headers = auth_headers("student1@example.com")
+    titles, cursor = [], None
+    for _ in range(3):
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = transactions_client.get("/student/transactions", headers=headers, params=params).json()
+        titles += [transaction["title"] for transaction in page["transactions"]]
+        cursor = page["next_cursor"]
+
+    assert titles == ["Payment 4", "Payment 3", "Payment 2", "Payment 1", "Payment 0"]
+    assert cursor is None